@@ -1,15 +1,158 @@
 import pandas as pd
+import hashlib
 import os
 from django.conf import settings
 
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # Sin pyarrow no hay caché columnar y se leen los CSV
+    pa = None
+
 DATASET_PATH = os.path.join(settings.BASE_DIR, "datasets/raw/")
+CACHE_FORMAT_VERSION = 1
+
+# Archivos del dataset con una sola clase: la etiqueta la da el archivo
+LABELED_FILES = {"onlytrue1000.csv": 0, "onlyfakes1000.csv": 1}
+LABELS = (0, 1)
+
+def load_dataset(columns=None):
+    """
+    Dataset etiquetado: los textos de `LABELED_FILES` con su columna `label`.
+
+    Se lee de la caché columnar (ver `load_dataset_cache`) si está activada y
+    pyarrow está instalado, y si no de los CSV.
+
+    :param columns: Columnas a leer además de `label` (por defecto, todas).
+    """
+    if settings.DATASET_CACHE["ENABLED"] and pa is not None:
+        return load_dataset_cache(columns)
+    return load_dataset_csv(columns)
 
-def load_dataset():
-    true_df = pd.read_csv(os.path.join(DATASET_PATH, "onlytrue1000.csv"))
-    fake_df = pd.read_csv(os.path.join(DATASET_PATH, "onlyfakes1000.csv"))
+def load_dataset_csv(columns=None):
+    true_df = pd.read_csv(os.path.join(DATASET_PATH, "onlytrue1000.csv"), usecols=columns)
+    fake_df = pd.read_csv(os.path.join(DATASET_PATH, "onlyfakes1000.csv"), usecols=columns)
 
     true_df["label"] = 0
     fake_df["label"] = 1
 
     df = pd.concat([true_df, fake_df]).reset_index(drop=True)
     return df
+
+def dataset_fingerprint(files=None):
+    """
+    Identificador de la versión de los archivos del dataset (nombre, tamaño y fecha
+    de modificación, como `models_version`): no hace falta leerlos para saber si la
+    caché sigue valiendo.
+    """
+    digest = hashlib.sha256(f"format:{CACHE_FORMAT_VERSION};".encode())
+    for file_path in sorted(files or dataset_files()):
+        file_stat = os.stat(file_path)
+        digest.update(f"{os.path.basename(file_path)}:{file_stat.st_size}:{file_stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+def file_digest(file_path):
+    """
+    SHA-256 del contenido de un archivo (no depende de su nombre ni de su fecha).
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def training_data(files=None):
+    """
+    Descripción de los archivos de entrenamiento que se guarda en el manifiesto de
+    cada bundle: nombre y hash del contenido de cada uno.
+    """
+    return [{"file": os.path.basename(path), "sha256": file_digest(path)} for path in (files or dataset_files())]
+
+def dataset_cache_file():
+    return os.path.join(settings.DATASET_CACHE["PATH"], f"dataset-{dataset_fingerprint()}.feather")
+
+def build_dataset_cache():
+    """
+    Escribe el dataset en formato Feather (Arrow) sin comprimir, para que se pueda
+    abrir mapeado en memoria, con tipos compactos: el texto como string de Arrow
+    (un solo buffer de bytes UTF-8 con offsets, no un objeto de Python por fila) y
+    la etiqueta como int8. Se escribe en un archivo temporal que se renombra al
+    final y después se borran las cachés de versiones anteriores del dataset.
+    """
+    cache_file = dataset_cache_file()
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+
+    df = load_dataset_csv()
+    df["label"] = df["label"].astype("int8")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_file, compression="uncompressed")
+    os.replace(tmp_file, cache_file)
+
+    for file_name in os.listdir(os.path.dirname(cache_file)):
+        stale = os.path.join(os.path.dirname(cache_file), file_name)
+        if file_name.startswith("dataset-") and file_name.endswith(".feather") and stale != cache_file:
+            os.remove(stale)
+    return cache_file
+
+def load_dataset_cache(columns=None):
+    """
+    Lee el dataset de la caché columnar, construyéndola si no existe o si los CSV
+    han cambiado. Solo se leen las columnas pedidas y el archivo se mapea en
+    memoria: los textos quedan como `string[pyarrow]` sobre las páginas del
+    archivo, sin copiarlos ni crear un `str` por fila.
+    """
+    cache_file = dataset_cache_file()
+    if not os.path.isfile(cache_file):
+        build_dataset_cache()
+    table = feather.read_table(cache_file, memory_map=True)
+    if columns is not None:
+        # Seleccionar sobre la tabla mapeada no copia nada (pasar `columns` a read_table
+        # sí copia) y las páginas de las demás columnas no llegan a leerse del disco
+        table = table.select([column for column in columns if column != "label"] + ["label"])
+    df = table.to_pandas(types_mapper=pd.ArrowDtype)
+    # La etiqueta como array de numpy, como en la lectura de los CSV
+    df["label"] = df["label"].to_numpy(dtype="int8")
+    return df
+
+def dataset_files():
+    """
+    Rutas de los archivos etiquetados de `datasets/raw`.
+    """
+    return [os.path.join(DATASET_PATH, file_name) for file_name in LABELED_FILES]
+
+def _read_chunks(file_path, chunk_size):
+    label = LABELED_FILES.get(os.path.basename(file_path))
+    columns = ["text"] if label is not None else ["text", "label"]
+    for chunk in pd.read_csv(file_path, usecols=columns, chunksize=chunk_size):
+        if label is not None:
+            chunk["label"] = label
+        yield chunk.dropna(subset=["text", "label"]).astype({"label": int})
+
+def iter_dataset_chunks(files=None, chunk_size=1000, random_state=42):
+    """
+    Recorre el dataset por fragmentos sin cargarlo entero en memoria.
+
+    Lee a la vez un fragmento de `chunk_size` filas de cada archivo y los mezcla,
+    para que cada fragmento tenga ejemplos de todas las clases aunque cada archivo
+    tenga una sola (los modelos con `partial_fit` aprenden mal con datos ordenados
+    por clase). La memoria máxima es la de un fragmento por archivo.
+
+    :param files: Rutas de CSV con una columna `text`. La etiqueta sale del nombre
+        del archivo si está en `LABELED_FILES` y, si no, de su columna `label`.
+        Por defecto, los archivos de `datasets/raw`.
+    :return: Generador de DataFrames con las columnas `text` y `label`.
+    """
+    readers = [_read_chunks(file_path, chunk_size) for file_path in (files or dataset_files())]
+    step = 0
+    while readers:
+        parts = []
+        for reader in list(readers):
+            chunk = next(reader, None)
+            if chunk is None:
+                readers.remove(reader)
+            else:
+                parts.append(chunk)
+        if parts:
+            yield pd.concat(parts).sample(frac=1, random_state=random_state + step).reset_index(drop=True)
+            step += 1
@@ -62,6 +62,109 @@ CORS_ALLOWED_ORIGINS = [
 AZURE_OPENAI_API_URL = os.getenv('AZURE_OPENAI_API_URL')
 AZURE_OPENAI_API_KEY = os.getenv('AZURE_OPENAI_API_KEY')
 
+# Cliente HTTP del LLM: pool de conexiones, timeouts (segundos), concurrencia, reintentos y circuit breaker
+LLM_CLIENT = {
+    'POOL_SIZE': int(os.getenv('LLM_POOL_SIZE', 10)),
+    'CONNECT_TIMEOUT': float(os.getenv('LLM_CONNECT_TIMEOUT', 3.05)),
+    'READ_TIMEOUT': float(os.getenv('LLM_READ_TIMEOUT', 30)),
+    'MAX_CONCURRENCY': int(os.getenv('LLM_MAX_CONCURRENCY', 8)),
+    'ACQUIRE_TIMEOUT': float(os.getenv('LLM_ACQUIRE_TIMEOUT', 5)),
+    'MAX_RETRIES': int(os.getenv('LLM_MAX_RETRIES', 2)),
+    'BACKOFF_BASE': float(os.getenv('LLM_BACKOFF_BASE', 0.5)),
+    'BACKOFF_MAX': float(os.getenv('LLM_BACKOFF_MAX', 8)),
+    'BREAKER_THRESHOLD': int(os.getenv('LLM_BREAKER_THRESHOLD', 5)),
+    'BREAKER_RESET_TIMEOUT': float(os.getenv('LLM_BREAKER_RESET_TIMEOUT', 30)),
+}
+
+# Registro de modelos: carga bajo demanda con presupuesto de memoria en MB (0 = sin límite)
+MODEL_REGISTRY = {
+    'MEMORY_BUDGET_MB': int(os.getenv('MODEL_MEMORY_BUDGET_MB', 0)),
+    'PRELOAD': os.getenv('MODEL_PRELOAD', 'False') == 'True',
+    # Abrir los artefactos mapeados en memoria (ml_models/mapped) en lugar de los .pkl si existen
+    'USE_ARTIFACTS': os.getenv('MODEL_USE_ARTIFACTS', 'True') == 'True',
+    # Segundos entre comprobaciones del bundle activo (ml_models/bundles/CURRENT)
+    'BUNDLE_CHECK_INTERVAL': float(os.getenv('MODEL_BUNDLE_CHECK_INTERVAL', 5)),
+}
+
+# Caché columnar del dataset etiquetado (Arrow/Feather sin comprimir, se abre mapeado en
+# memoria). Se reconstruye sola cuando cambian los CSV de datasets/raw; sin pyarrow se leen los CSV
+DATASET_CACHE = {
+    'ENABLED': os.getenv('DATASET_CACHE_ENABLED', 'True') == 'True',
+    'PATH': os.getenv('DATASET_CACHE_PATH', os.path.join(BASE_DIR, 'datasets', 'cache')),
+}
+
+# Caché de textos preprocesados y matrices documento-término de primetrain. Se guardan
+# como máximo MAX_ENTRIES entradas de cada tipo; las usadas hace más tiempo se borran
+FEATURE_CACHE = {
+    'PATH': os.getenv('FEATURE_CACHE_PATH', os.path.join(BASE_DIR, 'ml_models', 'feature_cache')),
+    'MAX_ENTRIES': int(os.getenv('FEATURE_CACHE_MAX_ENTRIES', 4)),
+}
+
+# Máximo de textos aceptados por el endpoint de predicción por lotes
+PREDICT_BATCH_MAX_SIZE = int(os.getenv('PREDICT_BATCH_MAX_SIZE', 1000))
+
+# Inferencia en paralelo de los modelos del ensemble (hilos por proceso). BLAS_THREADS y
+# XGBOOST_THREADS limitan los hilos nativos de cada modelo para no sobresuscribir la CPU
+INFERENCE = {
+    'WORKERS': int(os.getenv('INFERENCE_WORKERS', min(4, os.cpu_count() or 1))),
+    'BLAS_THREADS': int(os.getenv('INFERENCE_BLAS_THREADS', 1)),
+    'XGBOOST_THREADS': int(os.getenv('INFERENCE_XGBOOST_THREADS', 1)),
+}
+
+# Cascada del ensemble de todos los modelos. MODE: full (todos los modelos) | cascade
+# ORDER: modelos de más barato a más caro. MIN_CONFIDENCE: corte aproximado (0 = solo el exacto)
+ENSEMBLE_CASCADE = {
+    'MODE': os.getenv('ENSEMBLE_MODE', 'full'),
+    'ORDER': os.getenv('ENSEMBLE_CASCADE_ORDER', 'logistic,naive_bayes,neural_network,xgboost,random_forest').split(','),
+    'MIN_CONFIDENCE': float(os.getenv('ENSEMBLE_CASCADE_MIN_CONFIDENCE', 0)) or None,
+}
+
+# Máximo de tramos (horas o días) que devuelve el endpoint de series temporales
+STATS_TIMESERIES_MAX_BUCKETS = int(os.getenv('STATS_TIMESERIES_MAX_BUCKETS', 744))
+
+# Filas por página (consulta) al exportar el registro de predicciones
+PREDICTION_EXPORT_PAGE_SIZE = int(os.getenv('PREDICTION_EXPORT_PAGE_SIZE', 1000))
+
+# Registro de predicciones en segundo plano (write-behind). MODE: async | sync
+PREDICTION_LOG = {
+    'MODE': os.getenv('PREDICTION_LOG_MODE', 'async'),
+    'QUEUE_SIZE': int(os.getenv('PREDICTION_LOG_QUEUE_SIZE', 10000)),
+    'BATCH_SIZE': int(os.getenv('PREDICTION_LOG_BATCH_SIZE', 500)),
+    'FLUSH_INTERVAL': float(os.getenv('PREDICTION_LOG_FLUSH_INTERVAL', 1.0)),
+    'ENQUEUE_TIMEOUT': float(os.getenv('PREDICTION_LOG_ENQUEUE_TIMEOUT', 0.05)),
+    'SHUTDOWN_TIMEOUT': float(os.getenv('PREDICTION_LOG_SHUTDOWN_TIMEOUT', 10)),
+    'WRITE_RETRIES': int(os.getenv('PREDICTION_LOG_WRITE_RETRIES', 1)),
+    'RETRY_DELAY': float(os.getenv('PREDICTION_LOG_RETRY_DELAY', 0.5)),
+}
+
+# Caché de resultados de predicción (texto preprocesado + modelos + versión de los modelos)
+# BACKEND: 'local' (memoria del proceso, LRU + TTL), 'django' (usa CACHES[ALIAS]) o 'none'
+PREDICTION_CACHE = {
+    'BACKEND': os.getenv('PREDICTION_CACHE_BACKEND', 'local'),
+    'MAX_ENTRIES': int(os.getenv('PREDICTION_CACHE_MAX_ENTRIES', 10000)),
+    'TTL': int(os.getenv('PREDICTION_CACHE_TTL', 3600)),
+    'ALIAS': os.getenv('PREDICTION_CACHE_ALIAS', 'default'),
+}
+
+# Explicaciones del LLM persistidas en la base de datos (modelo Explanation)
+# TTL en segundos; WAIT_TIMEOUT: espera máxima del modo síncrono;
+# WORKERS: hilos que generan explicaciones en segundo plano;
+# JOB_RETENTION: segundos que un job terminado sigue disponible para polling/SSE;
+# PROGRESS_INTERVAL: cada cuánto se guarda en la base de datos el texto de un job en curso
+# (y cada cuánto la consulta el SSE de otro proceso); PENDING_TIMEOUT: segundos sin
+# progreso tras los que un job en curso se da por perdido
+EXPLANATION_CACHE = {
+    'TTL': int(os.getenv('EXPLANATION_CACHE_TTL', 7 * 24 * 3600)),
+    'MAX_ENTRIES': int(os.getenv('EXPLANATION_CACHE_MAX_ENTRIES', 50000)),
+    'WAIT_TIMEOUT': float(os.getenv('EXPLANATION_CACHE_WAIT_TIMEOUT', 60)),
+    'WORKERS': int(os.getenv('EXPLANATION_WORKERS', 4)),
+    'JOB_RETENTION': int(os.getenv('EXPLANATION_JOB_RETENTION', 300)),
+    'PROGRESS_INTERVAL': float(os.getenv('EXPLANATION_PROGRESS_INTERVAL', 0.5)),
+    'PENDING_TIMEOUT': int(os.getenv('EXPLANATION_PENDING_TIMEOUT', 120)),
+    'STREAM_POLL_INTERVAL': float(os.getenv('EXPLANATION_STREAM_POLL_INTERVAL', 0.1)),
+    'STREAM_KEEPALIVE': float(os.getenv('EXPLANATION_STREAM_KEEPALIVE', 15)),
+}
+
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
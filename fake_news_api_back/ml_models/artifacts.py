@@ -0,0 +1,483 @@
+"""
+Formato de artefactos de modelos con memoria compartida.
+
+Cada modelo se guarda en un directorio con un `meta.json` y arrays planos `.npy`
+(vocabulario, coeficientes lineales, log-probabilidades de Naive Bayes, nodos de
+los árboles, capas de la red neuronal). Los arrays se abren con `mmap_mode="r"`:
+son de solo lectura y los workers que cargan el mismo archivo comparten las
+páginas a través de la caché de páginas del sistema operativo, en lugar de tener
+cada uno su copia deserializada. Abrir un artefacto no deserializa nada. El
+`HashingVectorizer` no tiene arrays: su artefacto es solo el `meta.json`.
+
+Las clases `Mapped*` implementan `predict`/`predict_proba` (y `transform` en el
+vectorizador) con los mismos resultados que los objetos de sklearn/xgboost originales.
+"""
+import json
+import os
+import shutil
+import numpy as np
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.neural_network import MLPClassifier
+from xgboost import XGBClassifier
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+
+# Parámetros del CountVectorizer que afectan a `transform` (los de ajuste no se guardan)
+VECTORIZER_PARAMS = (
+    "analyzer", "binary", "decode_error", "encoding", "input", "lowercase",
+    "ngram_range", "stop_words", "strip_accents", "token_pattern",
+)
+# El HashingVectorizer no tiene estado: su artefacto son solo estos parámetros
+HASHING_PARAMS = VECTORIZER_PARAMS + ("n_features", "alternate_sign", "norm")
+
+def _save_arrays(directory, meta, arrays):
+    """
+    Escribe el artefacto en un directorio temporal y lo sustituye al final, de modo
+    que un lector nunca ve un artefacto a medio escribir.
+    """
+    tmp_directory = directory.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(tmp_directory, ignore_errors=True)
+    os.makedirs(tmp_directory)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_directory, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+    with open(os.path.join(tmp_directory, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"format_version": FORMAT_VERSION, **meta, "arrays": sorted(arrays)}, f, indent=2)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_directory, directory)
+
+
+def _load_arrays(directory):
+    with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Versión de artefacto no soportada en {directory}: {meta.get('format_version')}")
+    arrays = {
+        # Vista ndarray sobre el mapeo: sin copia y sin la sobrecarga de indexar un np.memmap
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r", allow_pickle=False).view(np.ndarray)
+        for name in meta["arrays"]
+    }
+    return meta, arrays
+
+
+def is_artifact(directory):
+    return os.path.isfile(os.path.join(directory, META_FILE))
+
+
+# ---------------------------------------------------------------------------
+# Vectorizador
+# ---------------------------------------------------------------------------
+
+def export_vectorizer(vectorizer, directory):
+    params = vectorizer.get_params()
+    if not isinstance(params["analyzer"], str) or params["preprocessor"] or params["tokenizer"]:
+        raise ValueError("Solo se pueden exportar vectorizadores sin funciones propias (analyzer, preprocessor, tokenizer).")
+
+    if isinstance(vectorizer, HashingVectorizer):
+        _save_arrays(directory, {
+            "kind": "hashing_vectorizer",
+            "params": {name: params[name] for name in HASHING_PARAMS},
+            "dtype": np.dtype(params["dtype"]).name,
+            "n_features": params["n_features"],
+        }, {})
+        return
+
+    # Términos ordenados (en bytes UTF-8, cuyo orden coincide con el de los str) y su columna
+    terms = sorted(vectorizer.vocabulary_)
+    meta = {
+        "kind": "count_vectorizer",
+        "params": {name: params[name] for name in VECTORIZER_PARAMS},
+        "dtype": np.dtype(params["dtype"]).name,
+        "n_features": len(terms),
+    }
+    _save_arrays(directory, meta, {
+        "terms": np.array([term.encode("utf-8") for term in terms], dtype=bytes),
+        "columns": np.array([vectorizer.vocabulary_[term] for term in terms], dtype=np.int64),
+    })
+
+
+class MappedCountVectorizer:
+    """
+    Equivalente de solo lectura de `CountVectorizer.transform`. El vocabulario se
+    busca con `np.searchsorted` sobre el array de términos mapeado en memoria, sin
+    reconstruir el diccionario `vocabulary_` en cada proceso.
+    """
+
+    artifact_format = "mmap"
+
+    def __init__(self, meta, arrays):
+        params = dict(meta["params"])
+        params["ngram_range"] = tuple(params["ngram_range"])
+        self.params = params
+        self.dtype = np.dtype(meta["dtype"])
+        self.n_features = meta["n_features"]
+        self.terms = arrays["terms"]
+        self.columns = arrays["columns"]
+        self._analyzer = CountVectorizer(**params).build_analyzer()
+
+    def build_analyzer(self):
+        return self._analyzer
+
+    def transform(self, raw_documents):
+        if isinstance(raw_documents, str):
+            raise ValueError("Iterable over raw text documents expected, string object received.")
+
+        tokens = []
+        indptr = [0]
+        for document in raw_documents:
+            tokens.extend(self._analyzer(document))
+            indptr.append(len(tokens))
+
+        if tokens:
+            encoded = np.array([token.encode("utf-8") for token in tokens], dtype=bytes)
+            positions = np.searchsorted(self.terms, encoded)
+            positions[positions == len(self.terms)] = 0
+            known = self.terms[positions] == encoded
+            columns = self.columns[positions[known]]
+            rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))[known]
+        else:
+            columns = np.empty(0, dtype=np.int64)
+            rows = np.empty(0, dtype=np.int64)
+
+        X = sp.csr_matrix(
+            (np.ones(len(columns), dtype=self.dtype), (rows, columns)),
+            shape=(len(indptr) - 1, self.n_features),
+            dtype=self.dtype,
+        )
+        X.sum_duplicates()
+        if self.params["binary"]:
+            X.data.fill(1)
+        return X
+
+
+# ---------------------------------------------------------------------------
+# Modelos
+# ---------------------------------------------------------------------------
+
+def is_logistic_sgd(model):
+    """
+    `SGDClassifier` binario con pérdida logística (el de `incrementaltrain`): sus
+    predicciones y probabilidades son las de una regresión logística con los
+    mismos coeficientes.
+    """
+    return isinstance(model, SGDClassifier) and model.loss == "log_loss" and len(model.classes_) == 2
+
+
+def export_model(model, directory):
+    """
+    Exporta un modelo entrenado al formato de artefactos.
+
+    :raises ValueError: Si el tipo de modelo no está soportado.
+    """
+    classes = np.asarray(model.classes_)
+
+    if isinstance(model, LogisticRegression) or is_logistic_sgd(model):
+        _save_arrays(directory, {"kind": "linear"}, {
+            "coef": model.coef_, "intercept": model.intercept_, "classes": classes,
+        })
+    elif isinstance(model, MultinomialNB):
+        _save_arrays(directory, {"kind": "naive_bayes"}, {
+            "feature_log_prob": model.feature_log_prob_, "class_log_prior": model.class_log_prior_, "classes": classes,
+        })
+    elif isinstance(model, RandomForestClassifier):
+        _save_arrays(directory, {"kind": "forest"}, {**_forest_arrays(model), "classes": classes})
+    elif isinstance(model, XGBClassifier):
+        meta, arrays = _xgboost_arrays(model)
+        _save_arrays(directory, meta, {**arrays, "classes": classes})
+    elif isinstance(model, MLPClassifier):
+        arrays = {"classes": classes}
+        for index, (coef, intercept) in enumerate(zip(model.coefs_, model.intercepts_)):
+            arrays[f"coef_{index}"] = coef
+            arrays[f"intercept_{index}"] = intercept
+        _save_arrays(directory, {
+            "kind": "mlp",
+            "activation": model.activation,
+            "out_activation": model.out_activation_,
+            "n_layers": len(model.coefs_),
+        }, arrays)
+    else:
+        raise ValueError(f"Tipo de modelo no soportado para artefactos: {type(model).__name__}")
+
+
+def _forest_arrays(model):
+    offsets = [0]
+    left, right, feature, threshold, proba = [], [], [], [], []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        offset = offsets[-1]
+        is_leaf = tree.children_left == -1
+        # Hijos con índices globales; las hojas se apuntan a sí mismas
+        node_ids = np.arange(tree.node_count) + offset
+        left.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+        right.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        value = tree.value[:, 0, :]
+        proba.append(value / value.sum(axis=1, keepdims=True))
+        offsets.append(offset + tree.node_count)
+
+    return {
+        "roots": np.array(offsets[:-1], dtype=np.int64),
+        "left": np.concatenate(left).astype(np.int64),
+        "right": np.concatenate(right).astype(np.int64),
+        "feature": np.concatenate(feature).astype(np.int64),
+        "threshold": np.concatenate(threshold),
+        "leaf_proba": np.concatenate(proba),
+    }
+
+
+def _xgboost_arrays(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+    if learner["objective"]["name"] != "binary:logistic":
+        raise ValueError("Solo se exportan modelos XGBoost con objetivo binary:logistic.")
+
+    offsets = [0]
+    left, right, default_left, feature, condition = [], [], [], [], []
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        offset = offsets[-1]
+        tree_left = np.array(tree["left_children"], dtype=np.int64)
+        tree_right = np.array(tree["right_children"], dtype=np.int64)
+        is_leaf = tree_left == -1
+        node_ids = np.arange(len(tree_left)) + offset
+        left.append(np.where(is_leaf, node_ids, tree_left + offset))
+        right.append(np.where(is_leaf, node_ids, tree_right + offset))
+        default_left.append(np.array(tree["default_left"], dtype=bool))
+        feature.append(np.where(is_leaf, 0, np.array(tree["split_indices"], dtype=np.int64)))
+        # En las hojas split_conditions guarda el valor de la hoja
+        condition.append(np.array(tree["split_conditions"], dtype=np.float32))
+        offsets.append(offset + len(tree_left))
+
+    arrays = {
+        "roots": np.array(offsets[:-1], dtype=np.int64),
+        "left": np.concatenate(left),
+        "right": np.concatenate(right),
+        "default_left": np.concatenate(default_left),
+        "feature": np.concatenate(feature),
+        "condition": np.concatenate(condition),
+    }
+
+    # Margen base: lo que el booster suma a las hojas, medido sobre una fila vacía
+    empty = sp.csr_matrix((1, int(learner["learner_model_param"]["num_feature"])), dtype=np.float32)
+    margin = float(model.predict(empty, output_margin=True)[0])
+    leaves = _walk_gbtree(arrays, empty)
+    base_margin = margin - float(arrays["condition"][leaves].sum(dtype=np.float32))
+
+    return {"kind": "gbtree", "base_margin": base_margin}, arrays
+
+
+# Celdas máximas de cada bloque densificado al recorrer árboles (~64 MB en float32)
+TREE_CHUNK_CELLS = 16 * 1024 * 1024
+
+
+def _dense_chunks(X):
+    """
+    Divide la matriz dispersa en bloques densos de filas, con la máscara de las
+    entradas guardadas (XGBoost distingue un 0 guardado de un valor faltante).
+    """
+    X = sp.csr_matrix(X)
+    rows_per_chunk = max(1, TREE_CHUNK_CELLS // max(X.shape[1], 1))
+    for start in range(0, X.shape[0], rows_per_chunk):
+        chunk = X[start:start + rows_per_chunk]
+        present = np.zeros(chunk.shape, dtype=bool)
+        present[np.repeat(np.arange(chunk.shape[0]), np.diff(chunk.indptr)), chunk.indices] = True
+        yield chunk.astype(np.float32).toarray(), present
+
+
+def _walk_trees(arrays, X, go_left):
+    """
+    Recorre todos los árboles a la vez para todas las filas y devuelve las hojas
+    alcanzadas (filas × árboles). Solo se siguen avanzando los pares (fila, árbol)
+    que aún no han llegado a una hoja, porque los árboles profundos tienen pocas
+    ramas largas.
+
+    :param go_left: Función (valores, presentes, nodos) -> array booleano con la rama a seguir.
+    """
+    n_trees = len(arrays["roots"])
+    left, right, feature = arrays["left"], arrays["right"], arrays["feature"]
+    results = []
+    for values, present in _dense_chunks(X):
+        n_rows = values.shape[0]
+        nodes = np.tile(arrays["roots"], n_rows)
+        rows = np.repeat(np.arange(n_rows), n_trees)
+
+        active = np.flatnonzero(left[nodes] != nodes)
+        while active.size:
+            current = nodes[active]
+            active_rows, active_features = rows[active], feature[current]
+            branch = go_left(values[active_rows, active_features], present[active_rows, active_features], current)
+            nodes[active] = np.where(branch, left[current], right[current])
+            active = active[left[nodes[active]] != nodes[active]]
+        results.append(nodes.reshape(n_rows, n_trees))
+    return np.vstack(results) if results else np.empty((0, n_trees), dtype=np.int64)
+
+
+def _walk_gbtree(arrays, X):
+    # Como XGBoost con matrices dispersas, una entrada ausente es un valor faltante
+    # y sigue la rama por defecto del nodo
+    def go_left(values, present, nodes):
+        return np.where(present, values < arrays["condition"][nodes], arrays["default_left"][nodes])
+    return _walk_trees(arrays, X, go_left)
+
+
+def _walk_forest(arrays, X):
+    def go_left(values, present, nodes):
+        return values <= arrays["threshold"][nodes]
+    return _walk_trees(arrays, X, go_left)
+
+
+class MappedModel:
+    """
+    Modelo abierto desde un artefacto. Las subclases implementan `predict_proba`;
+    `predict` devuelve la clase más probable, como los clasificadores de sklearn.
+    """
+    artifact_format = "mmap"
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.arrays = arrays
+        self.classes_ = np.asarray(arrays["classes"])
+
+    def predict_proba(self, X):
+        raise NotImplementedError
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _binary_proba(positive):
+    positive = np.asarray(positive, dtype=np.float64).ravel()
+    return np.column_stack([1 - positive, positive])
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+class MappedLinearModel(MappedModel):
+    def decision_function(self, X):
+        scores = X @ self.arrays["coef"].T + self.arrays["intercept"]
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[np.argmax(scores, axis=1)]
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return _binary_proba(_sigmoid(scores))
+        exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+class MappedNaiveBayes(MappedModel):
+    def joint_log_likelihood(self, X):
+        return X @ self.arrays["feature_log_prob"].T + self.arrays["class_log_prior"]
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.joint_log_likelihood(X), axis=1)]
+
+    def predict_proba(self, X):
+        jll = self.joint_log_likelihood(X)
+        exp = np.exp(jll - jll.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+class MappedForest(MappedModel):
+    def predict_proba(self, X):
+        leaves = _walk_forest(self.arrays, X)
+        proba = np.zeros((leaves.shape[0], len(self.classes_)))
+        for tree_index in range(leaves.shape[1]):
+            proba += self.arrays["leaf_proba"][leaves[:, tree_index]]
+        return proba / leaves.shape[1]
+
+
+class MappedGradientBoosting(MappedModel):
+    def decision_function(self, X):
+        leaves = _walk_gbtree(self.arrays, X)
+        return self.arrays["condition"][leaves].sum(axis=1, dtype=np.float32) + np.float32(self.meta["base_margin"])
+
+    def predict_proba(self, X):
+        return _binary_proba(_sigmoid(self.decision_function(X).astype(np.float64)))
+
+
+class MappedMLP(MappedModel):
+    ACTIVATIONS = {
+        "relu": lambda x: np.maximum(x, 0),
+        "tanh": np.tanh,
+        "logistic": _sigmoid,
+        "identity": lambda x: x,
+    }
+
+    def predict_proba(self, X):
+        activation = X
+        last = self.meta["n_layers"] - 1
+        for index in range(self.meta["n_layers"]):
+            activation = activation @ self.arrays[f"coef_{index}"] + self.arrays[f"intercept_{index}"]
+            if index < last:
+                activation = self.ACTIVATIONS[self.meta["activation"]](activation)
+
+        if self.meta["out_activation"] == "logistic":
+            return _binary_proba(_sigmoid(activation))
+        exp = np.exp(activation - activation.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        proba = self.predict_proba(X)
+        if self.meta["out_activation"] == "logistic":
+            return self.classes_[(proba[:, 1] > 0.5).astype(int)]
+        return self.classes_[np.argmax(proba, axis=1)]
+
+
+MAPPED_KINDS = {
+    "linear": MappedLinearModel,
+    "naive_bayes": MappedNaiveBayes,
+    "forest": MappedForest,
+    "gbtree": MappedGradientBoosting,
+    "mlp": MappedMLP,
+}
+
+
+def load_artifact(directory):
+    """
+    Abre un artefacto (modelo o vectorizador) con sus arrays mapeados en memoria.
+    """
+    meta, arrays = _load_arrays(directory)
+    if meta["kind"] == "count_vectorizer":
+        return MappedCountVectorizer(meta, arrays)
+    if meta["kind"] == "hashing_vectorizer":
+        params = dict(meta["params"], ngram_range=tuple(meta["params"]["ngram_range"]))
+        return HashingVectorizer(**params, dtype=np.dtype(meta["dtype"]))
+    return MAPPED_KINDS[meta["kind"]](meta, arrays)
+
+
+def export_artifacts(vectorizer, models, directory):
+    """
+    Exporta el vectorizador y los modelos a `directory/<nombre>`.
+
+    :param models: Diccionario {nombre: modelo}; los valores None se ignoran.
+    :return: Diccionario {nombre: None si se exportó, o el mensaje de error}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    results = {}
+    for name, obj in [("vectorizer", vectorizer), *models.items()]:
+        if obj is None:
+            continue
+        try:
+            if name == "vectorizer":
+                export_vectorizer(obj, os.path.join(directory, name))
+            else:
+                export_model(obj, os.path.join(directory, name))
+            results[name] = None
+        except ValueError as e:
+            results[name] = str(e)
+    return results
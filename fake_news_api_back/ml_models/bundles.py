@@ -0,0 +1,299 @@
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from django.conf import settings
+from django.utils import timezone
+from ml_models.artifacts import export_artifacts
+from ml_models.featurizers import describe_vectorizer
+from ml_models.models import (
+    MODELS_PATH, ModelRegistry, model_files, models_version, VECTORIZER_FILE_NAME,
+)
+from ml_models.scoring import FusedLinearScorer
+
+BUNDLES_PATH = os.path.join(MODELS_PATH, "bundles")
+POINTER_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+ARTIFACTS_DIR = "mapped"
+
+
+class ModelBundle:
+    """
+    Versión inmutable de los modelos: vectorizador, modelos y metadatos del
+    entrenamiento (precisión de cada modelo). Una petición usa un único bundle de
+    principio a fin, así que un cambio de versión nunca mezcla el vocabulario de
+    una versión con los modelos de otra.
+    """
+
+    def __init__(self, version, path, manifest=None, memory_budget=0, use_artifacts=True):
+        self.version = version
+        self.path = path
+        self.manifest = manifest or {}
+        self.models = ModelRegistry(
+            model_files(path),
+            os.path.join(path, VECTORIZER_FILE_NAME),
+            memory_budget=memory_budget,
+            artifacts_path=self.artifacts_path if use_artifacts else None,
+        )
+        self._scorers = {}
+        self._scorers_lock = threading.Lock()
+
+    @property
+    def artifacts_path(self):
+        return os.path.join(self.path, ARTIFACTS_DIR)
+
+    @property
+    def vectorizer(self):
+        return self.models.vectorizer()
+
+    def linear_scorer(self, model_names):
+        """
+        `FusedLinearScorer` con los modelos lineales de `model_names`. Se construye la
+        primera vez que se pide cada combinación de modelos y se reutiliza: el bundle
+        es inmutable, así que sus pesos no cambian aunque el registro descargue los modelos.
+        """
+        key = tuple(sorted(model_names))
+        scorer = self._scorers.get(key)
+        if scorer is None:
+            with self._scorers_lock:
+                scorer = self._scorers.get(key)
+                if scorer is None:
+                    scorer = FusedLinearScorer({name: self.models.get(name) for name in key})
+                    self._scorers[key] = scorer
+        return scorer
+
+    @property
+    def stats(self):
+        """
+        Precisión de cada modelo registrada al crear el bundle: {modelo: precisión}.
+        """
+        return self.manifest.get("stats", {})
+
+    @property
+    def training_data(self):
+        """
+        Archivos con los que se entrenaron los modelos ([{"file", "sha256"}]), o None
+        si el bundle no lo registra (bundles anteriores y modelos sueltos).
+        """
+        return self.manifest.get("training_data")
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "created_at": self.manifest.get("created_at"),
+            "models": self.models.available(),
+            "featurizer": self.manifest.get("featurizer"),
+            "stats": self.stats,
+        }
+
+
+def version_key(version):
+    """
+    Clave de orden de una versión "AAAAMMDD-HHMMSS[-N]": (marca de tiempo, N),
+    para que "-10" quede detrás de "-2" dentro del mismo segundo.
+    """
+    parts = version.split("-", 2)
+    suffix = parts[2] if len(parts) > 2 else "1"
+    return "-".join(parts[:2]), int(suffix) if suffix.isdigit() else 0
+
+
+def legacy_bundle_version(path=MODELS_PATH):
+    """
+    Versión de los modelos sueltos en `ml_models/` (instalaciones anteriores a los bundles).
+    """
+    files = list(model_files(path).values()) + [os.path.join(path, VECTORIZER_FILE_NAME)]
+    files += [os.path.join(path, ARTIFACTS_DIR, name, "meta.json") for name in list(model_files(path)) + ["vectorizer"]]
+    return f"legacy-{models_version(files)}"
+
+
+class BundleManager:
+    """
+    Gestiona los bundles en `ml_models/bundles/<versión>/` y el puntero `CURRENT`
+    con la versión activa.
+
+    Cada worker comprueba el puntero como mucho cada `check_interval` segundos.
+    Si ha cambiado, prepara el bundle nuevo en un hilo aparte (cargando sus modelos)
+    mientras sigue sirviendo el actual, y después lo sustituye con una sola
+    asignación: las peticiones en curso terminan con la versión con la que
+    empezaron y ninguna paga la carga en frío. Sin puntero se sirven los modelos
+    sueltos de `ml_models/` como un bundle "legacy".
+    """
+
+    def __init__(self, bundles_path=BUNDLES_PATH, legacy_path=MODELS_PATH, memory_budget=0,
+                 use_artifacts=True, check_interval=5, preload=False):
+        self.bundles_path = bundles_path
+        self.legacy_path = legacy_path
+        self.memory_budget = memory_budget
+        self.use_artifacts = use_artifacts
+        self.check_interval = check_interval
+        self.preload = preload
+        self.swaps = 0
+        self._bundle = None
+        self._checked_at = 0.0
+        self._swapping = False
+        self._lock = threading.Lock()
+
+    @property
+    def pointer_path(self):
+        return os.path.join(self.bundles_path, POINTER_FILE)
+
+    def read_pointer(self):
+        try:
+            with open(self.pointer_path, encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def open(self, version=None):
+        """
+        Abre un bundle (sin cargar sus modelos). Sin versión, el bundle legacy.
+
+        :raises ValueError: Si la versión no existe.
+        """
+        if version is None:
+            return ModelBundle(
+                legacy_bundle_version(self.legacy_path), self.legacy_path,
+                memory_budget=self.memory_budget, use_artifacts=self.use_artifacts,
+            )
+
+        path = os.path.join(self.bundles_path, version)
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.isfile(manifest_path):
+            raise ValueError(f"No existe el bundle de modelos {version}")
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        return ModelBundle(version, path, manifest, memory_budget=self.memory_budget, use_artifacts=self.use_artifacts)
+
+    def current(self):
+        """
+        Bundle activo. Es barato: como mucho lee el puntero cada `check_interval` segundos.
+        """
+        if self._bundle is None:
+            with self._lock:
+                if self._bundle is None:
+                    bundle = self.open(self.read_pointer())
+                    if self.preload:
+                        bundle.models.preload()
+                    self._bundle = bundle
+                    self._checked_at = time.monotonic()
+        elif time.monotonic() - self._checked_at >= self.check_interval:
+            self._check_pointer()
+        return self._bundle
+
+    def _check_pointer(self):
+        with self._lock:
+            if self._swapping or time.monotonic() - self._checked_at < self.check_interval:
+                return
+            self._checked_at = time.monotonic()
+            version = self.read_pointer()
+            if version is None or version == self._bundle.version:
+                return
+            self._swapping = True
+        threading.Thread(target=self._swap, args=(version,), name="model-bundle-swap", daemon=True).start()
+
+    def _swap(self, version):
+        try:
+            bundle = self.open(version)
+            bundle.models.preload()
+            previous = self._bundle.version
+            self._bundle = bundle
+            self.swaps += 1
+            print(f"🔁 Modelos actualizados: {previous} → {version}")
+        except Exception as e:
+            print(f"Error activando el bundle de modelos {version}: {e}")
+        finally:
+            self._swapping = False
+
+    def versions(self):
+        """
+        Versiones disponibles, de la más antigua a la más reciente.
+        """
+        if not os.path.isdir(self.bundles_path):
+            return []
+        # Un directorio `.tmp` es un bundle a medio crear (o de un `create` que falló)
+        return sorted((
+            name for name in os.listdir(self.bundles_path)
+            if not name.endswith(".tmp") and os.path.isfile(os.path.join(self.bundles_path, name, MANIFEST_FILE))
+        ), key=version_key)
+
+    def activate(self, version):
+        """
+        Apunta `CURRENT` a `version`. El cambio es atómico (os.replace) y los
+        workers en marcha lo recogen en su siguiente comprobación del puntero.
+        """
+        self.open(version)
+        os.makedirs(self.bundles_path, exist_ok=True)
+        tmp_path = f"{self.pointer_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, self.pointer_path)
+        # En este proceso el cambio es inmediato
+        self._checked_at = 0.0
+
+    def create(self, vectorizer, models, stats, training_data=None):
+        """
+        Guarda un bundle nuevo (pickles, artefactos mapeados y manifiesto) sin activarlo.
+
+        :param models: Diccionario {nombre: modelo entrenado}.
+        :param stats: Diccionario {nombre: precisión}.
+        :param training_data: Archivos con los que se entrenaron los modelos (ver
+            `datasets.loader.training_data`).
+        :return: Tupla (versión, resultado de exportar los artefactos).
+        """
+        version = timezone.now().strftime("%Y%m%d-%H%M%S")
+        existing = set(self.versions())
+        suffix = 1
+        while (f"{version}-{suffix}" if suffix > 1 else version) in existing:
+            suffix += 1
+        if suffix > 1:
+            version = f"{version}-{suffix}"
+
+        path = os.path.join(self.bundles_path, version)
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        with open(os.path.join(tmp_path, VECTORIZER_FILE_NAME), "wb") as f:
+            pickle.dump(vectorizer, f)
+        for name, model in models.items():
+            with open(os.path.join(tmp_path, f"model_{name}.pkl"), "wb") as f:
+                pickle.dump(model, f)
+        export_results = export_artifacts(vectorizer, models, os.path.join(tmp_path, ARTIFACTS_DIR))
+
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": version,
+                "created_at": timezone.now().isoformat(),
+                "models": sorted(models),
+                "featurizer": describe_vectorizer(vectorizer),
+                "stats": stats,
+                "training_data": training_data,
+            }, f, indent=2)
+
+        # El manifiesto se escribe al final y el directorio se publica de una vez
+        os.replace(tmp_path, path)
+        return version, export_results
+
+    def stats(self):
+        bundle = self.current()
+        return {
+            **bundle.describe(),
+            "pointer": self.read_pointer(),
+            "swaps": self.swaps,
+            "available_versions": self.versions(),
+            "registry": bundle.models.stats(),
+        }
+
+
+bundle_manager = BundleManager(
+    memory_budget=settings.MODEL_REGISTRY["MEMORY_BUDGET_MB"] * 1024 * 1024,
+    use_artifacts=settings.MODEL_REGISTRY["USE_ARTIFACTS"],
+    check_interval=settings.MODEL_REGISTRY["BUNDLE_CHECK_INTERVAL"],
+    preload=settings.MODEL_REGISTRY["PRELOAD"],
+)
+
+
+def current_bundle():
+    return bundle_manager.current()
@@ -0,0 +1,125 @@
+import time
+import numpy as np
+from ml_models.predictor import ensemble_verdict, prediction_label
+
+# Holgura para no dar por decidido un veredicto que está justo en el umbral (0.5):
+# ahí el redondeo de sumas en distinto orden podría cambiarlo, y se evalúan más modelos
+DECISION_EPSILON = 1e-9
+
+
+def decided_verdict(votes, weights, pending):
+    """
+    Veredicto final si ya no depende de los modelos pendientes, o None.
+
+    El voto ponderado es Fake si `suma(peso · voto) / suma(pesos) >= 0.5`. Con los
+    votos conocidos, la puntuación final está entre el caso en que todos los
+    pendientes votan Real y el caso en que todos votan Fake: si ambos extremos
+    caen del mismo lado del umbral, el veredicto es seguro.
+    """
+    total_weight = sum(weights.get(name, 0) for name in list(votes) + list(pending))
+    if total_weight <= 0:
+        return "Real"
+    fake_weight = sum(weights.get(name, 0) * vote for name, vote in votes.items())
+    pending_weight = sum(weights.get(name, 0) for name in pending)
+
+    if fake_weight / total_weight >= 0.5 + DECISION_EPSILON:
+        return "Fake"
+    if (fake_weight + pending_weight) / total_weight < 0.5 - DECISION_EPSILON:
+        return "Real"
+    return None
+
+
+def cascade_stages(bundle, model_names, order):
+    """
+    Etapas de la cascada: primero todos los modelos lineales juntos (un solo
+    producto del `FusedLinearScorer`) y después el resto de uno en uno, en el
+    orden de coste de `order`. Los modelos que no aparecen en `order` van al final.
+    """
+    scorer = bundle.linear_scorer(model_names)
+    rank = {name: index for index, name in enumerate(order)}
+    remaining = sorted(
+        (name for name in model_names if name not in scorer),
+        key=lambda name: rank.get(name, len(rank)),
+    )
+    stages = [[name for name in model_names if name in scorer]] if len(scorer) else []
+    return stages + [[name] for name in remaining]
+
+
+def _stage_probabilities(bundle, stage, X):
+    scorer = bundle.linear_scorer(stage) if len(stage) > 1 else None
+    if scorer is not None and all(name in scorer for name in stage):
+        return scorer.predict_proba(X, stage), {name: scorer.classes[name] for name in stage}
+
+    probabilities = {}
+    classes = {}
+    for model_name in stage:
+        model = bundle.models.get(model_name)
+        if model is None:
+            continue
+        probabilities[model_name] = model.predict_proba(X)
+        classes[model_name] = np.asarray(model.classes_)
+    return probabilities, classes
+
+
+def cascade_predict(bundle, X, weights, model_names=None, order=(), min_confidence=None):
+    """
+    Predice un documento (X con una sola fila) evaluando los modelos de más barato a
+    más caro y parando en cuanto el veredicto del voto ponderado ya no puede cambiar.
+    Ese corte es exacto: el veredicto final es el mismo que con todos los modelos.
+
+    Con `min_confidence` se para también cuando todos los modelos evaluados coinciden
+    y cada uno da al menos esa probabilidad a su clase. Este corte es aproximado
+    (puede cambiar el veredicto) y su efecto se mide con `evalcascade`.
+
+    :return: Diccionario con las predicciones de los modelos evaluados, el veredicto,
+        la confianza (sobre los modelos evaluados), `evaluated_models`,
+        `skipped_models` y `cascade_stop` ("decided", "confident" o "exhausted").
+    """
+    if model_names is None:
+        model_names = bundle.models.available()
+    stages = cascade_stages(bundle, model_names, order)
+
+    predictions = {}
+    votes = {}
+    stop = "exhausted"
+    for index, stage in enumerate(stages):
+        start_time = time.perf_counter()
+        probabilities, classes = _stage_probabilities(bundle, stage, X)
+        elapsed = (time.perf_counter() - start_time) / max(len(probabilities), 1)
+
+        for model_name, proba in probabilities.items():
+            best = int(np.argmax(proba[0]))
+            votes[model_name] = int(classes[model_name][best])
+            predictions[model_name] = {
+                "prediction": prediction_label(votes[model_name]),
+                "probability": round(float(proba[0][best]), 4),
+                "accuracy": weights.get(model_name, 0),
+                "prediction_time": round(elapsed, 6),
+            }
+
+        pending = [name for later in stages[index + 1:] for name in later]
+        if not pending:
+            break
+        if decided_verdict(votes, weights, pending) is not None:
+            stop = "decided"
+            break
+        if min_confidence is not None and votes and len(set(votes.values())) == 1 and all(
+            predictions[name]["probability"] >= min_confidence for name in votes
+        ):
+            stop = "confident"
+            break
+
+    # Votos en el orden de `model_names`, como en el ensemble completo
+    ordered_votes = {name: votes[name] for name in model_names if name in votes}
+    final_prediction, confidence = ensemble_verdict(ordered_votes, weights)
+    if stop == "decided":
+        final_prediction = decided_verdict(ordered_votes, weights, [name for name in model_names if name not in votes])
+
+    return {
+        "predictions": {name: predictions[name] for name in ordered_votes},
+        "final_prediction": final_prediction,
+        "confidence": confidence,
+        "evaluated_models": list(ordered_votes),
+        "skipped_models": [name for name in model_names if name not in votes],
+        "cascade_stop": stop,
+    }
@@ -0,0 +1,181 @@
+"""
+Caché en disco de las etapas de `primetrain` que no dependen de los modelos.
+
+- Textos limpios del dataset, con clave: contenido de los archivos del dataset +
+  versión del preprocesamiento (`PREPROCESS_VERSION` y el código de processor.py).
+- Vectorizador ajustado y matrices documento-término de entrenamiento y prueba
+  (`.npz` comprimidos), con clave: la de los textos + configuración del
+  vectorizador + parámetros de la división entrenamiento/prueba.
+
+Cambiar solo los hiperparámetros de los modelos reutiliza ambas; cambiar el
+vectorizador reutiliza los textos limpios. Cada entrada es un directorio que se
+escribe aparte y se publica de una vez, y de cada tipo se guardan como máximo
+`max_entries`: al añadir una se borran las usadas hace más tiempo, así que las
+entradas obsoletas (con otro dataset o preprocesamiento) desaparecen solas.
+"""
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+from datasets.loader import file_digest
+from ml_models import processor
+from ml_models.processor import PREPROCESS_VERSION
+
+TEXTS_PREFIX = "texts-"
+MATRICES_PREFIX = "matrices-"
+META_FILE = "meta.json"
+
+
+def preprocess_fingerprint():
+    """
+    Versión del preprocesamiento: `PREPROCESS_VERSION` más el hash de processor.py,
+    para que un cambio en el código invalide la caché aunque no se suba la versión.
+    """
+    return f"{PREPROCESS_VERSION}-{file_digest(processor.__file__)[:12]}"
+
+
+def vectorizer_config(vectorizer):
+    """
+    Configuración del vectorizador sin ajustar (clase y parámetros) como texto estable.
+    """
+    return json.dumps({"class": type(vectorizer).__name__, **vectorizer.get_params()}, sort_keys=True, default=repr)
+
+
+def _key(*parts):
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:24]
+
+
+class FeatureCache:
+    def __init__(self, path, max_entries=4):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def texts_key(self, files):
+        """
+        :param files: Archivos del dataset; cuenta su nombre y contenido, no su fecha.
+        """
+        files = sorted(files, key=os.path.basename)
+        return _key(preprocess_fingerprint(), *(f"{os.path.basename(path)}:{file_digest(path)}" for path in files))
+
+    def matrices_key(self, texts_key, vectorizer, split):
+        """
+        :param split: Parámetros de la división entrenamiento/prueba (test_size, random_state).
+        """
+        return _key(texts_key, vectorizer_config(vectorizer), json.dumps(split, sort_keys=True))
+
+    def _entry_path(self, prefix, key):
+        return os.path.join(self.path, f"{prefix}{key}")
+
+    def _open(self, prefix, key, reader):
+        entry_path = self._entry_path(prefix, key)
+        if not os.path.isfile(os.path.join(entry_path, META_FILE)):
+            self.misses += 1
+            return None
+        try:
+            value = reader(entry_path)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError) as e:
+            print(f"Error leyendo la caché de características {entry_path}: {e}")
+            shutil.rmtree(entry_path, ignore_errors=True)
+            self.misses += 1
+            return None
+        # La fecha de modificación marca el último uso para el desalojo LRU
+        os.utime(entry_path)
+        self.hits += 1
+        return value
+
+    def _save(self, prefix, key, meta, writer):
+        entry_path = self._entry_path(prefix, key)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        writer(tmp_path)
+        with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"key": key, **meta}, f, indent=2)
+
+        shutil.rmtree(entry_path, ignore_errors=True)
+        os.replace(tmp_path, entry_path)
+        self.evict(prefix)
+        return entry_path
+
+    def load_texts(self, key):
+        """
+        :return: Tupla (textos limpios, etiquetas) o None si no está en caché.
+        """
+        def read(entry_path):
+            with gzip.open(os.path.join(entry_path, "texts.json.gz"), "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            return data["texts"], np.asarray(data["labels"])
+        return self._open(TEXTS_PREFIX, key, read)
+
+    def save_texts(self, key, texts, labels):
+        def write(entry_path):
+            with gzip.open(os.path.join(entry_path, "texts.json.gz"), "wt", encoding="utf-8") as f:
+                json.dump({"texts": list(texts), "labels": [int(label) for label in labels]}, f, ensure_ascii=False)
+        return self._save(TEXTS_PREFIX, key, {"documents": len(texts), "preprocess": preprocess_fingerprint()}, write)
+
+    def load_matrices(self, key):
+        """
+        :return: Diccionario con `vectorizer` (ajustado), `X_train`, `X_test`,
+            `y_train` e `y_test`, o None si no está en caché.
+        """
+        def read(entry_path):
+            with open(os.path.join(entry_path, "vectorizer.pkl"), "rb") as f:
+                vectorizer = pickle.load(f)
+            return {
+                "vectorizer": vectorizer,
+                "X_train": sp.load_npz(os.path.join(entry_path, "X_train.npz")).tocsr(),
+                "X_test": sp.load_npz(os.path.join(entry_path, "X_test.npz")).tocsr(),
+                "y_train": np.load(os.path.join(entry_path, "y_train.npy"), allow_pickle=False),
+                "y_test": np.load(os.path.join(entry_path, "y_test.npy"), allow_pickle=False),
+            }
+        return self._open(MATRICES_PREFIX, key, read)
+
+    def save_matrices(self, key, vectorizer, X_train, X_test, y_train, y_test):
+        def write(entry_path):
+            with open(os.path.join(entry_path, "vectorizer.pkl"), "wb") as f:
+                pickle.dump(vectorizer, f)
+            sp.save_npz(os.path.join(entry_path, "X_train.npz"), sp.csr_matrix(X_train), compressed=True)
+            sp.save_npz(os.path.join(entry_path, "X_test.npz"), sp.csr_matrix(X_test), compressed=True)
+            np.save(os.path.join(entry_path, "y_train.npy"), np.asarray(y_train), allow_pickle=False)
+            np.save(os.path.join(entry_path, "y_test.npy"), np.asarray(y_test), allow_pickle=False)
+        meta = {"train_shape": list(X_train.shape), "test_shape": list(X_test.shape), "vectorizer": vectorizer_config(vectorizer)}
+        return self._save(MATRICES_PREFIX, key, meta, write)
+
+    def entries(self, prefix):
+        """
+        Entradas completas de un tipo, de la usada hace más tiempo a la más reciente.
+        """
+        if not os.path.isdir(self.path):
+            return []
+        paths = [
+            os.path.join(self.path, name) for name in os.listdir(self.path)
+            if name.startswith(prefix) and os.path.isfile(os.path.join(self.path, name, META_FILE))
+        ]
+        return sorted(paths, key=os.path.getmtime)
+
+    def evict(self, prefix):
+        """
+        Borra las entradas usadas hace más tiempo por encima de `max_entries` (0 = sin límite).
+
+        :return: Número de entradas borradas.
+        """
+        entries = self.entries(prefix)
+        if not self.max_entries or len(entries) <= self.max_entries:
+            return 0
+        stale = entries[:len(entries) - self.max_entries]
+        for entry_path in stale:
+            shutil.rmtree(entry_path, ignore_errors=True)
+        return len(stale)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+feature_cache = FeatureCache(settings.FEATURE_CACHE["PATH"], settings.FEATURE_CACHE["MAX_ENTRIES"])
@@ -0,0 +1,39 @@
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+
+FEATURIZERS = ("count", "hashing")
+DEFAULT_HASH_FEATURES = 2 ** 18
+
+
+def build_vectorizer(featurizer="count", n_features=DEFAULT_HASH_FEATURES):
+    """
+    Crea el vectorizador de entrenamiento.
+
+    - "count": `CountVectorizer` con vocabulario ajustado sobre el corpus.
+    - "hashing": `HashingVectorizer` sin estado; cada término va a la columna
+      `hash(término) % n_features`, así que no hay vocabulario que ajustar,
+      guardar ni deserializar. Devuelve conteos en float32 (sin signo alterno ni
+      normalización) para que los modelos reciban lo mismo que con "count",
+      incluido Naive Bayes, que necesita valores no negativos.
+    """
+    if featurizer == "hashing":
+        return HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None, dtype=np.float32)
+    if featurizer == "count":
+        return CountVectorizer()
+    raise ValueError(f"Featurizer desconocido: {featurizer}. Opciones: {', '.join(FEATURIZERS)}")
+
+
+def describe_vectorizer(vectorizer):
+    """
+    Tipo, número de columnas y dtype del vectorizador (pickle, artefacto mapeado o hashing).
+    """
+    if isinstance(vectorizer, HashingVectorizer):
+        kind = "hashing"
+        n_features = vectorizer.n_features
+    else:
+        kind = "count"
+        n_features = getattr(vectorizer, "n_features", None)
+        if n_features is None and hasattr(vectorizer, "vocabulary_"):
+            n_features = len(vectorizer.vocabulary_)
+    dtype = getattr(vectorizer, "dtype", np.int64)
+    return {"kind": kind, "n_features": n_features, "dtype": np.dtype(dtype).name}
@@ -0,0 +1,163 @@
+import multiprocessing
+import multiprocessing.connection
+import os
+import time
+import traceback
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics import accuracy_score
+from threadpoolctl import threadpool_limits
+from ml_models.memory import reset_peak_rss, resident_memory
+
+# Documentos de validación con los que se mide la latencia de una predicción individual
+LATENCY_SAMPLE = 100
+
+# Módulos que el servidor de procesos importa una sola vez: cada modelo arranca en
+# un proceso nuevo, pero sin pagar de nuevo la importación de sklearn y xgboost
+PRELOAD_MODULES = [
+    "ml_models.fitting", "sklearn.ensemble", "sklearn.linear_model", "sklearn.naive_bayes",
+    "sklearn.neural_network", "xgboost",
+]
+
+
+def save_shared_matrix(X, directory):
+    """
+    Guarda una matriz CSR como arrays `.npy` planos para que los procesos de
+    entrenamiento la abran mapeada en memoria en lugar de recibir cada uno su copia.
+    Los datos se guardan en float64, el tipo con el que trabajan los modelos, para
+    que no tengan que convertirla.
+
+    :return: Descripción de la matriz para `open_shared_matrix`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    X = sp.csr_matrix(X)
+    for name, array in (("data", X.data.astype(np.float64)), ("indices", X.indices), ("indptr", X.indptr)):
+        np.save(os.path.join(directory, f"{name}.npy"), array, allow_pickle=False)
+    return {"path": directory, "shape": X.shape}
+
+
+def open_shared_matrix(spec):
+    """
+    Abre una matriz guardada con `save_shared_matrix`. El mapeo es copy-on-write
+    (`mmap_mode="c"`): las páginas se comparten entre procesos a través de la caché
+    del sistema operativo y, si un modelo ordena los índices en su sitio, solo se
+    copian las páginas que escribe.
+    """
+    arrays = [
+        np.load(os.path.join(spec["path"], f"{name}.npy"), mmap_mode="c", allow_pickle=False)
+        for name in ("data", "indices", "indptr")
+    ]
+    return sp.csr_matrix(tuple(arrays), shape=tuple(spec["shape"]), copy=False)
+
+
+def _limit_threads(model, threads):
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=threads)
+    return model
+
+
+def _empty_report(name):
+    return {
+        "name": name, "model": None, "accuracy": None, "fit_time": None, "batch_latency": None,
+        "single_latency": None, "base_memory": None, "peak_memory": None, "error": None, "traceback": None,
+    }
+
+
+def fit_and_evaluate(name, model, train_spec, test_spec, y_train, y_test, threads=1):
+    """
+    Entrena y evalúa un modelo. Se ejecuta en su propio proceso: los errores se
+    devuelven en el informe en lugar de propagarse, para que un modelo que falla no
+    interrumpa a los demás.
+
+    :return: Diccionario con el modelo entrenado (o None), la precisión, el tiempo de
+        entrenamiento, la latencia de predicción (por documento en lote y mediana
+        de un documento suelto), la memoria del proceso antes de entrenar y su
+        máximo, y el error con su traza.
+    """
+    report = _empty_report(name)
+    reset_peak_rss()
+    report["base_memory"] = resident_memory("VmRSS")
+    try:
+        X_train = open_shared_matrix(train_spec)
+        X_test = open_shared_matrix(test_spec)
+        with threadpool_limits(limits=threads):
+            _limit_threads(model, threads)
+            start_time = time.perf_counter()
+            model.fit(X_train, y_train)
+            report["fit_time"] = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            y_pred = model.predict(X_test)
+            report["batch_latency"] = (time.perf_counter() - start_time) / max(X_test.shape[0], 1)
+
+            single = []
+            for index in range(min(LATENCY_SAMPLE, X_test.shape[0])):
+                row = X_test[index]
+                start_time = time.perf_counter()
+                model.predict(row)
+                single.append(time.perf_counter() - start_time)
+            report["single_latency"] = float(np.median(single)) if single else None
+
+        report["accuracy"] = accuracy_score(y_test, y_pred)
+        report["model"] = model
+    except Exception as e:
+        report["error"] = f"{type(e).__name__}: {e}"
+        report["traceback"] = traceback.format_exc()
+    report["peak_memory"] = resident_memory("VmHWM")
+    return report
+
+
+def _fit_in_child(connection, args):
+    connection.send(fit_and_evaluate(*args))
+    connection.close()
+
+
+def fit_models(models, train_spec, test_spec, y_train, y_test, workers=1, threads=1, on_report=None):
+    """
+    Entrena varios modelos a la vez, cada uno en un proceso nuevo: su memoria
+    máxima es solo suya y, si el proceso muere (p. ej. por falta de memoria), solo
+    falla ese modelo (un `ProcessPoolExecutor` se rompería entero). Todos leen las
+    mismas matrices mapeadas en memoria.
+
+    :param models: Diccionario {nombre: modelo sin entrenar}.
+    :param workers: Modelos entrenados a la vez.
+    :param threads: Hilos de BLAS/OpenMP y `n_jobs` de cada modelo.
+    :param on_report: Función llamada con cada informe según termina.
+    :return: Diccionario {nombre: informe de `fit_and_evaluate`}, en el orden de `models`.
+    """
+    y_train = np.asarray(y_train)
+    y_test = np.asarray(y_test)
+    # forkserver: procesos limpios, sin heredar hilos ni memoria del proceso principal
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(PRELOAD_MODULES)
+    pending = list(models.items())
+    running = {}
+    reports = {}
+
+    while pending or running:
+        while pending and len(running) < max(workers, 1):
+            name, model = pending.pop(0)
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_fit_in_child, name=f"fit-{name}",
+                args=(sender, (name, model, train_spec, test_spec, y_train, y_test, threads)),
+            )
+            process.start()
+            # Sin esta copia abierta, recv() detecta la muerte del hijo (EOFError)
+            sender.close()
+            running[receiver] = (name, process)
+
+        for receiver in multiprocessing.connection.wait(list(running)):
+            name, process = running.pop(receiver)
+            try:
+                report = receiver.recv()
+            except EOFError:
+                process.join()
+                report = {**_empty_report(name), "error": f"El proceso terminó con código {process.exitcode}"}
+            process.join()
+            receiver.close()
+            reports[name] = report
+            if on_report is not None:
+                on_report(report)
+
+    return {name: reports[name] for name in models}
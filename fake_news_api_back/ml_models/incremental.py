@@ -0,0 +1,109 @@
+import zlib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.neural_network import MLPClassifier
+from datasets.loader import LABELS
+from ml_models.processor import preprocess_texts
+
+
+def build_incremental_models():
+    """
+    Modelos nuevos que se pueden entrenar por fragmentos con `partial_fit`. La
+    regresión logística se sustituye por un `SGDClassifier` con pérdida logística
+    (mismo modelo, ajustado por descenso de gradiente); los bosques y XGBoost no
+    tienen `partial_fit` y se quedan fuera.
+    """
+    return {
+        "logistic": SGDClassifier(loss="log_loss", random_state=42),
+        "naive_bayes": MultinomialNB(),
+        "neural_network": MLPClassifier(hidden_layer_sizes=(100,), random_state=42),
+    }
+
+
+def supports_partial_fit(model):
+    return model is not None and hasattr(model, "partial_fit")
+
+
+def is_holdout(text, fraction):
+    """
+    Decide de forma estable (por el hash del texto) si un documento se reserva
+    para validación: el mismo texto cae siempre del mismo lado en todas las
+    pasadas y ejecuciones, sin guardar los índices.
+    """
+    return fraction > 0 and zlib.crc32(text.encode("utf-8")) % 10000 < fraction * 10000
+
+
+class IncrementalTrainer:
+    """
+    Entrena modelos con `partial_fit` fragmento a fragmento. Solo hay en memoria un
+    fragmento y su matriz documento-término, así que el vectorizador debe estar ya
+    ajustado o no tener estado (hashing).
+
+    Mide la precisión de dos formas:
+    - Validación progresiva: cada fragmento se predice antes de entrenar con él,
+      así que cada documento se evalúa con un modelo que aún no lo ha visto.
+    - Reserva: los documentos marcados por `is_holdout` no se entrenan nunca y se
+      evalúan al final con `evaluate_chunk`.
+    """
+
+    def __init__(self, vectorizer, models, holdout=0.2):
+        self.vectorizer = vectorizer
+        self.models = models
+        self.holdout = holdout
+        self.documents = 0
+        self.progressive = {name: [0, 0] for name in models}
+        self.holdout_scores = {name: [0, 0] for name in models}
+
+    def _vectorize(self, chunk, holdout):
+        mask = np.array([is_holdout(text, self.holdout) == holdout for text in chunk["text"]], dtype=bool)
+        texts = chunk["text"][mask]
+        labels = chunk["label"].to_numpy()[mask]
+        if not len(labels):
+            return None, labels
+        return self.vectorizer.transform(list(preprocess_texts(texts))), labels
+
+    def fit_chunk(self, chunk, progressive=True):
+        """
+        Entrena todos los modelos con las filas del fragmento que no son de reserva.
+
+        :param progressive: Si se mide la validación progresiva antes de entrenar.
+        """
+        X, labels = self._vectorize(chunk, holdout=False)
+        if X is None:
+            return
+        self.documents += len(labels)
+        for name, model in self.models.items():
+            if progressive and hasattr(model, "classes_"):
+                scores = self.progressive[name]
+                scores[0] += int(np.sum(model.predict(X) == labels))
+                scores[1] += len(labels)
+            model.partial_fit(X, labels, classes=np.array(LABELS))
+
+    def evaluate_chunk(self, chunk):
+        X, labels = self._vectorize(chunk, holdout=True)
+        if X is None:
+            return
+        for name, model in self.models.items():
+            scores = self.holdout_scores[name]
+            scores[0] += int(np.sum(model.predict(X) == labels))
+            scores[1] += len(labels)
+
+    def accuracy(self, progressive=True):
+        """
+        Precisión de cada modelo: la de reserva si hay documentos de reserva y, si
+        no, la progresiva. Los modelos sin documentos evaluados no aparecen.
+
+        :param progressive: Si se usa la validación progresiva cuando no hay reserva.
+        """
+        results = {}
+        for name in self.models:
+            if self.holdout_scores[name][1]:
+                correct, total = self.holdout_scores[name]
+            elif progressive:
+                correct, total = self.progressive[name]
+            else:
+                continue
+            if total:
+                results[name] = correct / total
+        return results
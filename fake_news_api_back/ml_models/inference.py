@@ -0,0 +1,90 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from threadpoolctl import threadpool_limits
+
+
+class InferencePool:
+    """
+    Pool acotado de hilos para evaluar los modelos de un ensemble a la vez.
+
+    Sirve porque las partes caras de cada `predict` (productos dispersos de scipy,
+    BLAS, el recorrido de árboles de sklearn y el predictor de XGBoost) liberan el
+    GIL. Para no sobresuscribir la CPU (hilos del pool × hilos de BLAS/OpenMP ×
+    workers de gunicorn), en la primera tarea se limitan los hilos de BLAS con
+    threadpoolctl, también si se ejecuta en serie, y los modelos con paralelismo propio se ajustan al cargarlos
+    (ver `limit_model_threads`).
+    """
+
+    def __init__(self, workers=4, blas_threads=1):
+        self.workers = workers
+        self.blas_threads = blas_threads
+        self._executor = None
+        self._limits = None
+        self._lock = threading.Lock()
+
+    def _limit_blas(self):
+        if not self.blas_threads or self._limits is not None:
+            return
+        with self._lock:
+            if self._limits is None:
+                # Límite global del proceso; se guarda la referencia para que no se revierta
+                self._limits = threadpool_limits(limits=self.blas_threads, user_api="blas")
+
+    def _ensure_started(self):
+        if self._executor is not None:
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+    def run(self, tasks):
+        """
+        Ejecuta las tareas en paralelo y mide cada una.
+
+        :param tasks: Diccionario {nombre: función sin argumentos}.
+        :return: Diccionario {nombre: (resultado, segundos)}, en el orden de `tasks`.
+        """
+        def timed(task):
+            start_time = time.perf_counter()
+            result = task()
+            return result, time.perf_counter() - start_time
+
+        self._limit_blas()
+        if self.workers <= 1 or len(tasks) <= 1:
+            return {name: timed(task) for name, task in tasks.items()}
+
+        self._ensure_started()
+        futures = {name: self._executor.submit(timed, task) for name, task in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "blas_threads": self.blas_threads,
+            "blas_limited": self._limits is not None,
+            "started": self._executor is not None,
+        }
+
+
+def limit_model_threads(model):
+    """
+    Ajusta los hilos internos de un modelo recién cargado: XGBoost a
+    `INFERENCE["XGBOOST_THREADS"]` y los bosques de sklearn a un solo job, porque el
+    paralelismo ya lo pone el pool.
+    """
+    params = getattr(model, "get_params", lambda: {})()
+    if "n_jobs" not in params:
+        return model
+    if type(model).__name__ == "XGBClassifier":
+        model.set_params(n_jobs=settings.INFERENCE["XGBOOST_THREADS"])
+    else:
+        model.set_params(n_jobs=1)
+    return model
+
+
+inference_pool = InferencePool(
+    workers=settings.INFERENCE["WORKERS"],
+    blas_threads=settings.INFERENCE["BLAS_THREADS"],
+)
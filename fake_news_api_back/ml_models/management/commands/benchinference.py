@@ -0,0 +1,275 @@
+import gc
+import json
+import os
+import platform
+import time
+import numpy as np
+import pandas as pd
+import sklearn
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from datasets.loader import DATASET_PATH
+from ml_models.bundles import bundle_manager
+from ml_models.memory import reset_peak_rss, resident_memory
+from ml_models.processor import preprocess_text, preprocess_texts
+from ml_models.scoring import predict_models
+
+BENCH_FORMAT_VERSION = 2
+# Métricas comparadas con la línea base: (métrica, True si más alto es peor). Son
+# medianas entre pasadas, que varían mucho menos que los percentiles de una sola
+COMPARED_METRICS = (("pass_p50_ms", True), ("pass_p95_ms", True), ("docs_per_second", False))
+# Pasadas mínimas para comparar con una línea base
+MIN_BASELINE_REPEAT = 3
+# Datos de `meta` que deben coincidir con la línea base (si no, la comparación no vale)
+# y datos del entorno que solo se avisan si cambian
+WORKLOAD_META = ("bundle", "models", "documents", "batch_size", "warmup", "repeat")
+ENVIRONMENT_META = ("python", "platform", "cpu_count", "numpy", "sklearn", "inference", "use_artifacts")
+
+class Command(BaseCommand):
+    help = (
+        "Mide la ruta de inferencia (preprocess_text, vectorizador y cada modelo del bundle, documento a "
+        "documento y por lotes) sobre datasets/raw/test.csv: latencias p50/p95/p99, docs/s y memoria máxima. "
+        "Puede guardar los resultados en JSON y compararlos con una línea base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bundle", default=None,
+            help="Bundle de modelos a medir. Por defecto, el activo (o los modelos sueltos de ml_models/).",
+        )
+        parser.add_argument("--limit", type=int, default=0, help="Máximo de documentos de test.csv (0 = todos).")
+        parser.add_argument("--batch-size", type=int, default=100, help="Documentos por lote en el modo por lotes.")
+        parser.add_argument(
+            "--repeat", type=int, default=3,
+            help=f"Pasadas medidas por etapa (al menos {MIN_BASELINE_REPEAT} con --baseline).",
+        )
+        parser.add_argument("--warmup", type=int, default=20, help="Documentos de calentamiento por etapa (no se miden).")
+        parser.add_argument("-o", "--output", default=None, help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument("--baseline", default=None, help="JSON de una ejecución anterior con el que comparar.")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.25,
+            help="Empeoramiento relativo admitido frente a la línea base antes de contarlo como regresión.",
+        )
+        parser.add_argument(
+            "--min-delta-ms", type=float, default=0.1,
+            help="Diferencia mínima de latencia (ms) para contar una regresión; por debajo es ruido.",
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = max(options["repeat"], 1)
+        baseline = None
+        if options["baseline"]:
+            if self.repeat < MIN_BASELINE_REPEAT:
+                raise CommandError(
+                    f"❌ Con --baseline hacen falta al menos {MIN_BASELINE_REPEAT} pasadas (--repeat): "
+                    "con menos, el ruido entre ejecuciones se confunde con regresiones."
+                )
+            with open(options["baseline"], encoding="utf-8") as f:
+                baseline = json.load(f)
+            if baseline.get("format_version") != BENCH_FORMAT_VERSION:
+                raise CommandError(f"❌ Formato de línea base no soportado: {baseline.get('format_version')}")
+
+        try:
+            bundle = bundle_manager.open(options["bundle"] or bundle_manager.read_pointer())
+        except ValueError as e:
+            raise CommandError(f"❌ {e}")
+
+        texts = pd.read_csv(os.path.join(DATASET_PATH, "test.csv"))["text"].tolist()
+        if options["limit"]:
+            texts = texts[:options["limit"]]
+        bundle.models.preload()
+        model_names = bundle.models.available()
+        meta = self.environment(bundle, texts, options)
+        if baseline is not None:
+            # Antes de medir: una línea base de otra carga de trabajo no se puede comparar
+            self.check_meta(baseline["meta"], meta)
+        self.stdout.write(
+            f"🔄 {len(texts)} documentos de test.csv · bundle {bundle.version} · modelos: {', '.join(model_names)}"
+        )
+
+        results = {
+            "single": self.run_single(bundle, model_names, texts, options["warmup"]),
+            "batch": self.run_batch(bundle, model_names, texts, options["batch_size"], options["warmup"]),
+        }
+        report = {
+            "format_version": BENCH_FORMAT_VERSION,
+            "meta": meta,
+            "results": results,
+        }
+        self.write_results(results)
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"💾 Resultados guardados en {options['output']}")
+
+        if baseline is not None:
+            regressions = self.compare(baseline, report, options["tolerance"], options["min_delta_ms"])
+            if regressions:
+                raise CommandError(f"❌ {len(regressions)} regresiones frente a {options['baseline']}: {', '.join(regressions)}")
+            self.stdout.write(self.style.SUCCESS(f"✅ Sin regresiones frente a {options['baseline']}."))
+
+    # -----------------------------------------------------------------------
+    # Medidas
+    # -----------------------------------------------------------------------
+
+    def measure(self, function, inputs, documents_per_input, warmup):
+        """
+        Aplica `function` a cada entrada, `self.repeat` veces, y mide cada llamada.
+        Antes se calienta con las primeras entradas y se pone a cero el máximo de
+        memoria residente, para que el pico sea el de esta etapa. Los percentiles
+        p50/p95/p99 usan todas las llamadas; `pass_p50_ms`, `pass_p95_ms` y los
+        docs/s son la mediana entre pasadas, y son los que se comparan con la línea base.
+
+        :return: Tupla (resultados de la última pasada, métricas).
+        """
+        for item in inputs[:warmup]:
+            function(item)
+        gc.collect()
+        reset_peak_rss()
+        start_memory = resident_memory("VmRSS")
+
+        passes = []
+        for _ in range(self.repeat):
+            outputs = []
+            pass_latencies = []
+            for item in inputs:
+                start_time = time.perf_counter()
+                outputs.append(function(item))
+                pass_latencies.append(time.perf_counter() - start_time)
+            passes.append(np.asarray(pass_latencies) * 1000)
+
+        latencies = np.concatenate(passes)
+        documents = sum(documents_per_input(item) for item in inputs)
+        pass_time = float(np.median([pass_latencies.sum() for pass_latencies in passes])) / 1000
+        peak_memory = resident_memory("VmHWM")
+        return outputs, {
+            "calls": len(latencies),
+            "documents": documents,
+            "mean_ms": float(latencies.mean()),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "pass_p50_ms": float(np.median([np.percentile(pass_latencies, 50) for pass_latencies in passes])),
+            "pass_p95_ms": float(np.median([np.percentile(pass_latencies, 95) for pass_latencies in passes])),
+            "docs_per_second": documents / pass_time if pass_time else 0.0,
+            "peak_rss_mb": peak_memory / 2 ** 20,
+            "rss_growth_mb": (peak_memory - start_memory) / 2 ** 20,
+        }
+
+    def run_single(self, bundle, model_names, texts, warmup):
+        self.stdout.write("🔄 Modo documento a documento...")
+        one = lambda item: 1
+        results = {}
+        clean_texts, results["preprocess"] = self.measure(preprocess_text, texts, one, warmup)
+        rows, results["vectorize"] = self.measure(lambda text: bundle.vectorizer.transform([text]), clean_texts, one, warmup)
+        for model_name in model_names:
+            model = bundle.models.get(model_name)
+            _, results[f"model:{model_name}"] = self.measure(model.predict, rows, one, warmup)
+        _, results["ensemble"] = self.measure(lambda row: predict_models(bundle, model_names, row), rows, one, warmup)
+        return results
+
+    def run_batch(self, bundle, model_names, texts, batch_size, warmup):
+        self.stdout.write(f"🔄 Modo por lotes de {batch_size} documentos...")
+        batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        warmup_batches = max(1, warmup // batch_size)
+        results = {}
+        clean_batches, results["preprocess"] = self.measure(
+            lambda batch: list(preprocess_texts(batch)), batches, len, warmup_batches,
+        )
+        matrices, results["vectorize"] = self.measure(bundle.vectorizer.transform, clean_batches, len, warmup_batches)
+        rows = lambda X: X.shape[0]
+        for model_name in model_names:
+            model = bundle.models.get(model_name)
+            _, results[f"model:{model_name}"] = self.measure(model.predict, matrices, rows, warmup_batches)
+        _, results["ensemble"] = self.measure(lambda X: predict_models(bundle, model_names, X), matrices, rows, warmup_batches)
+        return results
+
+    def environment(self, bundle, texts, options):
+        return {
+            "created_at": timezone.now().isoformat(),
+            "bundle": bundle.version,
+            "models": bundle.models.available(),
+            "documents": len(texts),
+            "batch_size": options["batch_size"],
+            "warmup": options["warmup"],
+            "repeat": self.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "inference": dict(settings.INFERENCE),
+            "use_artifacts": settings.MODEL_REGISTRY["USE_ARTIFACTS"],
+        }
+
+    # -----------------------------------------------------------------------
+    # Salida
+    # -----------------------------------------------------------------------
+
+    def write_results(self, results):
+        for mode, stages in results.items():
+            self.stdout.write(f"\n📊 {'Documento a documento' if mode == 'single' else 'Por lotes'} (ms por llamada)")
+            self.stdout.write(
+                f"   {'etapa':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'docs/s':>12}{'pico MB':>10}{'+MB':>8}"
+            )
+            for stage, metrics in stages.items():
+                self.stdout.write(
+                    f"   {stage:<24}{metrics['p50_ms']:>9.3f}{metrics['p95_ms']:>9.3f}{metrics['p99_ms']:>9.3f}"
+                    f"{metrics['docs_per_second']:>12,.0f}{metrics['peak_rss_mb']:>10.1f}{metrics['rss_growth_mb']:>8.1f}"
+                )
+
+    def call_ms(self, metrics):
+        """
+        Tiempo medio por llamada (ms) de la pasada mediana, a partir de los docs/s.
+        """
+        calls_per_pass = metrics["calls"] / self.repeat
+        return 1000 * metrics["documents"] / metrics["docs_per_second"] / calls_per_pass if metrics["docs_per_second"] else 0.0
+
+    def check_meta(self, baseline_meta, meta):
+        """
+        Rechaza una línea base medida con otra carga de trabajo (bundle, modelos,
+        documentos, lote, calentamiento o pasadas) y avisa si cambia el entorno.
+        """
+        mismatched = [key for key in WORKLOAD_META if baseline_meta.get(key) != meta[key]]
+        if mismatched:
+            raise CommandError("❌ La línea base no es comparable: " + ", ".join(
+                f"{key} {baseline_meta.get(key)} ≠ {meta[key]}" for key in mismatched
+            ))
+        for key in ENVIRONMENT_META:
+            if baseline_meta.get(key) != meta[key]:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️ El entorno ha cambiado ({key}: {baseline_meta.get(key)} → {meta[key]})."
+                ))
+
+    def compare(self, baseline, report, tolerance, min_delta_ms):
+        """
+        Compara cada etapa presente en ambas ejecuciones con las medianas entre
+        pasadas. Una latencia es regresión si supera la de la línea base en más de
+        `tolerance` (relativo) y `min_delta_ms`; el rendimiento (docs/s), si baja
+        más de `tolerance` y el tiempo medio por llamada sube más de `min_delta_ms`.
+
+        :return: Lista de regresiones ("modo/etapa/métrica").
+        """
+        regressions = []
+        self.stdout.write(f"\n🔍 Comparación con la línea base (tolerancia {tolerance:.0%})")
+        for mode, stages in report["results"].items():
+            for stage, metrics in stages.items():
+                reference = baseline["results"].get(mode, {}).get(stage)
+                if reference is None:
+                    continue
+                changes = []
+                for metric, higher_is_worse in COMPARED_METRICS:
+                    before, after = reference[metric], metrics[metric]
+                    change = (after - before) / before if before else 0.0
+                    if higher_is_worse:
+                        regressed = change > tolerance and after - before > min_delta_ms
+                    else:
+                        # El mismo umbral en ms, sobre el tiempo medio por llamada de la pasada
+                        regressed = change < -tolerance and self.call_ms(metrics) - self.call_ms(reference) > min_delta_ms
+                    if regressed:
+                        regressions.append(f"{mode}/{stage}/{metric}")
+                    changes.append(f"{metric} {change:+.1%}{' ❌' if regressed else ''}")
+                self.stdout.write(f"   {mode}/{stage:<24} {' · '.join(changes)}")
+        return regressions
@@ -0,0 +1,43 @@
+import glob
+import os
+import time
+import pandas as pd
+from django.core.management.base import BaseCommand
+from datasets.loader import DATASET_PATH
+from ml_models.processor import preprocess_texts, preprocess_text_nltk
+
+class Command(BaseCommand):
+    help = "Compara el rendimiento (docs/s) de preprocess_texts frente a la implementación original con NLTK."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por implementación (se usa la mejor).")
+        parser.add_argument("--limit", type=int, default=None, help="Número máximo de textos a procesar.")
+
+    def handle(self, *args, **options):
+        texts = []
+        for file_path in sorted(glob.glob(os.path.join(DATASET_PATH, "*.csv"))):
+            texts.extend(pd.read_csv(file_path)["text"].tolist())
+        if options["limit"]:
+            texts = texts[:options["limit"]]
+
+        self.stdout.write(f"🔄 Corpus: {len(texts)} textos de {DATASET_PATH}")
+
+        def best_time(function):
+            timings = []
+            for _ in range(options["repeat"]):
+                start_time = time.perf_counter()
+                output = function()
+                timings.append(time.perf_counter() - start_time)
+            return min(timings), output
+
+        nltk_time, nltk_output = best_time(lambda: [preprocess_text_nltk(text) for text in texts])
+        batch_time, batch_output = best_time(lambda: list(preprocess_texts(texts)))
+
+        if nltk_output != batch_output:
+            mismatches = sum(1 for a, b in zip(nltk_output, batch_output) if a != b)
+            self.stderr.write(self.style.ERROR(f"❌ Las salidas difieren en {mismatches} textos."))
+            return
+
+        self.stdout.write(f"📊 NLTK (original): {len(texts) / nltk_time:,.0f} docs/s ({nltk_time:.3f}s)")
+        self.stdout.write(f"📊 preprocess_texts: {len(texts) / batch_time:,.0f} docs/s ({batch_time:.3f}s)")
+        self.stdout.write(self.style.SUCCESS(f"✅ Salidas idénticas. Aceleración: x{nltk_time / batch_time:.2f}"))
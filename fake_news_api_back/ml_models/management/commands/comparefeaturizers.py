@@ -0,0 +1,92 @@
+import pickle
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.naive_bayes import MultinomialNB
+from datasets.loader import load_dataset
+from ml_models.featurizers import DEFAULT_HASH_FEATURES, build_vectorizer, describe_vectorizer
+from ml_models.parallel import parallel_preprocess
+
+class Command(BaseCommand):
+    help = (
+        "Compara el CountVectorizer con el vectorizador de hashing: tamaño del pickle, tiempo "
+        "de carga, memoria, velocidad de transform y precisión de los modelos lineales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hash-features", default=str(DEFAULT_HASH_FEATURES),
+            help="Columnas del vectorizador de hashing; varias separadas por comas.",
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Repeticiones de las medidas de tiempo (se usa la mejor).")
+        parser.add_argument("--workers", type=int, default=1, help="Procesos para el preprocesamiento.")
+
+    def handle(self, *args, **options):
+        # Mismo reparto que primetrain
+        df = load_dataset(columns=["text"])
+        texts = parallel_preprocess(df["text"], workers=options["workers"])
+        X_train, X_test, y_train, y_test = train_test_split(texts, df["label"], test_size=0.2, random_state=42)
+        self.stdout.write(f"🔄 {len(X_train)} textos de entrenamiento y {len(X_test)} de validación.")
+
+        candidates = [("count", build_vectorizer("count"))]
+        for n_features in options["hash_features"].split(","):
+            candidates.append((f"hashing {n_features}", build_vectorizer("hashing", int(n_features))))
+
+        self.stdout.write(
+            f"{'featurizer':<16}{'columnas':>10}{'pickle KB':>11}{'carga ms':>10}{'memoria KB':>12}"
+            f"{'ajuste ms':>11}{'docs/s':>10}{'matriz KB':>11}{'logistic':>10}{'naive_bayes':>13}"
+        )
+        for name, vectorizer in candidates:
+            row = self.measure(vectorizer, X_train, X_test, y_train, y_test, options["repeat"])
+            self.stdout.write(
+                f"{name:<16}{row['n_features']:>10}{row['pickle_bytes'] / 1024:>11.1f}{row['load_time'] * 1000:>10.3f}"
+                f"{row['memory_bytes'] / 1024:>12.1f}{row['fit_time'] * 1000:>11.1f}{row['docs_per_second']:>10,.0f}"
+                f"{row['matrix_bytes'] / 1024:>11.1f}{row['accuracy']['logistic']:>10.4f}{row['accuracy']['naive_bayes']:>13.4f}"
+            )
+        self.stdout.write(
+            "\n`carga`: deserializar el pickle del vectorizador (lo que paga cada worker). `memoria`: bytes "
+            "reservados por esa deserialización. `docs/s`: transform del conjunto de validación. `matriz`: "
+            "tamaño de la matriz de validación."
+        )
+
+    def best_time(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            output = function()
+            timings.append(time.perf_counter() - start_time)
+        return min(timings), output
+
+    def measure(self, vectorizer, X_train, X_test, y_train, y_test, repeat):
+        start_time = time.perf_counter()
+        X_train_dtm = vectorizer.fit_transform(X_train)
+        fit_time = time.perf_counter() - start_time
+
+        payload = pickle.dumps(vectorizer)
+        load_time, _ = self.best_time(lambda: pickle.loads(payload), repeat)
+        tracemalloc.start()
+        loaded = pickle.loads(payload)
+        memory_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del loaded
+
+        transform_time, X_test_dtm = self.best_time(lambda: vectorizer.transform(X_test), repeat)
+
+        accuracy = {}
+        for model_name, model in (("logistic", LogisticRegression()), ("naive_bayes", MultinomialNB())):
+            model.fit(X_train_dtm, y_train)
+            accuracy[model_name] = accuracy_score(y_test, model.predict(X_test_dtm))
+
+        return {
+            "n_features": describe_vectorizer(vectorizer)["n_features"],
+            "pickle_bytes": len(payload),
+            "load_time": load_time,
+            "memory_bytes": memory_bytes,
+            "fit_time": fit_time,
+            "docs_per_second": len(X_test) / transform_time,
+            "matrix_bytes": X_test_dtm.data.nbytes + X_test_dtm.indices.nbytes + X_test_dtm.indptr.nbytes,
+            "accuracy": accuracy,
+        }
@@ -0,0 +1,103 @@
+import time
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sklearn.model_selection import train_test_split
+from datasets.loader import load_dataset
+from ml_models.bundles import bundle_manager
+from ml_models.cascade import cascade_predict
+from ml_models.predictor import ensemble_verdict
+from ml_models.processor import preprocess_texts
+from ml_models.scoring import predict_models
+from predictions.weights import ensemble_weights
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia y precisión del ensemble completo frente a la cascada (corte exacto y "
+        "cortes aproximados por confianza) sobre el conjunto de validación del entrenamiento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bundle", default=None,
+            help="Bundle de modelos a evaluar. Por defecto, el activo (o los modelos sueltos de ml_models/).",
+        )
+        parser.add_argument("--sample", type=int, default=0, help="Máximo de textos a evaluar (0 = todo el conjunto de validación).")
+        parser.add_argument(
+            "--min-confidence", default="0.9,0.95,0.99",
+            help="Umbrales de confianza del corte aproximado, separados por comas.",
+        )
+        parser.add_argument(
+            "--order", default=",".join(settings.ENSEMBLE_CASCADE["ORDER"]),
+            help="Orden de coste de los modelos, separados por comas.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            bundle = bundle_manager.open(options["bundle"] or bundle_manager.read_pointer())
+        except ValueError as e:
+            self.stderr.write(self.style.ERROR(f"❌ {e}"))
+            return
+
+        # Mismo reparto que primetrain: el 20% que los modelos no vieron al entrenar
+        df = load_dataset(columns=["text"])
+        _, texts, _, labels = train_test_split(df["text"], df["label"], test_size=0.2, random_state=42)
+        if options["sample"]:
+            texts, labels = texts[:options["sample"]], labels[:options["sample"]]
+        labels = np.asarray(labels)
+
+        self.stdout.write(f"🔄 Vectorizando {len(texts)} textos de validación con el bundle {bundle.version}...")
+        X = bundle.vectorizer.transform(list(preprocess_texts(texts)))
+        model_names = bundle.models.available()
+        bundle.models.preload()
+        weights = ensemble_weights.get(bundle)
+        order = options["order"].split(",")
+        thresholds = [float(value) for value in options["min_confidence"].split(",") if value]
+
+        full = self.run_full(bundle, model_names, weights, X)
+        rows = [("full", full, None)]
+        rows.append(("cascade (exacto)", self.run_cascade(bundle, model_names, weights, X, order, None), full))
+        for threshold in thresholds:
+            rows.append((f"cascade (≥{threshold})", self.run_cascade(bundle, model_names, weights, X, order, threshold), full))
+
+        self.stdout.write(f"\n📊 Modelos: {', '.join(model_names)} · orden de la cascada: {', '.join(order)}")
+        self.stdout.write(
+            f"{'modo':<22}{'media ms':>10}{'p50 ms':>9}{'p95 ms':>9}{'precisión':>11}{'= full':>9}{'modelos':>9}{'corte':>8}"
+        )
+        for name, run, reference in rows:
+            latencies = np.asarray(run["latencies"]) * 1000
+            agreement = np.mean(np.asarray(run["verdicts"]) == np.asarray(reference["verdicts"])) if reference else 1.0
+            self.stdout.write(
+                f"{name:<22}{latencies.mean():>10.3f}{np.percentile(latencies, 50):>9.3f}{np.percentile(latencies, 95):>9.3f}"
+                f"{np.mean(np.asarray(run['verdicts']) == labels):>11.4f}{agreement:>9.4f}"
+                f"{np.mean(run['evaluated']):>9.2f}{np.mean(run['early']):>8.1%}"
+            )
+        self.stdout.write(
+            "\n`= full`: fracción de veredictos iguales al ensemble completo. `modelos`: media de modelos "
+            "evaluados por texto. `corte`: textos en los que la cascada paró antes de evaluarlos todos."
+        )
+
+    def run_full(self, bundle, model_names, weights, X):
+        run = {"latencies": [], "verdicts": [], "evaluated": [], "early": []}
+        for index in range(X.shape[0]):
+            row = X[index]
+            start_time = time.perf_counter()
+            predictions, _ = predict_models(bundle, model_names, row)
+            final_prediction, _ = ensemble_verdict({name: int(values[0]) for name, values in predictions.items()}, weights)
+            run["latencies"].append(time.perf_counter() - start_time)
+            run["verdicts"].append(1 if final_prediction == "Fake" else 0)
+            run["evaluated"].append(len(predictions))
+            run["early"].append(False)
+        return run
+
+    def run_cascade(self, bundle, model_names, weights, X, order, min_confidence):
+        run = {"latencies": [], "verdicts": [], "evaluated": [], "early": []}
+        for index in range(X.shape[0]):
+            row = X[index]
+            start_time = time.perf_counter()
+            result = cascade_predict(bundle, row, weights, model_names, order=order, min_confidence=min_confidence)
+            run["latencies"].append(time.perf_counter() - start_time)
+            run["verdicts"].append(1 if result["final_prediction"] == "Fake" else 0)
+            run["evaluated"].append(len(result["evaluated_models"]))
+            run["early"].append(result["cascade_stop"] != "exhausted")
+        return run
@@ -0,0 +1,71 @@
+import os
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from ml_models.artifacts import export_artifacts, load_artifact
+from ml_models.bundles import bundle_manager
+from ml_models.models import VECTORIZER_FILE_NAME, model_files, safe_load_model
+
+class Command(BaseCommand):
+    help = "Convierte los modelos .pkl y el vectorizador al formato de artefactos mapeados en memoria."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bundle", default=None,
+            help="Bundle de modelos a convertir. Por defecto, el activo (o los modelos sueltos de ml_models/).",
+        )
+        parser.add_argument(
+            "--verify", type=int, default=500,
+            help="Textos del dataset con los que comparar las predicciones del pickle y del artefacto (0 = no verificar).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            bundle = bundle_manager.open(options["bundle"] or bundle_manager.read_pointer())
+        except ValueError as e:
+            self.stderr.write(self.style.ERROR(f"❌ {e}"))
+            return
+        output = bundle.artifacts_path
+
+        self.stdout.write(f"🔄 Cargando modelos .pkl del bundle {bundle.version}...")
+        vectorizer = safe_load_model(os.path.join(bundle.path, VECTORIZER_FILE_NAME))
+        if vectorizer is None:
+            self.stderr.write(self.style.ERROR("❌ No se encontró el vectorizador."))
+            return
+        models = {name: safe_load_model(file_path) for name, file_path in model_files(bundle.path).items()}
+
+        self.stdout.write(f"💾 Exportando artefactos en {output}...")
+        start_time = time.perf_counter()
+        results = export_artifacts(vectorizer, models, output)
+        for name, error in results.items():
+            if error:
+                self.stdout.write(self.style.WARNING(f"⚠️ {name}: {error}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✅ {name} exportado."))
+        self.stdout.write(f"⏱️ Exportación: {time.perf_counter() - start_time:.2f}s")
+
+        if options["verify"] > 0:
+            self.verify(vectorizer, models, output, options["verify"], results)
+
+    def verify(self, vectorizer, models, output, sample_size, results):
+        from datasets.loader import load_dataset
+        from ml_models.processor import preprocess_texts
+
+        df = load_dataset(columns=["text"])
+        texts = list(preprocess_texts(df["text"].head(sample_size)))
+        X = vectorizer.transform(texts)
+        X_mapped = load_artifact(os.path.join(output, "vectorizer")).transform(texts)
+
+        if (X != X_mapped).nnz:
+            self.stderr.write(self.style.ERROR("❌ El vectorizador mapeado no reproduce la matriz original."))
+            return
+
+        self.stdout.write(f"🔍 Verificando predicciones con {len(texts)} textos...")
+        for name, model in models.items():
+            if model is None or results.get(name):
+                continue
+            mismatches = int(np.sum(model.predict(X) != load_artifact(os.path.join(output, name)).predict(X_mapped)))
+            if mismatches:
+                self.stderr.write(self.style.ERROR(f"❌ {name}: {mismatches} predicciones distintas."))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✅ {name}: predicciones idénticas."))
@@ -0,0 +1,191 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from datasets.loader import dataset_files, iter_dataset_chunks, training_data
+from ml_models.bundles import bundle_manager
+from ml_models.featurizers import DEFAULT_HASH_FEATURES, build_vectorizer, describe_vectorizer
+from ml_models.incremental import IncrementalTrainer, build_incremental_models, supports_partial_fit
+from ml_models.memory import reset_peak_rss, resident_memory
+from ml_models.models import MODEL_NAMES, safe_load_model
+from predictions.models import TrainingStats
+from predictions.explanations import invalidate_explanations
+from predictions.weights import ensemble_weights
+
+class Command(BaseCommand):
+    help = (
+        "Entrena por fragmentos con partial_fit: actualiza los modelos del bundle activo con datos "
+        "nuevos o entrena desde cero sin cargar el dataset entero. Guarda el resultado como un bundle nuevo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--data", nargs="+", default=None,
+            help=(
+                "CSV con columnas text y label. Obligatorio al actualizar un bundle y distinto de sus datos de "
+                "entrenamiento; con --from-scratch, por defecto los archivos etiquetados de datasets/raw."
+            ),
+        )
+        parser.add_argument(
+            "--base", default=None,
+            help="Bundle cuyos modelos se actualizan. Por defecto, el activo (o los modelos sueltos de ml_models/).",
+        )
+        parser.add_argument(
+            "--from-scratch", action="store_true",
+            help="Entrena modelos nuevos (logistic con SGD, naive_bayes, neural_network) con el vectorizador de hashing.",
+        )
+        parser.add_argument("--hash-features", type=int, default=DEFAULT_HASH_FEATURES, help="Columnas del vectorizador de hashing (con --from-scratch).")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Filas leídas de cada archivo por fragmento.")
+        parser.add_argument("--epochs", type=int, default=1, help="Pasadas sobre los datos.")
+        parser.add_argument(
+            "--holdout", type=float, default=0.2,
+            help="Fracción de documentos reservada para validar (elegida por hash del texto; 0 = solo validación progresiva).",
+        )
+        parser.add_argument(
+            "--no-activate", dest="activate", action="store_false",
+            help="Guarda el bundle nuevo sin activarlo.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["from_scratch"] and not options["data"]:
+            self.stderr.write(self.style.ERROR(
+                "❌ Para actualizar un bundle hace falta --data con datos nuevos: volver a entrenar con los "
+                "datos del bundle cuenta dos veces los mismos documentos y falsea su precisión."
+            ))
+            return
+        files = options["data"] or dataset_files()
+        try:
+            vectorizer, models, kept, base = self.initial_models(options)
+            data = self.new_training_data(files, base)
+        except ValueError as e:
+            self.stderr.write(self.style.ERROR(f"❌ {e}"))
+            return
+
+        self.stdout.write(self.style.WARNING(
+            f"🔄 Entrenamiento incremental de {', '.join(models)} con {describe_vectorizer(vectorizer)['kind']} "
+            f"sobre {len(files)} archivos (fragmentos de {options['chunk_size']} filas por archivo)..."
+        ))
+        if kept:
+            self.stdout.write(f"ℹ️ Sin partial_fit, se copian sin cambios: {', '.join(kept)}")
+
+        try:
+            trainer = IncrementalTrainer(vectorizer, models, holdout=options["holdout"])
+            # El pico se mide desde aquí, sin la carga del bundle base, para ver lo que
+            # añade el entrenamiento por fragmentos
+            reset_peak_rss()
+            base_memory = resident_memory("VmRSS")
+            start_time = time.perf_counter()
+            for epoch in range(options["epochs"]):
+                chunks = iter_dataset_chunks(files, options["chunk_size"], random_state=42 + epoch)
+                for index, chunk in enumerate(chunks, start=1):
+                    # La validación progresiva solo tiene sentido en la primera pasada
+                    trainer.fit_chunk(chunk, progressive=epoch == 0)
+                    self.stdout.write(f"   época {epoch + 1} · fragmento {index}: {trainer.documents} documentos entrenados")
+            training_time = time.perf_counter() - start_time
+
+            if options["holdout"] > 0:
+                self.stdout.write("🔍 Evaluando los documentos de reserva...")
+                for chunk in iter_dataset_chunks(files, options["chunk_size"]):
+                    trainer.evaluate_chunk(chunk)
+            peak_memory = resident_memory("VmHWM")
+
+            # Al actualizar, la progresiva no basta: la precisión del bundle base solo se
+            # sustituye por la medida en documentos de reserva
+            accuracy = trainer.accuracy(progressive=base is None)
+            base_stats = base.stats if base is not None else {}
+            for name in models:
+                progressive_correct, progressive_total = trainer.progressive[name]
+                progressive = f"{progressive_correct / progressive_total:.4f}" if progressive_total else "-"
+                if name in accuracy:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"✅ {name}: precisión {accuracy[name]:.4f} (progresiva {progressive}, "
+                        f"{trainer.holdout_scores[name][1]} documentos de reserva)"
+                    ))
+                else:
+                    recorded = f"{base_stats[name]:.4f}" if name in base_stats else "sin registrar"
+                    self.stdout.write(self.style.WARNING(
+                        f"⚠️ {name}: sin documentos de reserva; se conserva la precisión del bundle base "
+                        f"({recorded}, progresiva {progressive})"
+                    ))
+
+            trained = {**kept, **models}
+            trained = {name: trained[name] for name in MODEL_NAMES if name in trained}
+            stats = {name: base_stats[name] for name in trained if name in base_stats}
+            stats.update(accuracy)
+
+            self.stdout.write("💾 Guardando modelos entrenados...")
+            version, export_results = bundle_manager.create(vectorizer, trained, stats=stats, training_data=data)
+            for name, error in export_results.items():
+                if error:
+                    self.stdout.write(self.style.WARNING(f"⚠️ Artefacto de {name} no exportado: {error}"))
+            self.stdout.write(f"📦 Bundle de modelos {version} guardado.")
+
+            TrainingStats.objects.bulk_create([TrainingStats(model_name=name, accuracy=value) for name, value in accuracy.items()])
+            ensemble_weights.invalidate()
+
+            if options["activate"]:
+                bundle_manager.activate(version)
+                self.stdout.write(self.style.SUCCESS(f"🔁 Bundle {version} activado."))
+                invalidated = invalidate_explanations(model_version=version)
+                self.stdout.write(f"🧹 Explicaciones invalidadas: {invalidated}")
+            else:
+                self.stdout.write(f"ℹ️ Bundle {version} sin activar (usa rollbackmodels --to {version}).")
+
+            self.stdout.write(
+                f"⏱️ Entrenamiento: {training_time:.2f}s · {trainer.documents} documentos · "
+                f"memoria máxima: {peak_memory / 2 ** 20:.1f} MB "
+                f"(+{(peak_memory - base_memory) / 2 ** 20:.1f} MB sobre los {base_memory / 2 ** 20:.1f} MB de partida)"
+            )
+
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"❌ Error durante el entrenamiento incremental: {str(e)}"))
+
+    def initial_models(self, options):
+        """
+        :return: Tupla (vectorizador, modelos a actualizar, modelos copiados sin cambios,
+            bundle base o None si se entrena desde cero).
+        :raises ValueError: Si el bundle no existe o no tiene modelos con `partial_fit`.
+        """
+        if options["from_scratch"]:
+            return build_vectorizer("hashing", options["hash_features"]), build_incremental_models(), {}, None
+
+        # Se leen los pickles: los artefactos mapeados son de solo lectura
+        bundle = bundle_manager.open(options["base"] or bundle_manager.read_pointer())
+        vectorizer = safe_load_model(bundle.models.vectorizer_file)
+        if vectorizer is None:
+            raise ValueError(f"El bundle {bundle.version} no tiene vectorizador.")
+        loaded = {
+            name: safe_load_model(file_path)
+            for name, file_path in bundle.models.files.items() if os.path.exists(file_path)
+        }
+        models = {name: model for name, model in loaded.items() if supports_partial_fit(model)}
+        kept = {name: model for name, model in loaded.items() if model is not None and name not in models}
+        if not models:
+            raise ValueError(f"El bundle {bundle.version} no tiene modelos con partial_fit; usa --from-scratch.")
+        if describe_vectorizer(vectorizer)["kind"] == "count":
+            self.stdout.write(self.style.WARNING(
+                "⚠️ El vectorizador del bundle tiene vocabulario fijo: los términos nuevos se ignoran."
+            ))
+        return vectorizer, models, kept, bundle
+
+    def new_training_data(self, files, base):
+        """
+        Datos de entrenamiento del bundle nuevo: los del bundle base más `files`.
+
+        :raises ValueError: Si algún archivo ya se usó para entrenar el bundle base
+            (mismo contenido, aunque cambie el nombre).
+        """
+        data = training_data(files)
+        if base is None:
+            return data
+
+        base_data = base.training_data
+        if base_data is None:
+            # Bundles anteriores al registro y modelos sueltos: primetrain entrena con datasets/raw
+            base_data = training_data(dataset_files())
+        seen = {item["sha256"]: item["file"] for item in base_data}
+        overlap = [item["file"] for item in data if item["sha256"] in seen]
+        if overlap:
+            raise ValueError(
+                f"{', '.join(overlap)} ya se usó para entrenar el bundle {base.version}: usa solo datos nuevos."
+            )
+        return base_data + data
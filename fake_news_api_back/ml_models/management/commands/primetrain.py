@@ -1,48 +1,123 @@
 from django.core.management.base import BaseCommand
 import os
-import pickle
-from datasets.loader import load_dataset
-from ml_models.processor import preprocess_text
+import tempfile
+import time
+from datasets.loader import dataset_files, load_dataset, training_data
+from ml_models.bundles import bundle_manager
+from ml_models.feature_cache import feature_cache
+from ml_models.fitting import fit_models, save_shared_matrix
+from ml_models.featurizers import DEFAULT_HASH_FEATURES, FEATURIZERS, build_vectorizer
+from ml_models.parallel import default_workers, parallel_preprocess, parallel_fit_transform, parallel_transform
 from predictions.models import TrainingStats
+from predictions.explanations import invalidate_explanations
+from predictions.weights import ensemble_weights
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from xgboost import XGBClassifier
 from sklearn.naive_bayes import MultinomialNB
 from sklearn.neural_network import MLPClassifier
-from sklearn.metrics import accuracy_score
 
-class Command(BaseCommand):
-    help = "Entrena los modelos de Machine Learning y los guarda en .pkl, además de registrar métricas en la BD."
+# División entrenamiento/prueba (parte de la clave de la caché de matrices)
+TRAIN_TEST_SPLIT = {"test_size": 0.2, "random_state": 42}
 
-    def handle(self, *args, **kwargs):
+class Command(BaseCommand):
+    help = "Entrena los modelos de Machine Learning, los guarda como un bundle versionado y registra las métricas en la BD."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=default_workers(),
+            help="Procesos para el preprocesamiento y la vectorización (1 = en serie).",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=500,
+            help="Textos por fragmento enviado a cada proceso.",
+        )
+        parser.add_argument(
+            "--fit-workers", type=int, default=None,
+            help="Modelos entrenados a la vez, cada uno en su proceso (por defecto, uno por núcleo hasta 5).",
+        )
+        parser.add_argument(
+            "--threads-per-model", type=int, default=1,
+            help="Hilos de BLAS/OpenMP y n_jobs de cada modelo durante el entrenamiento.",
+        )
+        parser.add_argument(
+            "--featurizer", choices=FEATURIZERS, default="count",
+            help="Vectorizador: count (vocabulario ajustado) o hashing (sin estado, float32).",
+        )
+        parser.add_argument(
+            "--hash-features", type=int, default=DEFAULT_HASH_FEATURES,
+            help="Columnas del vectorizador de hashing.",
+        )
+        parser.add_argument(
+            "--no-cache", dest="cache", action="store_false",
+            help="No lee ni guarda los textos limpios y las matrices en la caché de características.",
+        )
+        parser.add_argument(
+            "--rebuild-cache", action="store_true",
+            help="Recalcula los textos limpios y las matrices y sobrescribe su entrada de la caché.",
+        )
+        parser.add_argument(
+            "--no-activate", dest="activate", action="store_false",
+            help="Guarda el bundle nuevo sin activarlo.",
+        )
+
+    def handle(self, *args, **options):
         self.stdout.write(self.style.WARNING("🔄 Iniciando proceso de entrenamiento..."))
+        workers = options["workers"]
+        chunk_size = options["chunk_size"]
+        stage_times = {}
+        # --rebuild-cache recalcula todo y sobrescribe las entradas; --no-cache ni lee ni escribe
+        use_cache = options["cache"] and not options["rebuild_cache"]
 
         try:
-            # 📌 Cargar el dataset
-            self.stdout.write("🔄 Cargando datasets...")
-            df = load_dataset()
-
-            # 📌 Preprocesamiento del texto
-            self.stdout.write("🔄 Preprocesando textos...")
-            df["clean_text"] = df["text"].apply(preprocess_text)
-
-            # 📌 División en conjunto de entrenamiento y prueba
-            X = df["clean_text"]
-            y = df["label"]
-
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-            # 📌 Vectorización del texto
-            self.stdout.write("🔄 Vectorizando texto...")
-            vectorizer = CountVectorizer()
-            X_train_dtm = vectorizer.fit_transform(X_train)
-            X_test_dtm = vectorizer.transform(X_test)
+            # 📌 Textos limpios: de la caché si el dataset y el preprocesamiento no han cambiado
+            start_time = time.perf_counter()
+            texts_key = feature_cache.texts_key(dataset_files())
+            cached_texts = feature_cache.load_texts(texts_key) if use_cache else None
+            if cached_texts is not None:
+                self.stdout.write(f"♻️ Textos limpios leídos de la caché ({texts_key}).")
+                clean_texts, labels = cached_texts
+                stage_times["textos (caché)"] = time.perf_counter() - start_time
+            else:
+                # 📌 Cargar el dataset
+                self.stdout.write("🔄 Cargando datasets...")
+                df = load_dataset(columns=["text"])
+                stage_times["carga"] = time.perf_counter() - start_time
+
+                # 📌 Preprocesamiento del texto
+                self.stdout.write(f"🔄 Preprocesando textos ({workers} procesos)...")
+                start_time = time.perf_counter()
+                clean_texts = parallel_preprocess(df["text"], workers=workers, chunk_size=chunk_size)
+                labels = df["label"].to_numpy()
+                if options["cache"]:
+                    feature_cache.save_texts(texts_key, clean_texts, labels)
+                stage_times["preprocesamiento"] = time.perf_counter() - start_time
+
+            # 📌 Vectorizador y matrices: de la caché si además la vectorización es la misma
+            start_time = time.perf_counter()
+            vectorizer = build_vectorizer(options["featurizer"], options["hash_features"])
+            matrices_key = feature_cache.matrices_key(texts_key, vectorizer, TRAIN_TEST_SPLIT)
+            cached_matrices = feature_cache.load_matrices(matrices_key) if use_cache else None
+            if cached_matrices is not None:
+                self.stdout.write(f"♻️ Matrices documento-término leídas de la caché ({matrices_key}).")
+                vectorizer = cached_matrices["vectorizer"]
+                X_train_dtm, X_test_dtm = cached_matrices["X_train"], cached_matrices["X_test"]
+                y_train, y_test = cached_matrices["y_train"], cached_matrices["y_test"]
+                stage_times["vectorización (caché)"] = time.perf_counter() - start_time
+            else:
+                # 📌 División en conjunto de entrenamiento y prueba
+                X_train, X_test, y_train, y_test = train_test_split(clean_texts, labels, **TRAIN_TEST_SPLIT)
+
+                # 📌 Vectorización del texto
+                self.stdout.write(f"🔄 Vectorizando texto con {options['featurizer']} ({workers} procesos)...")
+                X_train_dtm = parallel_fit_transform(vectorizer, X_train, workers=workers, chunk_size=chunk_size)
+                X_test_dtm = parallel_transform(vectorizer, X_test, workers=workers, chunk_size=chunk_size)
+                if options["cache"]:
+                    feature_cache.save_matrices(matrices_key, vectorizer, X_train_dtm, X_test_dtm, y_train, y_test)
+                stage_times["vectorización"] = time.perf_counter() - start_time
 
             # 📌 Definimos los modelos a entrenar
-            self.stdout.write("🔄 Entrenando modelos...")
-
             models = {
                 "logistic": LogisticRegression(),
                 "random_forest": RandomForestClassifier(random_state=42),
@@ -51,39 +126,96 @@ class Command(BaseCommand):
                 "neural_network": MLPClassifier(hidden_layer_sizes=(100,), max_iter=500, random_state=42),
             }
 
-            trained_models = {}
-            model_stats = []
-
-            for name, model in models.items():
-                self.stdout.write(f"🚀 Entrenando {name}...")
-                model.fit(X_train_dtm, y_train)
-
-                # 📌 Evaluación del modelo
-                y_pred = model.predict(X_test_dtm)
-                accuracy = accuracy_score(y_test, y_pred)
-
-                # 📌 Guardamos el modelo en memoria
-                trained_models[name] = model
-
-                # 📌 Guardamos la estadística del modelo
-                model_stats.append(TrainingStats(model_name=name, accuracy=accuracy))
-
-                self.stdout.write(self.style.SUCCESS(f"✅ {name} entrenado con precisión: {accuracy:.4f}"))
-
-            # 📌 Guardar modelos y vectorizador en archivos .pkl
-            save_path = os.path.join("ml_models")
-            os.makedirs(save_path, exist_ok=True)
-
+            fit_workers = options["fit_workers"] or min(len(models), default_workers())
+            self.stdout.write(
+                f"🔄 Entrenando {len(models)} modelos ({fit_workers} procesos, "
+                f"{options['threads_per_model']} hilos por modelo)..."
+            )
+
+            def report_model(report):
+                if report["error"]:
+                    self.stdout.write(self.style.ERROR(f"❌ {report['name']} falló: {report['error']}"))
+                    # La traza del proceso hijo, para poder depurar el modelo que falla
+                    if report["traceback"]:
+                        self.stderr.write(report["traceback"], ending="")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"✅ {report['name']} entrenado con precisión: {report['accuracy']:.4f}"))
+
+            # 📌 Las matrices se comparten con los procesos mapeadas en memoria, sin copiarlas
+            start_time = time.perf_counter()
+            with tempfile.TemporaryDirectory(prefix="primetrain-") as matrix_path:
+                train_spec = save_shared_matrix(X_train_dtm, os.path.join(matrix_path, "train"))
+                test_spec = save_shared_matrix(X_test_dtm, os.path.join(matrix_path, "test"))
+                reports = fit_models(
+                    models, train_spec, test_spec, y_train, y_test,
+                    workers=fit_workers, threads=options["threads_per_model"], on_report=report_model,
+                )
+            stage_times["entrenamiento"] = time.perf_counter() - start_time
+
+            self.write_model_reports(reports)
+
+            # 📌 Un modelo que falla no impide guardar los demás
+            trained_models = {name: report["model"] for name, report in reports.items() if report["model"] is not None}
+            if not trained_models:
+                self.stderr.write(self.style.ERROR("❌ Ningún modelo se entrenó: no se guarda el bundle."))
+                return
+            model_stats = [TrainingStats(model_name=name, accuracy=reports[name]["accuracy"]) for name in trained_models]
+
+            # 📌 Guardar modelos, vectorizador y métricas como un bundle versionado
             self.stdout.write("💾 Guardando modelos entrenados...")
-            pickle.dump(vectorizer, open(os.path.join(save_path, "vectorizer.pkl"), "wb"))
-
-            for name, model in trained_models.items():
-                pickle.dump(model, open(os.path.join(save_path, f"model_{name}.pkl"), "wb"))
+            start_time = time.perf_counter()
+            version, export_results = bundle_manager.create(
+                vectorizer,
+                trained_models,
+                stats={stats.model_name: stats.accuracy for stats in model_stats},
+                training_data=training_data(dataset_files()),
+            )
+            for name, error in export_results.items():
+                if error:
+                    self.stdout.write(self.style.WARNING(f"⚠️ Artefacto de {name} no exportado: {error}"))
+            self.stdout.write(f"📦 Bundle de modelos {version} guardado.")
 
             # 📌 Guardar estadísticas en la base de datos
             TrainingStats.objects.bulk_create(model_stats)
+            ensemble_weights.invalidate()
+            stage_times["guardado"] = time.perf_counter() - start_time
+
+            # 📌 Activar el bundle: los workers en marcha lo cargan sin reiniciarse
+            if options["activate"]:
+                bundle_manager.activate(version)
+                self.stdout.write(self.style.SUCCESS(f"🔁 Bundle {version} activado."))
+                # 📌 Las explicaciones de otros bundles ya no se sirven (la clave incluye la versión)
+                invalidated = invalidate_explanations(model_version=version)
+                self.stdout.write(f"🧹 Explicaciones invalidadas: {invalidated}")
+            else:
+                self.stdout.write(f"ℹ️ Bundle {version} sin activar (usa rollbackmodels --to {version}).")
 
             self.stdout.write(self.style.SUCCESS("✅ Modelos entrenados y estadísticas guardadas con éxito."))
 
+            # 📌 Resumen de tiempos por etapa
+            self.stdout.write("⏱️ Tiempo por etapa:")
+            for stage, elapsed in stage_times.items():
+                self.stdout.write(f"   {stage:<30} {elapsed:8.2f}s")
+            self.stdout.write(f"   {'total':<30} {sum(stage_times.values()):8.2f}s")
+
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"❌ Error durante el entrenamiento: {str(e)}"))
+
+    def write_model_reports(self, reports):
+        def value(number, scale=1, digits=3):
+            return "-" if number is None else f"{number * scale:.{digits}f}"
+
+        self.stdout.write("📊 Resultados por modelo:")
+        self.stdout.write(
+            f"   {'modelo':<16}{'precisión':>10}{'ajuste s':>10}{'lote ms/doc':>13}{'1 doc ms':>10}{'memoria MB':>12}{'+ajuste MB':>12}  error"
+        )
+        for name, report in reports.items():
+            fit_memory = None
+            if report["peak_memory"] is not None and report["base_memory"] is not None:
+                fit_memory = report["peak_memory"] - report["base_memory"]
+            self.stdout.write(
+                f"   {name:<16}{value(report['accuracy'], digits=4):>10}{value(report['fit_time'], digits=2):>10}"
+                f"{value(report['batch_latency'], 1000):>13}{value(report['single_latency'], 1000):>10}"
+                f"{value(report['peak_memory'], 1 / 2 ** 20, 1):>12}{value(fit_memory, 1 / 2 ** 20, 1):>12}"
+                f"  {report['error'] or ''}"
+            )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from ml_models.bundles import bundle_manager, version_key
+
+class Command(BaseCommand):
+    help = (
+        "Vuelve al bundle de modelos anterior (o activa uno concreto con --to). "
+        "Los workers en marcha recogen el cambio sin reiniciarse."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--to", dest="version", help="Versión del bundle a activar.")
+        parser.add_argument("--list", action="store_true", help="Lista los bundles disponibles.")
+
+    def handle(self, *args, **options):
+        versions = bundle_manager.versions()
+        current = bundle_manager.read_pointer()
+
+        if options["list"]:
+            if not versions:
+                self.stdout.write("ℹ️ No hay bundles de modelos; se sirven los modelos sueltos de ml_models/.")
+            for version in versions:
+                bundle = bundle_manager.open(version)
+                marker = "👉" if version == current else "  "
+                accuracies = ", ".join(f"{name}={accuracy:.4f}" for name, accuracy in bundle.stats.items())
+                self.stdout.write(f"{marker} {version}  {accuracies}")
+            return
+
+        target = options["version"]
+        if target is None:
+            previous = [version for version in versions if current is None or version_key(version) < version_key(current)]
+            if current is None or not previous:
+                self.stderr.write(self.style.ERROR("❌ No hay un bundle anterior al activo."))
+                return
+            target = previous[-1]
+
+        try:
+            bundle_manager.activate(target)
+        except ValueError as e:
+            self.stderr.write(self.style.ERROR(f"❌ {e}"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"🔁 Bundle activo: {current or 'legacy'} → {target}"))
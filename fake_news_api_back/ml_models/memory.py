@@ -0,0 +1,29 @@
+import resource
+
+
+def reset_peak_rss():
+    """
+    Pone a cero el máximo de memoria residente del proceso (Linux >= 4.0), para que
+    no cuente lo que el proceso ya había usado antes de la etapa que se mide.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def resident_memory(field):
+    """
+    Memoria residente actual ("VmRSS") o máxima ("VmHWM") en bytes. Fuera de Linux,
+    el máximo de `getrusage` en ambos casos.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -1,6 +1,16 @@
+import hashlib
+import mmap
 import pickle
 import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+import numpy as np
+import scipy.sparse as sp
 from django.conf import settings
+from ml_models.artifacts import is_artifact, load_artifact
+from ml_models.inference import limit_model_threads
 
 MODELS_PATH = os.path.join(settings.BASE_DIR, "ml_models/")
 
@@ -12,13 +22,260 @@ def safe_load_model(file_path):
         print(f"Error loading model from {file_path}: {e}")
         return None
 
-MODELS = {
-    "logistic": safe_load_model(os.path.join(MODELS_PATH, "model_logistic.pkl")),
-    "random_forest": safe_load_model(os.path.join(MODELS_PATH, "model_random_forest.pkl")),
-    "xgboost": safe_load_model(os.path.join(MODELS_PATH, "model_xgboost.pkl")),
-    "naive_bayes": safe_load_model(os.path.join(MODELS_PATH, "model_naive_bayes.pkl")),
-    "neural_network": safe_load_model(os.path.join(MODELS_PATH, "model_neural_network.pkl")),
-}
+def models_version(file_paths):
+    """
+    Identificador corto de la versión de los modelos cargados, a partir del
+    tamaño y la fecha de modificación de sus archivos.
+    """
+    digest = hashlib.sha256()
+    for file_path in sorted(file_paths):
+        if os.path.exists(file_path):
+            file_stat = os.stat(file_path)
+            digest.update(f"{os.path.basename(file_path)}:{file_stat.st_size}:{file_stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
 
-# Cargar vectorizador de texto
-VECTORIZER = safe_load_model(os.path.join(MODELS_PATH, "vectorizer.pkl"))
\ No newline at end of file
+def _is_mapped(array):
+    base = array.base
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, "base", None)
+    return False
+
+def estimate_resident_size(obj, file_path=None):
+    """
+    Estimación en bytes de la memoria privada que ocupa un modelo cargado: suma de
+    los arrays de numpy/scipy alcanzables desde sus atributos. Los arrays mapeados
+    desde un artefacto no cuentan, porque sus páginas se comparten entre procesos.
+    Los modelos que guardan su estado fuera de Python (p. ej. el booster de XGBoost)
+    no exponen esos arrays, así que se toma como mínimo el tamaño del archivo serializado.
+    """
+    seen = set()
+    pending = [obj]
+    total = 0
+    while pending:
+        current = pending.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, np.ndarray):
+            if not _is_mapped(current):
+                total += current.nbytes
+        elif sp.issparse(current):
+            pending.extend(getattr(current, name) for name in ("data", "indices", "indptr") if hasattr(current, name))
+        elif isinstance(current, dict):
+            total += sum(len(key) for key in current if isinstance(key, str))
+            pending.extend(current.values())
+        elif isinstance(current, (list, tuple, set)):
+            pending.extend(current)
+        elif hasattr(current, "__dict__") and not isinstance(current, type):
+            pending.extend(vars(current).values())
+
+    if file_path and os.path.isfile(file_path):
+        total = max(total, os.path.getsize(file_path))
+    return total
+
+def mapped_size(directory):
+    """
+    Bytes de los arrays `.npy` de un artefacto (memoria compartida vía la caché de páginas).
+    """
+    return sum(
+        os.path.getsize(os.path.join(directory, file_name))
+        for file_name in os.listdir(directory) if file_name.endswith(".npy")
+    )
+
+
+class ModelRegistry(Mapping):
+    """
+    Registro de modelos con carga perezosa: cada modelo se deserializa la primera
+    vez que se usa, no al importar el módulo. Los modelos cargados se mantienen
+    dentro de un presupuesto de memoria descargando el usado hace más tiempo (LRU).
+
+    Se comporta como un diccionario de solo lectura {nombre: modelo}: las claves son
+    todos los modelos configurados y el valor es None si el archivo no existe o no
+    se puede cargar, igual que el antiguo diccionario `MODELS`.
+    """
+
+    def __init__(self, files, vectorizer_file, memory_budget=0, artifacts_path=None):
+        """
+        :param files: Diccionario {nombre del modelo: ruta del pickle}.
+        :param vectorizer_file: Ruta del vectorizador. Se carga también bajo demanda,
+            pero nunca se descarga.
+        :param memory_budget: Bytes máximos para los modelos cargados (0 = sin límite).
+        :param artifacts_path: Directorio con artefactos mapeados en memoria. Si existe
+            el artefacto de un modelo se abre en lugar de deserializar su pickle.
+        """
+        self.files = dict(files)
+        self.vectorizer_file = vectorizer_file
+        self.memory_budget = memory_budget
+        self.artifacts_path = artifacts_path
+        self._loaded = OrderedDict()
+        self._vectorizer = None
+        self._metrics = {name: self._empty_metrics() for name in self.files}
+        self._metrics["vectorizer"] = self._empty_metrics()
+        self._lock = threading.RLock()
+        self._load_locks = {name: threading.Lock() for name in self._metrics}
+
+    @staticmethod
+    def _empty_metrics():
+        return {
+            "loaded": False,
+            "loads": 0,
+            "hits": 0,
+            "evictions": 0,
+            "load_time": None,
+            "resident_bytes": 0,
+            "mapped_bytes": 0,
+            "format": None,
+            "error": None,
+        }
+
+    def __getitem__(self, name):
+        if name not in self.files:
+            raise KeyError(name)
+
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                self._metrics[name]["hits"] += 1
+                return self._loaded[name]
+            if self._metrics[name]["error"] is not None:
+                return None
+
+        # Un lock por modelo: dos peticiones simultáneas no deserializan el mismo archivo dos veces
+        with self._load_locks[name]:
+            with self._lock:
+                if name in self._loaded:
+                    self._loaded.move_to_end(name)
+                    self._metrics[name]["hits"] += 1
+                    return self._loaded[name]
+            model = self._load(name)
+            if model is None:
+                return None
+            with self._lock:
+                self._loaded[name] = model
+                self._evict(keep=name)
+            return model
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def artifact_dir(self, name):
+        if self.artifacts_path is None:
+            return None
+        directory = os.path.join(self.artifacts_path, name)
+        return directory if is_artifact(directory) else None
+
+    def _load(self, name):
+        file_path = self.vectorizer_file if name == "vectorizer" else self.files[name]
+        artifact_dir = self.artifact_dir(name)
+
+        start_time = time.perf_counter()
+        if artifact_dir:
+            try:
+                model = load_artifact(artifact_dir)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error loading artifact from {artifact_dir}: {e}")
+                artifact_dir = None
+        if not artifact_dir:
+            model = safe_load_model(file_path)
+            if model is not None and name != "vectorizer":
+                limit_model_threads(model)
+        load_time = time.perf_counter() - start_time
+
+        with self._lock:
+            metrics = self._metrics[name]
+            if model is None:
+                metrics["error"] = f"No se pudo cargar {os.path.basename(file_path)}"
+                return None
+            metrics.update({
+                "loaded": True,
+                "loads": metrics["loads"] + 1,
+                "load_time": round(load_time, 4),
+                "resident_bytes": estimate_resident_size(model, None if artifact_dir else file_path),
+                "mapped_bytes": mapped_size(artifact_dir) if artifact_dir else 0,
+                "format": "mmap" if artifact_dir else "pickle",
+                "error": None,
+            })
+        print(f"📦 Modelo {name} cargado en {load_time:.3f}s ({metrics['format']}).")
+        return model
+
+    def _evict(self, keep):
+        if not self.memory_budget:
+            return
+        while self.resident_bytes() > self.memory_budget:
+            oldest = next((name for name in self._loaded if name != keep), None)
+            if oldest is None:
+                break
+            del self._loaded[oldest]
+            self._metrics[oldest]["loaded"] = False
+            self._metrics[oldest]["resident_bytes"] = 0
+            self._metrics[oldest]["mapped_bytes"] = 0
+            self._metrics[oldest]["evictions"] += 1
+            print(f"♻️ Modelo {oldest} descargado por el presupuesto de memoria.")
+
+    def resident_bytes(self):
+        return sum(self._metrics[name]["resident_bytes"] for name in self._loaded)
+
+    def available(self):
+        """
+        Modelos cuyo archivo existe y no ha fallado al cargarse, sin cargarlos.
+        """
+        return [
+            name for name, file_path in self.files.items()
+            if self._metrics[name]["error"] is None and (os.path.exists(file_path) or self.artifact_dir(name))
+        ]
+
+    def vectorizer(self):
+        if self._vectorizer is None:
+            with self._load_locks["vectorizer"]:
+                if self._vectorizer is None:
+                    self._vectorizer = self._load("vectorizer")
+        return self._vectorizer
+
+    def preload(self):
+        """
+        Carga el vectorizador y todos los modelos disponibles (p. ej. al arrancar un worker).
+        """
+        self.vectorizer()
+        for name in self.available():
+            self[name]
+
+    def unload(self, name=None):
+        """
+        Descarga un modelo (o todos) y olvida los errores de carga, de modo que el
+        siguiente acceso vuelva a leer el archivo.
+        """
+        with self._lock:
+            names = [name] if name else list(self.files)
+            for model_name in names:
+                self._loaded.pop(model_name, None)
+                metrics = self._metrics[model_name]
+                metrics.update({"loaded": False, "resident_bytes": 0, "mapped_bytes": 0, "error": None})
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_budget_bytes": self.memory_budget,
+                "resident_bytes": self.resident_bytes(),
+                "models": {name: dict(metrics) for name, metrics in self._metrics.items()},
+            }
+
+MODEL_NAMES = ["logistic", "random_forest", "xgboost", "naive_bayes", "neural_network"]
+VECTORIZER_FILE_NAME = "vectorizer.pkl"
+
+def model_files(path):
+    """
+    Rutas de los pickles de los modelos dentro de un directorio de modelos.
+    """
+    return {name: os.path.join(path, f"model_{name}.pkl") for name in MODEL_NAMES}
+
+# Modelos sueltos en ml_models/ (instalaciones sin bundles versionados, ver ml_models/bundles.py)
+MODEL_FILES = model_files(MODELS_PATH)
+VECTORIZER_FILE = os.path.join(MODELS_PATH, VECTORIZER_FILE_NAME)
@@ -0,0 +1,143 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from ml_models.processor import preprocess_texts
+
+# Vectorizador compartido por los procesos del pool (se envía una sola vez en el initializer)
+_worker_vectorizer = None
+
+
+def default_workers():
+    """
+    Número de procesos por defecto: uno por núcleo disponible.
+    """
+    return os.cpu_count() or 1
+
+
+def _chunks(items, chunk_size):
+    items = list(items)
+    return [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+
+
+def _init_worker(vectorizer):
+    global _worker_vectorizer
+    _worker_vectorizer = vectorizer
+
+
+def _preprocess_chunk(texts):
+    return list(preprocess_texts(texts))
+
+
+def _chunk_terms(texts):
+    # Términos en orden de primera aparición dentro del fragmento
+    analyzer = _worker_vectorizer.build_analyzer()
+    terms = {}
+    for text in texts:
+        for term in analyzer(text):
+            terms.setdefault(term, None)
+    return list(terms)
+
+
+def _transform_chunk(texts):
+    return _worker_vectorizer.transform(texts)
+
+
+def parallel_preprocess(texts, workers=None, chunk_size=500):
+    """
+    Aplica `preprocess_texts` repartiendo el corpus en fragmentos entre varios procesos.
+
+    :param texts: Iterable de textos originales.
+    :param workers: Número de procesos. Con 1 se usa el camino en serie.
+    :param chunk_size: Textos por fragmento.
+    :return: Lista de textos limpios, en el mismo orden que la entrada.
+    """
+    workers = workers or default_workers()
+    if workers <= 1:
+        return list(preprocess_texts(texts))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_preprocess_chunk, _chunks(texts, chunk_size))
+        return [text for chunk in results for text in chunk]
+
+
+def supports_parallel_fit(vectorizer):
+    """
+    Indica si el vocabulario puede construirse por fragmentos con el mismo
+    resultado que `fit_transform`: solo es posible si no hay poda por
+    frecuencia ni vocabulario fijo, porque entonces el vocabulario es
+    simplemente la unión ordenada de los términos de todos los documentos.
+    """
+    return (
+        vectorizer.vocabulary is None
+        and vectorizer.max_features is None
+        and vectorizer.min_df == 1
+        and vectorizer.max_df == 1.0
+    )
+
+
+def parallel_transform(vectorizer, texts, workers=None, chunk_size=500):
+    """
+    Equivalente a `vectorizer.transform(texts)` calculado por fragmentos en paralelo.
+    """
+    workers = workers or default_workers()
+    if workers <= 1:
+        return vectorizer.transform(texts)
+
+    chunks = _chunks(texts, chunk_size)
+    if not chunks:
+        return vectorizer.transform([])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectorizer,)) as executor:
+        return sp.vstack(list(executor.map(_transform_chunk, chunks)), format="csr")
+
+
+def parallel_fit_transform(vectorizer, texts, workers=None, chunk_size=500):
+    """
+    Equivalente a `vectorizer.fit_transform(texts)` para un `CountVectorizer`.
+    Un `HashingVectorizer` no tiene nada que ajustar y se transforma directamente.
+
+    Cada proceso extrae los términos de sus fragmentos; el vocabulario es la
+    unión ordenada (igual que el de `fit_transform`) y la matriz documento-término
+    se construye transformando los fragmentos en paralelo y apilándolos.
+    Si la configuración del vectorizador no lo permite, se usa el camino en serie.
+
+    La matriz resultante es idéntica también en el orden interno de cada fila:
+    `fit_transform` deja los índices de columna ordenados por la primera
+    aparición de cada término en el corpus, y aquí se reproduce ese orden.
+    """
+    workers = workers or default_workers()
+    texts = list(texts)
+    if isinstance(vectorizer, HashingVectorizer):
+        return parallel_transform(vectorizer, texts, workers=workers, chunk_size=chunk_size)
+    if workers <= 1 or not supports_parallel_fit(vectorizer):
+        return vectorizer.fit_transform(texts)
+
+    vectorizer.build_analyzer()
+    chunks = _chunks(texts, chunk_size)
+
+    first_seen = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(vectorizer,)) as executor:
+        for chunk_terms in executor.map(_chunk_terms, chunks):
+            for term in chunk_terms:
+                first_seen.setdefault(term, len(first_seen))
+
+    if not first_seen:
+        # Mismo error que fit_transform con un vocabulario vacío
+        return vectorizer.fit_transform(texts)
+
+    vectorizer.vocabulary_ = {term: index for index, term in enumerate(sorted(first_seen))}
+    vectorizer.fixed_vocabulary_ = False
+
+    X = parallel_transform(vectorizer, texts, workers=workers, chunk_size=chunk_size)
+
+    rank = np.empty(len(first_seen), dtype=np.int64)
+    for term, index in vectorizer.vocabulary_.items():
+        rank[index] = first_seen[term]
+    rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+    order = np.lexsort((rank[X.indices], rows))
+    X.indices = X.indices[order]
+    X.data = X.data[order]
+    X.has_sorted_indices = False
+    return X
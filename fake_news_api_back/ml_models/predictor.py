@@ -0,0 +1,84 @@
+from ml_models.bundles import current_bundle
+from ml_models.processor import preprocess_texts
+from ml_models.scoring import predict_models
+
+
+def prediction_label(prediction):
+    """
+    Convierte la salida numérica de un modelo (0/1) en la etiqueta de la API.
+    """
+    return "Fake" if prediction == 1 else "Real"
+
+
+def ensemble_verdict(votes, weights):
+    """
+    Combina los votos de varios modelos en un promedio ponderado por su precisión.
+
+    :param votes: Diccionario {modelo: 0 (Real) | 1 (Fake)}.
+    :param weights: Diccionario {modelo: precisión}. Los modelos sin peso cuentan 0.
+    :return: Tupla (predicción final, confianza).
+    """
+    weighted_sum = 0
+    total_weight = 0
+
+    for model_name, vote in votes.items():
+        accuracy = weights.get(model_name, 0)
+        weighted_sum += accuracy * vote
+        total_weight += accuracy
+
+    final_score = weighted_sum / total_weight if total_weight > 0 else 0
+    final_prediction = "Fake" if final_score >= 0.5 else "Real"
+    confidence = final_score if final_prediction == "Fake" else 1 - final_score
+    return final_prediction, confidence
+
+
+def predict_batch(texts, model_names=None, weights=None, bundle=None):
+    """
+    Predice un lote de noticias en una sola pasada.
+
+    Todos los textos se preprocesan y se vectorizan con una única llamada a
+    `transform` del vectorizador, y cada modelo se ejecuta una sola vez sobre la
+    matriz completa (los lineales, juntos en un único producto; ver
+    `predict_models`), de modo que el coste fijo se reparte entre todos los
+    documentos del lote.
+
+    :param texts: Lista de textos originales sin procesar.
+    :param model_names: Modelos a evaluar. Por defecto, todos los del bundle.
+    :param weights: Diccionario {modelo: precisión} para el voto ponderado.
+    :param bundle: Bundle de modelos a usar. Por defecto, el activo.
+    :return: Lista con un resultado por texto, en el mismo orden de entrada.
+    """
+    bundle = bundle or current_bundle()
+    if model_names is None:
+        model_names = list(bundle.models.keys())
+    weights = weights or {}
+
+    if not texts:
+        return []
+
+    clean_texts = list(preprocess_texts(texts))
+    text_vectorized = bundle.vectorizer.transform(clean_texts)
+
+    model_predictions, prediction_times = predict_models(bundle, model_names, text_vectorized)
+    # Tiempo amortizado por documento
+    prediction_times = {name: elapsed / len(texts) for name, elapsed in prediction_times.items()}
+
+    results = []
+    for index in range(len(texts)):
+        votes = {name: int(predictions[index]) for name, predictions in model_predictions.items()}
+        final_prediction, confidence = ensemble_verdict(votes, weights)
+
+        results.append({
+            "predictions": {
+                name: {
+                    "prediction": prediction_label(vote),
+                    "accuracy": weights.get(name, 0),
+                    "prediction_time": round(prediction_times[name], 6),
+                }
+                for name, vote in votes.items()
+            },
+            "final_prediction": final_prediction,
+            "confidence": round(confidence, 4),
+        })
+
+    return results
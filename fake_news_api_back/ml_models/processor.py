@@ -18,17 +18,84 @@ stop_words.update(["según", "tras", "cabe", "bajo", "durante", "mediante", "so"
                    "cada", "me", "después", "despues", "segun", "solo", "sido", "estan", "lunes",
                    "martes", "miércoles", "jueves", "viernes"])
 
+# Versión del preprocesamiento: súbela cuando cambie la salida de preprocess_text(s)
+# para que las cachés de textos limpios y matrices (ml_models/feature_cache.py) se invaliden
+PREPROCESS_VERSION = 1
+
+# Patrones precompilados para el preprocesamiento rápido.
+# URLs y números se eliminan en una sola pasada: en cada posición se prueban
+# primero las alternativas de URL, igual que en las dos pasadas originales.
+_URL_AND_NUMBER_PATTERN = re.compile(r"http\S+|www\S+|https\S+|\d+", flags=re.MULTILINE)
+_PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+# Tras quitar la puntuación ASCII, lo único que `word_tokenize` (Punkt + Treebank)
+# sigue haciendo es separar las comillas tipográficas y algunas contracciones
+# inglesas ("cannot", "gonna", ...). Reproducimos solo esas reglas.
+_QUOTES_PATTERN = re.compile("[«“‘„»”’]")
+_CONTRACTIONS_PATTERN = re.compile(
+    r"\b(?=(?:cannot|gimme|gonna|gotta|lemme)\b|wanna(?!\S))(can|gim|gon|got|lem|wan)(not|me|na|ta)",
+    flags=re.IGNORECASE,
+)
+
+
+def _tokenize(text):
+    """
+    Tokenizador equivalente a `word_tokenize` para texto ya sin puntuación ASCII.
+    """
+    text = _QUOTES_PATTERN.sub(r" \g<0> ", text)
+    text = _CONTRACTIONS_PATTERN.sub(r" \1 \2 ", text)
+    return text.split()
+
+
+def preprocess_texts(texts):
+    """
+    Versión por lotes de `preprocess_text`: genera el texto limpio de cada elemento.
+
+    Usa patrones precompilados y un tokenizador basado en expresiones regulares
+    en lugar de NLTK, con una salida idéntica a la de `preprocess_text_nltk`.
+
+    :param texts: Iterable de textos originales sin procesar.
+    :return: Generador con el texto limpio de cada elemento, en el mismo orden.
+    """
+    stop = stop_words
+    remove_urls_and_numbers = _URL_AND_NUMBER_PATTERN.sub
+    punctuation_table = _PUNCTUATION_TABLE
+
+    for text in texts:
+        if not isinstance(text, str):
+            yield ""
+            continue
+
+        text = remove_urls_and_numbers("", text.lower()).translate(punctuation_table)
+        yield " ".join([word for word in _tokenize(text) if word not in stop])
+
+
 def preprocess_text(text):
     """
     Limpia y preprocesa el texto antes de enviarlo al modelo de Machine Learning.
 
     Pasos:
     1. Convertir a minúsculas.
-    2. Eliminar signos de puntuación y caracteres especiales.
+    2. Eliminar URLs, números, signos de puntuación y caracteres especiales.
     3. Tokenizar el texto en palabras.
     4. Eliminar stopwords en español.
     5. Unir las palabras nuevamente en una sola cadena de texto.
-    
+
+    Para procesar muchos textos es preferible `preprocess_texts`.
+
+    :param text: Texto original sin procesar.
+    :return: Texto limpio y listo para vectorización.
+    """
+    return next(preprocess_texts((text,)))
+
+
+def preprocess_text_nltk(text):
+    """
+    Implementación original basada en NLTK (`word_tokenize`).
+
+    Se conserva como referencia para las pruebas de equivalencia y el benchmark
+    de `preprocess_texts`; no debe usarse en el camino de predicción.
+
     :param text: Texto original sin procesar.
     :return: Texto limpio y listo para vectorización.
     """
@@ -0,0 +1,168 @@
+from functools import partial
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import MultinomialNB
+from ml_models.artifacts import MappedLinearModel, MappedNaiveBayes, is_logistic_sgd
+from ml_models.inference import inference_pool
+
+# Nombre de la tarea del producto fusionado en el pool (no puede coincidir con un modelo)
+FUSED_TASK = "__fused__"
+
+
+def linear_parts(model):
+    """
+    Descompone un modelo lineal sobre los conteos del vectorizador en
+    (tipo, pesos [salidas x términos], sesgo [salidas], clases), o None si el
+    modelo no es lineal.
+
+    - Regresión logística (también la entrenada con SGD): `decision_function = X · coef.T + intercept`.
+    - Naive Bayes multinomial: `joint_log_likelihood = X · feature_log_prob.T + class_log_prior`.
+    """
+    if isinstance(model, LogisticRegression) or is_logistic_sgd(model):
+        return "linear", model.coef_, model.intercept_, model.classes_
+    if isinstance(model, MappedLinearModel):
+        return "linear", model.arrays["coef"], model.arrays["intercept"], model.classes_
+    if isinstance(model, MultinomialNB):
+        return "naive_bayes", model.feature_log_prob_, model.class_log_prior_, model.classes_
+    if isinstance(model, MappedNaiveBayes):
+        return "naive_bayes", model.arrays["feature_log_prob"], model.arrays["class_log_prior"], model.classes_
+    return None
+
+
+def _softmax(scores):
+    exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class FusedLinearScorer:
+    """
+    Evalúa a la vez todos los modelos lineales de un bundle: sus pesos se apilan en
+    una sola matriz densa [términos x salidas], de modo que un único producto
+    disperso-denso `X · W + b` da las puntuaciones de todos. Cada modelo ocupa unas
+    columnas de esa matriz y sus predicciones y probabilidades se calculan como en
+    sklearn (signo o sigmoide para la logística binaria, argmax o softmax para el
+    resto). Los modelos no lineales se ignoran: se evalúan con su propio `predict`.
+    """
+
+    def __init__(self, models):
+        """
+        :param models: Diccionario {nombre: modelo}; los valores None o no lineales se omiten.
+        """
+        self.kinds = {}
+        self.classes = {}
+        self.columns = {}
+        weights = []
+        biases = []
+        offset = 0
+        for name, model in models.items():
+            parts = linear_parts(model) if model is not None else None
+            if parts is None:
+                continue
+            kind, coef, intercept, classes = parts
+            coef = np.asarray(coef, dtype=np.float64)
+            self.kinds[name] = kind
+            self.classes[name] = np.asarray(classes)
+            self.columns[name] = slice(offset, offset + coef.shape[0])
+            offset += coef.shape[0]
+            weights.append(coef)
+            biases.append(np.asarray(intercept, dtype=np.float64).ravel())
+
+        if weights:
+            # Matriz [términos x salidas] contigua: el producto recorre cada fila de X una sola vez
+            self.weights = np.ascontiguousarray(np.vstack(weights).T)
+            self.bias = np.concatenate(biases)
+        else:
+            self.weights = None
+            self.bias = None
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __len__(self):
+        return len(self.columns)
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    @property
+    def nbytes(self):
+        return 0 if self.weights is None else self.weights.nbytes + self.bias.nbytes
+
+    def scores(self, X):
+        """
+        Puntuaciones de todos los modelos fusionados: matriz [documentos x salidas].
+        """
+        return np.asarray(X @ self.weights) + self.bias
+
+    def _model_scores(self, scores, name):
+        model_scores = scores[:, self.columns[name]]
+        return model_scores.ravel() if model_scores.shape[1] == 1 else model_scores
+
+    def predict(self, X, names=None):
+        """
+        :return: Diccionario {nombre: predicciones}, idéntico a `model.predict(X)`.
+        """
+        scores = self.scores(X)
+        predictions = {}
+        for name in names or self.names:
+            model_scores = self._model_scores(scores, name)
+            if model_scores.ndim == 1:
+                predictions[name] = self.classes[name][(model_scores > 0).astype(int)]
+            else:
+                predictions[name] = self.classes[name][np.argmax(model_scores, axis=1)]
+        return predictions
+
+    def predict_proba(self, X, names=None):
+        """
+        :return: Diccionario {nombre: probabilidades}, como `model.predict_proba(X)`.
+        """
+        scores = self.scores(X)
+        probabilities = {}
+        for name in names or self.names:
+            model_scores = self._model_scores(scores, name)
+            if model_scores.ndim == 1:
+                positive = 1 / (1 + np.exp(-model_scores))
+                probabilities[name] = np.column_stack([1 - positive, positive])
+            else:
+                probabilities[name] = _softmax(model_scores)
+        return probabilities
+
+
+def predict_models(bundle, model_names, X):
+    """
+    Predice `X` con varios modelos del bundle: los lineales con un único producto
+    del `FusedLinearScorer` del bundle y el resto con su `predict` de sklearn. Las
+    tareas se ejecutan a la vez en el `inference_pool`.
+
+    :return: Tupla ({modelo: predicciones}, {modelo: segundos}). Cada tiempo es el
+        medido en su hilo; el del producto fusionado se reparte a partes iguales
+        entre sus modelos.
+    """
+    scorer = bundle.linear_scorer(model_names)
+    fused = [name for name in model_names if name in scorer]
+
+    tasks = {}
+    if fused:
+        tasks[FUSED_TASK] = partial(scorer.predict, X, fused)
+    for model_name in model_names:
+        if model_name in scorer:
+            continue
+        model = bundle.models.get(model_name)
+        if model is not None:
+            tasks[model_name] = partial(model.predict, X)
+
+    predictions = {}
+    prediction_times = {}
+    for task_name, (result, elapsed) in inference_pool.run(tasks).items():
+        if task_name == FUSED_TASK:
+            predictions.update(result)
+            prediction_times.update({name: elapsed / len(fused) for name in fused})
+        else:
+            predictions[task_name] = result
+            prediction_times[task_name] = elapsed
+
+    # Mismo orden que `model_names`, como antes de paralelizar
+    order = {name: index for index, name in enumerate(model_names)}
+    predictions = dict(sorted(predictions.items(), key=lambda item: order[item[0]]))
+    return predictions, prediction_times
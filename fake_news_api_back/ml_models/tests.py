@@ -1,3 +1,233 @@
-from django.test import TestCase
+import glob
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import SGDClassifier
+from sklearn.neural_network import MLPClassifier
+from django.test import SimpleTestCase
+from datasets.loader import DATASET_PATH, iter_dataset_chunks, load_dataset
+from ml_models.artifacts import export_artifacts, load_artifact
+from ml_models.bundles import MANIFEST_FILE, BundleManager
+from ml_models.featurizers import build_vectorizer
+from ml_models.incremental import IncrementalTrainer, build_incremental_models
+from ml_models.models import MODEL_FILES, VECTORIZER_FILE, safe_load_model
+from ml_models.parallel import parallel_fit_transform, parallel_preprocess, parallel_transform
+from ml_models.processor import preprocess_text, preprocess_texts, preprocess_text_nltk
+from ml_models.scoring import FusedLinearScorer
 
-# Create your tests here.
+
+class PreprocessTextsGoldenTests(SimpleTestCase):
+    """
+    El preprocesador por lotes debe producir exactamente la misma salida que la
+    implementación original con NLTK sobre todo el corpus de `datasets/raw`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.corpus = []
+        for file_path in sorted(glob.glob(os.path.join(DATASET_PATH, "*.csv"))):
+            df = pd.read_csv(file_path)
+            for column in df.columns:
+                cls.corpus.extend(df[column].tolist())
+
+    def test_matches_nltk_on_raw_datasets(self):
+        golden = [preprocess_text_nltk(text) for text in self.corpus]
+        self.assertEqual(list(preprocess_texts(self.corpus)), golden)
+
+    def test_matches_nltk_on_edge_cases(self):
+        edge_cases = [
+            "", None, 3.5,
+            "Visita https://example.com o www.example.com en 2024",
+            "¿Cannot? «Gonna» “wanna” ‘gotta’ lemme—gimme „x“",
+            "wanna\nWANNA” cannot¿cannot",
+        ]
+        for text in edge_cases:
+            self.assertEqual(preprocess_text(text), preprocess_text_nltk(text))
+
+
+class ParallelPreprocessingParityTests(SimpleTestCase):
+    """
+    Con varios procesos, el preprocesado y la vectorización de `primetrain` deben dar
+    exactamente lo mismo que en serie: textos, vocabulario y matrices CSR (incluido
+    el orden interno de los índices de cada fila).
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.texts = load_dataset(columns=["text"])["text"][:300].tolist()
+
+    def assertSameMatrix(self, parallel, serial):
+        self.assertEqual(parallel.shape, serial.shape)
+        np.testing.assert_array_equal(parallel.indptr, serial.indptr)
+        np.testing.assert_array_equal(parallel.indices, serial.indices)
+        np.testing.assert_array_equal(parallel.data, serial.data)
+
+    def test_preprocess_matches_serial(self):
+        self.assertEqual(parallel_preprocess(self.texts, workers=2, chunk_size=50), parallel_preprocess(self.texts, workers=1))
+
+    def test_count_vectorizer_matches_serial(self):
+        clean_texts = parallel_preprocess(self.texts, workers=1)
+        serial_vectorizer = build_vectorizer("count")
+        parallel_vectorizer = build_vectorizer("count")
+        serial = parallel_fit_transform(serial_vectorizer, clean_texts, workers=1)
+        parallel = parallel_fit_transform(parallel_vectorizer, clean_texts, workers=2, chunk_size=50)
+
+        self.assertEqual(parallel_vectorizer.vocabulary_, serial_vectorizer.vocabulary_)
+        self.assertSameMatrix(parallel, serial)
+        self.assertSameMatrix(
+            parallel_transform(parallel_vectorizer, clean_texts, workers=2, chunk_size=50),
+            serial_vectorizer.transform(clean_texts),
+        )
+
+    def test_hashing_vectorizer_matches_serial(self):
+        clean_texts = parallel_preprocess(self.texts, workers=1)
+        vectorizer = build_vectorizer("hashing", 2 ** 12)
+        self.assertSameMatrix(
+            parallel_fit_transform(vectorizer, clean_texts, workers=2, chunk_size=50),
+            parallel_fit_transform(vectorizer, clean_texts, workers=1),
+        )
+
+
+@unittest.skipUnless(
+    os.path.exists(VECTORIZER_FILE) and os.path.exists(MODEL_FILES["logistic"]) and os.path.exists(MODEL_FILES["naive_bayes"]),
+    "Faltan los modelos entrenados en ml_models/",
+)
+class FusedLinearScorerParityTests(SimpleTestCase):
+    """
+    El producto fusionado debe dar las mismas predicciones y probabilidades que los
+    modelos lineales serializados sobre `datasets/raw/test.csv`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.models = {name: safe_load_model(file_path) for name, file_path in MODEL_FILES.items() if os.path.exists(file_path)}
+        vectorizer = safe_load_model(VECTORIZER_FILE)
+        df = pd.read_csv(os.path.join(DATASET_PATH, "test.csv"))
+        cls.X = vectorizer.transform(list(preprocess_texts(df["text"])))
+        cls.scorer = FusedLinearScorer(cls.models)
+
+    def test_fuses_only_linear_models(self):
+        self.assertEqual(sorted(self.scorer.names), ["logistic", "naive_bayes"])
+        self.assertNotIn("xgboost", self.scorer)
+
+    def test_predictions_match_pickled_models(self):
+        predictions = self.scorer.predict(self.X)
+        for name in self.scorer.names:
+            np.testing.assert_array_equal(predictions[name], self.models[name].predict(self.X))
+
+    def test_probabilities_match_pickled_models(self):
+        probabilities = self.scorer.predict_proba(self.X)
+        for name in self.scorer.names:
+            np.testing.assert_allclose(probabilities[name], self.models[name].predict_proba(self.X), rtol=1e-9, atol=1e-12)
+
+
+@unittest.skipUnless(
+    os.path.exists(VECTORIZER_FILE) and all(os.path.exists(MODEL_FILES[name]) for name in ("logistic", "naive_bayes", "xgboost")),
+    "Faltan los modelos entrenados en ml_models/",
+)
+class MappedArtifactParityTests(SimpleTestCase):
+    """
+    Los artefactos mapeados deben dar las mismas predicciones y probabilidades que
+    los modelos serializados sobre `datasets/raw/test.csv`. Los tipos sin pickle en
+    ml_models/ (bosque, MLP, SGD) se entrenan aquí en pequeño con el dataset.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.vectorizer = safe_load_model(VECTORIZER_FILE)
+        cls.models = {name: safe_load_model(MODEL_FILES[name]) for name in ("logistic", "naive_bayes", "xgboost")}
+        train = load_dataset()
+        X_train = cls.vectorizer.transform(list(preprocess_texts(train["text"])))
+        cls.models.update({
+            "random_forest": RandomForestClassifier(n_estimators=20, random_state=42),
+            "neural_network": MLPClassifier(hidden_layer_sizes=(16,), max_iter=300, random_state=42),
+            "sgd_logistic": SGDClassifier(loss="log_loss", random_state=42),
+        })
+        for name in ("random_forest", "neural_network", "sgd_logistic"):
+            cls.models[name].fit(X_train, train["label"])
+
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.results = export_artifacts(cls.vectorizer, cls.models, cls.directory.name)
+        df = pd.read_csv(os.path.join(DATASET_PATH, "test.csv"))
+        cls.texts = list(preprocess_texts(df["text"]))
+        cls.X = cls.vectorizer.transform(cls.texts)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def artifact(self, name):
+        return load_artifact(os.path.join(self.directory.name, name))
+
+    def test_every_artifact_is_exported(self):
+        self.assertEqual(self.results, {name: None for name in ["vectorizer", *self.models]})
+
+    def test_vectorizer_matches_pickled_vectorizer(self):
+        X_mapped = self.artifact("vectorizer").transform(self.texts)
+        self.assertEqual(X_mapped.shape, self.X.shape)
+        self.assertEqual((X_mapped != self.X).nnz, 0)
+
+    def test_predictions_match_pickled_models(self):
+        for name, model in self.models.items():
+            with self.subTest(model=name):
+                np.testing.assert_array_equal(self.artifact(name).predict(self.X), model.predict(self.X))
+
+    def test_probabilities_match_pickled_models(self):
+        for name, model in self.models.items():
+            with self.subTest(model=name):
+                np.testing.assert_allclose(self.artifact(name).predict_proba(self.X), model.predict_proba(self.X), rtol=1e-6, atol=1e-6)
+
+
+class IncrementalTrainingTests(SimpleTestCase):
+    """
+    El loader por fragmentos debe recorrer el mismo dataset que `load_dataset`, y el
+    `SGDClassifier` del entrenamiento incremental debe fusionarse como una logística.
+    """
+
+    def test_chunks_cover_dataset_with_mixed_labels(self):
+        chunks = list(iter_dataset_chunks(chunk_size=300))
+        df = load_dataset()
+        self.assertEqual(sum(len(chunk) for chunk in chunks), len(df))
+        self.assertEqual(sorted(pd.concat(chunks)["text"]), sorted(df["text"]))
+        self.assertTrue(all(chunk["label"].nunique() == 2 for chunk in chunks))
+
+    def test_sgd_logistic_matches_fused_scorer(self):
+        vectorizer = build_vectorizer("hashing", 2 ** 12)
+        model = build_incremental_models()["logistic"]
+        trainer = IncrementalTrainer(vectorizer, {"logistic": model}, holdout=0)
+        for chunk in iter_dataset_chunks(chunk_size=300):
+            trainer.fit_chunk(chunk)
+
+        X = vectorizer.transform(list(preprocess_texts(load_dataset()["text"][:200])))
+        scorer = FusedLinearScorer({"logistic": model})
+        np.testing.assert_array_equal(scorer.predict(X)["logistic"], model.predict(X))
+        # Con la matriz float32 del hashing, el SGD guarda coeficientes float32 y sklearn
+        # calcula en esa precisión; el producto fusionado acumula en float64
+        np.testing.assert_allclose(scorer.predict_proba(X)["logistic"], model.predict_proba(X), atol=1e-6)
+
+
+class BundleVersionTests(SimpleTestCase):
+    """
+    Las versiones se ordenan por marca de tiempo y sufijo numérico, y los bundles
+    a medio crear (`.tmp`) no cuentan como versión.
+    """
+
+    def test_versions_order_and_skip_partial_bundles(self):
+        with tempfile.TemporaryDirectory() as bundles_path:
+            names = ["20251018-101010-10", "20251018-101010", "20251018-101010-2", "20251018-101011.tmp", "20251017-235959"]
+            for name in names:
+                os.makedirs(os.path.join(bundles_path, name))
+                with open(os.path.join(bundles_path, name, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                    f.write("{}")
+
+            self.assertEqual(BundleManager(bundles_path=bundles_path).versions(), [
+                "20251017-235959", "20251018-101010", "20251018-101010-2", "20251018-101010-10",
+            ])
@@ -0,0 +1,208 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+
+
+def make_cache_key(clean_text, model_names, model_version):
+    """
+    Clave de caché: hash del texto preprocesado + conjunto de modelos + versión de los modelos.
+
+    Se usa el texto preprocesado para que variaciones que el modelo no distingue
+    (mayúsculas, puntuación, URLs, números) compartan la misma entrada.
+    """
+    digest = hashlib.sha256()
+    digest.update(clean_text.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(",".join(sorted(model_names)).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(str(model_version).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class BasePredictionCache:
+    """
+    Interfaz común de los backends de caché de predicciones, con contadores de aciertos y fallos.
+    """
+    backend_name = "base"
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, value):
+        raise NotImplementedError
+
+    def size(self):
+        return None
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get(self, key):
+        value = self._get(key)
+        with self._counter_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._set(key, value)
+
+    def get_or_compute(self, key, compute, cacheable=None):
+        """
+        Devuelve el valor cacheado o lo calcula con `compute()` y lo guarda.
+
+        :param cacheable: Función opcional que decide si un valor calculado se guarda
+            (por ejemplo, para no cachear respuestas con la explicación de error).
+        """
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                self.set(key, value)
+        return value
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0,
+            "size": self.size(),
+        }
+
+
+class LocalPredictionCache(BasePredictionCache):
+    """
+    Caché en memoria del proceso con expulsión LRU por tamaño y expiración por TTL.
+    """
+    backend_name = "local"
+
+    def __init__(self, max_entries, ttl):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        if self.max_entries <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            # Las entradas más antiguas están al principio: primero caducadas, luego por tamaño
+            while self._entries:
+                oldest_key, (expires_at, _) = next(iter(self._entries.items()))
+                if expires_at >= now and len(self._entries) <= self.max_entries:
+                    break
+                del self._entries[oldest_key]
+
+    def size(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DjangoPredictionCache(BasePredictionCache):
+    """
+    Caché sobre el framework de caché de Django (compartida entre procesos si el
+    backend configurado lo es, p. ej. Redis o Memcached). El límite de tamaño lo
+    impone la configuración de `CACHES`.
+
+    El alias suele ser compartido (sesiones, throttling...), así que `clear` no
+    vacía la caché: cambia la generación guardada en `generation_key`, que forma
+    parte de cada clave, y las entradas anteriores dejan de leerse y caducan solas.
+    """
+    backend_name = "django"
+    key_prefix = "prediction:"
+    generation_key = "prediction:generation"
+
+    def __init__(self, alias, ttl):
+        super().__init__(ttl)
+        self.alias = alias
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _generation(self):
+        generation = self._cache.get(self.generation_key)
+        if generation is None:
+            # Una generación nueva (no un contador) para no reutilizar una antigua si la clave se expulsa
+            self._cache.add(self.generation_key, time.time_ns(), timeout=None)
+            generation = self._cache.get(self.generation_key)
+        return generation
+
+    def _key(self, key):
+        return f"{self.key_prefix}{self._generation()}:{key}"
+
+    def _get(self, key):
+        return self._cache.get(self._key(key))
+
+    def _set(self, key, value):
+        self._cache.set(self._key(key), value, timeout=self.ttl)
+
+    def clear(self):
+        self._cache.set(self.generation_key, time.time_ns(), timeout=None)
+
+
+class NullPredictionCache(BasePredictionCache):
+    """
+    Backend que no guarda nada (caché desactivada), pero mantiene los contadores.
+    """
+    backend_name = "none"
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+
+def build_prediction_cache(config=None):
+    """
+    Construye el backend de caché configurado en `settings.PREDICTION_CACHE`.
+    """
+    config = config or settings.PREDICTION_CACHE
+    backend = config.get("BACKEND", "local")
+    ttl = config.get("TTL", 3600)
+
+    if backend == "local":
+        return LocalPredictionCache(max_entries=config.get("MAX_ENTRIES", 10000), ttl=ttl)
+    if backend == "django":
+        return DjangoPredictionCache(alias=config.get("ALIAS", "default"), ttl=ttl)
+    if backend == "none":
+        return NullPredictionCache(ttl=ttl)
+    raise ValueError(f"Backend de caché de predicciones no válido: {backend}")
+
+
+prediction_cache = build_prediction_cache()
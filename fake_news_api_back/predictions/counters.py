@@ -0,0 +1,107 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, F
+from predictions.models import Prediction, PredictionCounter
+
+TOTAL_KEY = "total"
+
+
+def counter_deltas(predictions):
+    """
+    Incrementos de los contadores que corresponden a unas filas de `Prediction`.
+    """
+    deltas = Counter()
+    for prediction in predictions:
+        deltas[TOTAL_KEY] += 1
+        deltas[f"prediction:{prediction.prediction}"] += 1
+        deltas[f"model_used:{prediction.model_used}"] += 1
+        for model_name, verdict in prediction.verdicts.items():
+            deltas[f"verdict:{model_name}:{verdict}"] += 1
+    return deltas
+
+
+def apply_counter_deltas(deltas):
+    """
+    Suma los incrementos en la base de datos con `UPDATE ... SET value = value + n`,
+    sin leer los valores, así que varios workers pueden escribir a la vez. Debe
+    llamarse en la misma transacción que inserta las filas.
+    """
+    if not deltas:
+        return
+    PredictionCounter.objects.bulk_create(
+        [PredictionCounter(key=key) for key in sorted(deltas)],
+        ignore_conflicts=True,
+    )
+    # Orden fijo de las claves para que dos transacciones no se bloqueen mutuamente
+    for key in sorted(deltas):
+        PredictionCounter.objects.filter(key=key).update(value=F("value") + deltas[key])
+
+
+def compute_counters():
+    """
+    Contadores calculados desde cero sobre `Prediction` (recorre toda la tabla).
+    """
+    counters = Counter()
+    groups = Prediction.objects.values("prediction", "model_used", "verdicts").annotate(rows=Count("id")).order_by()
+    for group in groups:
+        rows = group["rows"]
+        counters[TOTAL_KEY] += rows
+        counters[f"prediction:{group['prediction']}"] += rows
+        counters[f"model_used:{group['model_used']}"] += rows
+        for model_name, verdict in group["verdicts"].items():
+            counters[f"verdict:{model_name}:{verdict}"] += rows
+    return counters
+
+
+def reconcile_counters():
+    """
+    Recalcula los contadores y corrige los que se hayan desviado.
+
+    Primero bloquea las filas de contadores, en el mismo orden de claves que
+    `apply_counter_deltas` para no bloquearse mutuamente con un writer: uno que ya
+    las ha actualizado termina antes (y sus filas entran en el recuento), y uno que
+    llegue después espera y suma su incremento sobre el valor corregido.
+
+    :return: Diccionario {clave: (valor guardado, valor real)} de los contadores corregidos.
+    """
+    with transaction.atomic():
+        stored = dict(PredictionCounter.objects.select_for_update().order_by("key").values_list("key", "value"))
+        actual = compute_counters()
+
+        corrections = {}
+        for key in set(stored) | set(actual):
+            if stored.get(key, 0) != actual.get(key, 0):
+                corrections[key] = (stored.get(key, 0), actual.get(key, 0))
+
+        PredictionCounter.objects.bulk_create(
+            [PredictionCounter(key=key) for key in corrections if key not in stored],
+            ignore_conflicts=True,
+        )
+        for key, (_, value) in corrections.items():
+            PredictionCounter.objects.filter(key=key).update(value=value)
+    return corrections
+
+
+def read_counters():
+    """
+    Contadores agrupados para `InsightsView`, con una sola consulta a una tabla que
+    solo crece con el número de modelos.
+    """
+    counters = dict(PredictionCounter.objects.values_list("key", "value"))
+    by_model_used = {}
+    by_model_verdict = {}
+    for key, value in counters.items():
+        kind, _, name = key.partition(":")
+        if kind == "model_used":
+            by_model_used[name] = value
+        elif kind == "verdict":
+            model_name, _, verdict = name.rpartition(":")
+            by_model_verdict.setdefault(model_name, {})[verdict] = value
+
+    return {
+        "total": counters.get(TOTAL_KEY, 0),
+        "real": counters.get("prediction:Real", 0),
+        "fake": counters.get("prediction:Fake", 0),
+        "model_used": by_model_used,
+        "verdicts": by_model_verdict,
+    }
@@ -0,0 +1,383 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import requests
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from predictions.llm_client import build_llm_client
+from predictions.models import Explanation, text_hash
+
+
+class ExplanationGenerator:
+    FALLBACK_EXPLANATION = "No se pudo generar una explicación en este momento."
+    EMPTY_EXPLANATION = "No se generó una explicación válida."
+
+    def __init__(self, client):
+        self.client = client
+
+    def build_request(self, text, predictions, final_prediction, confidence):
+        prompt = f"""
+        Eres un asistente experto en análisis de noticias, especializado en detectar si una noticia es falsa o real.
+
+        Tu tarea es analizar el siguiente texto de noticia y los resultados de la predicción para explicar de manera clara y sencilla por qué se concluyó que la noticia es {final_prediction}. Asegúrate de que el texto no contenga lenguaje violento, sexual, de odio o de autolesión.
+
+        ### Texto de la noticia:
+        {text}
+
+        ### Resultados de la predicción:
+        {json.dumps(predictions, indent=2)}
+
+        ### Predicción final:
+        {final_prediction}
+
+        ### Confianza del modelo:
+        {confidence}
+
+        Por favor, genera una explicación detallada siguiendo esta estructura:
+
+        1. Análisis del texto: Identifica y describe los elementos clave del texto (como el tono emocional, la ausencia de fuentes confiables o inconsistencias en los datos) que pudieron influir en la predicción.
+        2. Razones del resultado: Explica, en términos sencillos, cómo el modelo llegó a la conclusión de que la noticia es {final_prediction} basándose en los resultados obtenidos.
+        3. Factores relevantes: Menciona otros aspectos o detalles del texto y del contexto que podrían influir en la confianza del resultado.
+
+        Asegúrate de que la explicación sea clara, concisa y comprensible para un público general sin conocimientos técnicos en inteligencia artificial, LO IMPORTANTE ES EL ANALISIS DE LA NOTICIA.
+        """
+
+        data = {
+            "messages": [
+                {"role": "system", "content": "Eres un asistente que explica predicciones de noticias."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 1000,  
+            "temperature": 0.7  
+        }
+        return data
+
+    def generate_explanation(self, text, predictions, final_prediction, confidence):
+        data = self.build_request(text, predictions, final_prediction, confidence)
+
+        try:
+            with self.client.request(data) as response:
+                explanation = response.json().get("choices", [{}])[0].get("message", {}).get("content", "")
+            return explanation if explanation else self.EMPTY_EXPLANATION
+        except requests.exceptions.RequestException as e:
+            print(f"Error en la solicitud a la API: {e}")
+            print(f"Respuesta de la API: {getattr(e.response, 'text', 'No hay respuesta')}")
+            return self.FALLBACK_EXPLANATION
+
+    def stream_explanation(self, text, predictions, final_prediction, confidence):
+        """
+        Igual que `generate_explanation`, pero usando la respuesta en streaming del
+        LLM (server-sent events): genera los fragmentos de texto según llegan.
+        Lanza `requests.exceptions.RequestException` si la llamada falla.
+        """
+        data = self.build_request(text, predictions, final_prediction, confidence)
+        data["stream"] = True
+
+        with self.client.request(data, stream=True) as response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                choices = json.loads(payload).get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+
+def explanation_key(text, predictions, final_prediction, model_version):
+    """
+    Clave de una explicación: hash del texto, predicción final, veredicto de cada
+    modelo y versión de los modelos. Métricas volátiles como `prediction_time`
+    no forman parte de la clave.
+    """
+    verdicts = {name: result["prediction"] for name, result in predictions.items()}
+    digest = hashlib.sha256()
+    digest.update(text_hash(text).encode())
+    digest.update(final_prediction.encode())
+    digest.update(json.dumps(verdicts, sort_keys=True).encode())
+    digest.update(str(model_version).encode())
+    return digest.hexdigest()
+
+
+class ExplanationJob:
+    """
+    Generación de una explicación en segundo plano. Acumula los fragmentos que
+    llegan del LLM para que puedan consultarse (polling) o retransmitirse (SSE)
+    mientras la generación continúa.
+    """
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, key):
+        self.key = key
+        self.status = self.PENDING
+        self.finished_at = None
+        self._chunks = []
+        self._condition = threading.Condition()
+
+    @classmethod
+    def completed(cls, key, explanation):
+        job = cls(key)
+        job.append(explanation)
+        job.finish(cls.DONE)
+        return job
+
+    @property
+    def text(self):
+        with self._condition:
+            return "".join(self._chunks)
+
+    def append(self, chunk):
+        with self._condition:
+            self._chunks.append(chunk)
+            self._condition.notify_all()
+
+    def finish(self, status, replacement=None):
+        with self._condition:
+            if replacement is not None:
+                self._chunks = [replacement]
+            self.status = status
+            self.finished_at = time.monotonic()
+            self._condition.notify_all()
+
+    def snapshot(self, since=0):
+        """
+        :return: Tupla (fragmentos nuevos desde el índice `since`, estado actual).
+        """
+        with self._condition:
+            return self._chunks[since:], self.status
+
+    def wait(self, timeout):
+        """
+        Espera a que termine la generación y devuelve el texto, o None si se agota el tiempo.
+        """
+        with self._condition:
+            finished = self._condition.wait_for(lambda: self.status != self.PENDING, timeout)
+            return "".join(self._chunks) if finished else None
+
+
+class MemoizedExplanationGenerator:
+    """
+    Envuelve un `ExplanationGenerator` guardando las explicaciones en la base de
+    datos (modelo `Explanation`) para reutilizarlas entre peticiones y procesos.
+
+    Cada explicación se genera como un `ExplanationJob` en un pool de hilos acotado,
+    usando la respuesta en streaming del LLM. Las peticiones concurrentes con la
+    misma clave dentro de un proceso comparten un único job en lugar de lanzar
+    cada una su propia llamada.
+
+    El job solo existe en el proceso que lo lanzó, así que su progreso también se
+    escribe en su fila de `Explanation` (estado "pending", como mucho cada
+    `progress_interval` segundos): con varios workers, el polling o el SSE que
+    llega a otro proceso lo sigue desde la base de datos.
+    """
+
+    def __init__(self, generator, ttl, max_entries, wait_timeout, workers=4, job_retention=300,
+                 progress_interval=0.5, pending_timeout=120):
+        self.generator = generator
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self.job_retention = job_retention
+        self.progress_interval = progress_interval
+        self.pending_timeout = pending_timeout
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="explanations")
+        self._saves = 0
+
+    def is_storable(self, explanation):
+        return bool(explanation) and explanation not in (
+            ExplanationGenerator.FALLBACK_EXPLANATION,
+            ExplanationGenerator.EMPTY_EXPLANATION,
+        )
+
+    def lookup(self, key):
+        """
+        Devuelve la explicación guardada para `key` si existe, está terminada y no ha caducado.
+        """
+        stored = (
+            Explanation.objects
+            .filter(key=key, status=ExplanationJob.DONE, created_at__gte=timezone.now() - timedelta(seconds=self.ttl))
+            .values_list("content", flat=True)
+            .first()
+        )
+        return stored
+
+    def lookup_state(self, key):
+        """
+        Estado de la explicación según la base de datos, para seguir un job lanzado
+        en otro proceso. Un job "pending" sin progreso en `pending_timeout` segundos
+        se da por perdido (su proceso terminó) y se devuelve como fallido.
+
+        :return: Tupla (texto hasta el momento, estado) o None si no existe o ha caducado.
+        """
+        stored = (
+            Explanation.objects
+            .filter(key=key, created_at__gte=timezone.now() - timedelta(seconds=self.ttl))
+            .values_list("content", "status", "created_at")
+            .first()
+        )
+        if stored is None:
+            return None
+        content, job_status, updated_at = stored
+        if job_status == ExplanationJob.PENDING and timezone.now() - updated_at > timedelta(seconds=self.pending_timeout):
+            return ExplanationGenerator.FALLBACK_EXPLANATION, ExplanationJob.FAILED
+        return content, job_status
+
+    def save(self, key, text, predictions, final_prediction, model_version, explanation, status=ExplanationJob.DONE):
+        Explanation.objects.update_or_create(
+            key=key,
+            defaults={
+                "text_hash": text_hash(text),
+                "final_prediction": final_prediction,
+                "verdicts": {name: result["prediction"] for name, result in predictions.items()},
+                "model_version": model_version,
+                "content": explanation,
+                "status": status,
+                "created_at": timezone.now(),
+            },
+        )
+        if status != ExplanationJob.DONE:
+            return
+        with self._lock:
+            self._saves += 1
+            run_eviction = self._saves % 100 == 0
+        if run_eviction:
+            evict_explanations(self.ttl, self.max_entries)
+
+    def get_job(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _prune_jobs(self):
+        now = time.monotonic()
+        for key, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > self.job_retention:
+                del self._jobs[key]
+
+    def submit(self, text, predictions, final_prediction, confidence, model_version):
+        """
+        Devuelve el job de la explicación: ya terminado si estaba guardada, el job
+        en curso si otra petición idéntica lo lanzó, o uno nuevo en segundo plano.
+        """
+        key = explanation_key(text, predictions, final_prediction, model_version)
+
+        job = self.get_job(key)
+        if job is not None and job.status != ExplanationJob.FAILED:
+            return job
+
+        stored = self.lookup(key)
+        if stored is not None:
+            return ExplanationJob.completed(key, stored)
+
+        with self._lock:
+            self._prune_jobs()
+            job = self._jobs.get(key)
+            if job is not None and job.status != ExplanationJob.FAILED:
+                return job
+            job = self._jobs[key] = ExplanationJob(key)
+
+        # La fila "pending" existe antes de devolver la clave, para que otro proceso la encuentre
+        self.save(key, text, predictions, final_prediction, model_version, "", status=ExplanationJob.PENDING)
+        self._executor.submit(self._run, job, text, predictions, final_prediction, confidence, model_version)
+        return job
+
+    def save_progress(self, key, explanation):
+        """
+        Guarda el texto recibido hasta el momento de un job en curso.
+        """
+        Explanation.objects.filter(key=key, status=ExplanationJob.PENDING).update(
+            content=explanation, created_at=timezone.now(),
+        )
+
+    def _run(self, job, text, predictions, final_prediction, confidence, model_version):
+        try:
+            saved_at = time.monotonic()
+            for chunk in self.generator.stream_explanation(text, predictions, final_prediction, confidence):
+                job.append(chunk)
+                if time.monotonic() - saved_at >= self.progress_interval:
+                    self.save_progress(job.key, job.text)
+                    saved_at = time.monotonic()
+
+            explanation = job.text
+            if not self.is_storable(explanation):
+                self.save(job.key, text, predictions, final_prediction, model_version,
+                          ExplanationGenerator.EMPTY_EXPLANATION, status=ExplanationJob.FAILED)
+                job.finish(ExplanationJob.FAILED, replacement=ExplanationGenerator.EMPTY_EXPLANATION)
+                return
+
+            self.save(job.key, text, predictions, final_prediction, model_version, explanation)
+            job.finish(ExplanationJob.DONE)
+        except Exception as e:
+            print(f"Error generando la explicación {job.key[:12]}: {e}")
+            try:
+                self.save(job.key, text, predictions, final_prediction, model_version,
+                          ExplanationGenerator.FALLBACK_EXPLANATION, status=ExplanationJob.FAILED)
+            except Exception as save_error:
+                print(f"Error guardando el fallo de la explicación {job.key[:12]}: {save_error}")
+            job.finish(ExplanationJob.FAILED, replacement=ExplanationGenerator.FALLBACK_EXPLANATION)
+        finally:
+            connections.close_all()
+
+    def generate_explanation(self, text, predictions, final_prediction, confidence, model_version):
+        """
+        Modo síncrono: espera a la explicación (hasta `wait_timeout` segundos).
+        Si no llega a tiempo se devuelve el mensaje de respaldo; el job sigue en
+        segundo plano y su resultado queda guardado para la próxima petición.
+        """
+        job = self.submit(text, predictions, final_prediction, confidence, model_version)
+        explanation = job.wait(self.wait_timeout)
+        return explanation or ExplanationGenerator.FALLBACK_EXPLANATION
+
+
+def evict_explanations(ttl, max_entries):
+    """
+    Borra las explicaciones caducadas y, si se supera `max_entries`, las más antiguas.
+
+    :return: Número de explicaciones borradas.
+    """
+    deleted, _ = Explanation.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=ttl)).delete()
+
+    overflow_ids = list(
+        Explanation.objects.order_by("-created_at").values_list("id", flat=True)[max_entries:]
+    )
+    if overflow_ids:
+        overflow_deleted, _ = Explanation.objects.filter(id__in=overflow_ids).delete()
+        deleted += overflow_deleted
+    return deleted
+
+
+def invalidate_explanations(model_version=None):
+    """
+    Invalida las explicaciones guardadas: todas, o solo las que no pertenecen a `model_version`.
+    Se usa al reentrenar los modelos, porque los veredictos y la confianza cambian.
+
+    :return: Número de explicaciones borradas.
+    """
+    queryset = Explanation.objects.all()
+    if model_version is not None:
+        queryset = queryset.exclude(model_version=model_version)
+    deleted, _ = queryset.delete()
+    return deleted
+
+
+llm_client = build_llm_client()
+
+explanation_generator = MemoizedExplanationGenerator(
+    ExplanationGenerator(llm_client),
+    ttl=settings.EXPLANATION_CACHE["TTL"],
+    max_entries=settings.EXPLANATION_CACHE["MAX_ENTRIES"],
+    wait_timeout=settings.EXPLANATION_CACHE["WAIT_TIMEOUT"],
+    workers=settings.EXPLANATION_CACHE["WORKERS"],
+    job_retention=settings.EXPLANATION_CACHE["JOB_RETENTION"],
+    progress_interval=settings.EXPLANATION_CACHE["PROGRESS_INTERVAL"],
+    pending_timeout=settings.EXPLANATION_CACHE["PENDING_TIMEOUT"],
+)
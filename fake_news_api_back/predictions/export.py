@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from predictions.models import Prediction
+
+EXPORT_FIELDS = ["id", "created_at", "prediction", "model_used", "verdicts", "model_version", "latency", "text_hash", "text"]
+
+
+def export_queryset(start=None, end=None, model_used=None, include_text=True):
+    """
+    Consulta (sin ordenar ni paginar) de las predicciones a exportar, como diccionarios.
+    El texto se lee de `SubmittedText` con un join.
+    """
+    queryset = Prediction.objects.all()
+    if start is not None:
+        queryset = queryset.filter(created_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(created_at__lt=end)
+    if model_used:
+        queryset = queryset.filter(model_used=model_used)
+
+    fields = {"text_hash": F("submitted_text__text_hash")}
+    if include_text:
+        fields["text"] = F("submitted_text__text")
+    return queryset.values("id", "created_at", "prediction", "model_used", "verdicts", "model_version", "latency", **fields)
+
+
+def _page(queryset, after_id, page_size):
+    return queryset.filter(id__gt=after_id).order_by("id")[:page_size]
+
+
+def export_rows(queryset, after_id=0, page_size=1000, limit=None):
+    """
+    Recorre la consulta por páginas de `page_size` filas con paginación por clave
+    (`id > último id exportado`), no con OFFSET: cada página es una consulta corta
+    sobre el índice de la clave primaria, sin importar lo lejos que vaya la
+    exportación. Dentro de cada página las filas llegan con un cursor del servidor
+    (`iterator`), así que la memoria no crece con el número de filas.
+    """
+    exported = 0
+    while limit is None or exported < limit:
+        size = page_size if limit is None else min(page_size, limit - exported)
+        rows = 0
+        for row in _page(queryset, after_id, size).iterator(chunk_size=page_size):
+            yield row
+            after_id = row["id"]
+            rows += 1
+        exported += rows
+        if rows < size:
+            return
+
+
+async def aexport_rows(queryset, after_id=0, page_size=1000, limit=None):
+    """
+    Versión asíncrona de `export_rows` para las vistas servidas bajo ASGI.
+    """
+    exported = 0
+    while limit is None or exported < limit:
+        size = page_size if limit is None else min(page_size, limit - exported)
+        rows = 0
+        async for row in _page(queryset, after_id, size).aiterator(chunk_size=page_size):
+            yield row
+            after_id = row["id"]
+            rows += 1
+        exported += rows
+        if rows < size:
+            return
+
+
+def ndjson_line(row):
+    return json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def csv_header(include_text=True):
+    return csv_line({field: field for field in EXPORT_FIELDS}, include_text)
+
+
+def csv_line(row, include_text=True):
+    buffer = io.StringIO()
+    values = []
+    for field in EXPORT_FIELDS:
+        if field == "text" and not include_text:
+            continue
+        value = row[field]
+        if field == "verdicts" and isinstance(value, dict):
+            value = json.dumps(value, sort_keys=True)
+        elif hasattr(value, "isoformat"):
+            value = value.isoformat()
+        values.append("" if value is None else value)
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def format_line(row, export_format, include_text=True):
+    return ndjson_line(row) if export_format == "ndjson" else csv_line(row, include_text)
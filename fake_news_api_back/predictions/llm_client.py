@@ -0,0 +1,223 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class LLMUnavailableError(requests.exceptions.RequestException):
+    """
+    El cliente rechaza la llamada sin contactar con el LLM (circuito abierto o
+    límite de concurrencia agotado). Hereda de `RequestException` para que los
+    llamadores existentes la traten como cualquier otro fallo de red.
+    """
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+class ConcurrencyLimitError(LLMUnavailableError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de tres estados. Tras `failure_threshold` fallos consecutivos
+    se abre y rechaza las llamadas durante `reset_timeout` segundos; después deja
+    pasar una sola llamada de prueba (half-open) que lo cierra o lo vuelve a abrir.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            # Half-open: solo una llamada de prueba a la vez
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def cancel(self):
+        """
+        Libera la llamada de prueba sin contarla como éxito ni como fallo
+        (la llamada no llegó a completarse por motivos ajenos al LLM).
+        """
+        with self._lock:
+            self._probing = False
+
+
+class LLMClient:
+    """
+    Cliente HTTP del LLM de explicaciones: sesión con pool de conexiones keep-alive,
+    timeouts de conexión y lectura, concurrencia acotada con un semáforo, reintentos
+    con backoff exponencial y jitter, y circuit breaker.
+    """
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, url, api_key, pool_size=10, connect_timeout=3.05, read_timeout=30,
+                 max_concurrency=8, acquire_timeout=5, max_retries=2, backoff_base=0.5,
+                 backoff_max=8, breaker=None):
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.acquire_timeout = acquire_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+
+        self.session = requests.Session()
+        self.session.headers.update({"api-key": api_key or "", "Content-Type": "application/json"})
+        # Los reintentos los gestiona el cliente (con jitter y contando para el breaker)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self._counter_lock = threading.Lock()
+
+    def _count(self, name, delta=1):
+        with self._counter_lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def _backoff(self, attempt):
+        # "Full jitter": espera aleatoria entre 0 y el backoff exponencial
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _post(self, data, stream):
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = self.session.post(self.url, json=data, timeout=self.timeout, stream=stream)
+                if response.status_code not in self.RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response
+                error = requests.exceptions.HTTPError(f"{response.status_code} del LLM", response=response)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            except requests.exceptions.RequestException:
+                # Errores 4xx no reintentables
+                if response is not None:
+                    response.close()
+                raise
+
+            if response is not None:
+                response.close()
+            if attempt >= self.max_retries:
+                raise error
+            self._count("retries")
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    @contextmanager
+    def request(self, data, stream=False):
+        """
+        Envía `data` al LLM y devuelve la respuesta dentro de un context manager.
+        La plaza de concurrencia se mantiene hasta salir del bloque, de modo que
+        una respuesta en streaming cuenta mientras se está leyendo.
+
+        :raises CircuitOpenError: Si el circuito está abierto.
+        :raises ConcurrencyLimitError: Si no hay plaza libre en `acquire_timeout` segundos.
+        """
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("Circuito abierto: el LLM ha fallado repetidamente.")
+
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            self._count("rejected")
+            self.breaker.cancel()
+            raise ConcurrencyLimitError("Demasiadas llamadas simultáneas al LLM.")
+
+        self._count("calls")
+        self._count("in_flight")
+        response = None
+        try:
+            response = self._post(data, stream)
+            yield response
+            self.breaker.record_success()
+        except requests.exceptions.RequestException:
+            self._count("failures")
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.cancel()
+            raise
+        finally:
+            if response is not None:
+                response.close()
+            self._count("in_flight", -1)
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "circuit": self.breaker.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+def build_llm_client(config=None):
+    """
+    Construye el cliente del LLM con la configuración de `settings.LLM_CLIENT`.
+    """
+    config = config or settings.LLM_CLIENT
+    return LLMClient(
+        url=settings.AZURE_OPENAI_API_URL,
+        api_key=settings.AZURE_OPENAI_API_KEY,
+        pool_size=config["POOL_SIZE"],
+        connect_timeout=config["CONNECT_TIMEOUT"],
+        read_timeout=config["READ_TIMEOUT"],
+        max_concurrency=config["MAX_CONCURRENCY"],
+        acquire_timeout=config["ACQUIRE_TIMEOUT"],
+        max_retries=config["MAX_RETRIES"],
+        backoff_base=config["BACKOFF_BASE"],
+        backoff_max=config["BACKOFF_MAX"],
+        breaker=CircuitBreaker(
+            failure_threshold=config["BREAKER_THRESHOLD"],
+            reset_timeout=config["BREAKER_RESET_TIMEOUT"],
+        ),
+    )
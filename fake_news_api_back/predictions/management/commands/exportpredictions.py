@@ -0,0 +1,54 @@
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from predictions.export import csv_header, export_queryset, export_rows, format_line
+
+class Command(BaseCommand):
+    help = "Exporta el registro de predicciones a NDJSON o CSV en streaming, con paginación por clave."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson", help="Formato de salida.")
+        parser.add_argument("--output", "-o", help="Archivo de salida (por defecto, la salida estándar).")
+        parser.add_argument("--start", help="Solo predicciones desde esta fecha (ISO 8601, incluida).")
+        parser.add_argument("--end", help="Solo predicciones anteriores a esta fecha (ISO 8601, excluida).")
+        parser.add_argument("--model-used", help="Filtra por el modelo usado (o \"ensemble\").")
+        parser.add_argument("--after-id", type=int, default=0, help="Continúa a partir de este id.")
+        parser.add_argument("--limit", type=int, help="Máximo de filas a exportar.")
+        parser.add_argument("--no-text", action="store_true", help="No incluye el texto de las noticias.")
+        parser.add_argument("--page-size", type=int, default=settings.PREDICTION_EXPORT_PAGE_SIZE, help="Filas por consulta.")
+
+    def parse_date(self, value, name):
+        if value is None:
+            return None
+        moment = parse_datetime(value)
+        if moment is None:
+            raise CommandError(f"Fecha no válida en --{name}: {value}")
+        return moment
+
+    def handle(self, *args, **options):
+        export_format = options["format"]
+        include_text = not options["no_text"]
+        queryset = export_queryset(
+            self.parse_date(options["start"], "start"),
+            self.parse_date(options["end"], "end"),
+            options["model_used"],
+            include_text,
+        )
+
+        output = open(options["output"], "w", encoding="utf-8", newline="") if options["output"] else sys.stdout
+        exported = 0
+        last_id = options["after_id"]
+        try:
+            if export_format == "csv":
+                output.write(csv_header(include_text))
+            for row in export_rows(queryset, options["after_id"], options["page_size"], options["limit"]):
+                output.write(format_line(row, export_format, include_text))
+                exported += 1
+                last_id = row["id"]
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        # El resumen va a stderr para no mezclarse con los datos si se exporta a stdout
+        self.stderr.write(self.style.SUCCESS(f"✅ Predicciones exportadas: {exported} (último id: {last_id})"))
@@ -0,0 +1,98 @@
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand
+
+STUB_EXPLANATION = (
+    "Explicación de prueba generada por el servidor simulado del LLM. "
+    "El texto presenta un tono neutro y no cita fuentes verificables."
+)
+
+
+def build_handler(latency, jitter, error_rate, hang_rate, chunk_delay):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status_code, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+            roll = random.random()
+            if roll < hang_rate:
+                # Simula un upstream colgado: solo lo corta el timeout de lectura del cliente
+                time.sleep(3600)
+                return
+            time.sleep(max(0.0, random.gauss(latency, jitter)))
+            if roll < hang_rate + error_rate:
+                self._send_json(503, {"error": {"message": "Servicio no disponible (simulado)."}})
+                return
+
+            if not data.get("stream"):
+                self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": STUB_EXPLANATION}}]})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            words = STUB_EXPLANATION.split(" ")
+            for index, word in enumerate(words):
+                content = word if index == len(words) - 1 else word + " "
+                self._write_chunk(f"data: {json.dumps({'choices': [{'delta': {'content': content}}]})}\n\n")
+                time.sleep(chunk_delay)
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_chunk(self, text):
+            body = text.encode("utf-8")
+            self.wfile.write(f"{len(body):x}\r\n".encode() + body + b"\r\n")
+            self.wfile.flush()
+
+    return StubHandler
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta un servidor local que imita la API de chat del LLM (respuesta normal y en streaming) "
+        "con latencia, errores y cuelgues configurables, para probar el cliente sin acceso a red."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--latency", type=float, default=0.5, help="Latencia media en segundos antes de responder.")
+        parser.add_argument("--jitter", type=float, default=0.1, help="Desviación típica de la latencia.")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Proporción de respuestas 503.")
+        parser.add_argument("--hang-rate", type=float, default=0.0, help="Proporción de peticiones que nunca responden.")
+        parser.add_argument("--chunk-delay", type=float, default=0.02, help="Pausa entre fragmentos en streaming.")
+
+    def handle(self, *args, **options):
+        handler = build_handler(
+            latency=options["latency"],
+            jitter=options["jitter"],
+            error_rate=options["error_rate"],
+            hang_rate=options["hang_rate"],
+            chunk_delay=options["chunk_delay"],
+        )
+        server = ThreadingHTTPServer((options["host"], options["port"]), handler)
+        server.daemon_threads = True
+        url = f"http://{options['host']}:{options['port']}/"
+        self.stdout.write(f"🤖 Servidor simulado del LLM en {url}")
+        self.stdout.write(f"   Usa AZURE_OPENAI_API_URL={url} para apuntar la API a este servidor.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("🛑 Servidor detenido.")
+        finally:
+            server.server_close()
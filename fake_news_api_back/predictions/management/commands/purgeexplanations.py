@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ml_models.bundles import current_bundle
+from predictions.explanations import evict_explanations, invalidate_explanations
+
+class Command(BaseCommand):
+    help = "Expulsa las explicaciones del LLM caducadas o sobrantes, o las invalida todas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Borra todas las explicaciones guardadas.")
+        parser.add_argument("--stale", action="store_true", help="Borra las explicaciones de versiones de modelos anteriores.")
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            deleted = invalidate_explanations()
+        elif options["stale"]:
+            deleted = invalidate_explanations(model_version=current_bundle().version)
+        else:
+            deleted = evict_explanations(
+                settings.EXPLANATION_CACHE["TTL"],
+                settings.EXPLANATION_CACHE["MAX_ENTRIES"],
+            )
+        self.stdout.write(self.style.SUCCESS(f"✅ Explicaciones borradas: {deleted}"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from predictions.counters import reconcile_counters
+from predictions.rollups import rebuild_rollups
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los contadores agregados de predicciones desde la tabla y corrige las desviaciones. "
+        "Con --rollups reconstruye también los agregados por hora y por día (PredictionRollup) de las series temporales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rollups", action="store_true",
+            help="Reconstruye también los agregados por hora y por día de las series temporales.",
+        )
+
+    def handle(self, *args, **options):
+        corrections = reconcile_counters()
+        if not corrections:
+            self.stdout.write(self.style.SUCCESS("✅ Los contadores de predicciones coinciden con la tabla."))
+        else:
+            for key, (stored, actual) in sorted(corrections.items()):
+                self.stdout.write(f"🔧 {key}: {stored} → {actual}")
+            self.stdout.write(self.style.SUCCESS(f"✅ Contadores corregidos: {len(corrections)}"))
+
+        if options["rollups"]:
+            rollups = rebuild_rollups()
+            self.stdout.write(self.style.SUCCESS(f"✅ Agregados por hora y día reconstruidos: {rollups}"))
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:18
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Explanation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('text_hash', models.CharField(db_index=True, max_length=64)),
+                ('final_prediction', models.CharField(choices=[('Real', 'Real'), ('Fake', 'Fake')], max_length=10)),
+                ('verdicts', models.JSONField(default=dict)),
+                ('model_version', models.CharField(db_index=True, max_length=64)),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
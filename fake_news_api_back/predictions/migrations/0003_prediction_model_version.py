@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0002_explanation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='model_version',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
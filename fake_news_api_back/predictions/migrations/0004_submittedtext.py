@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0003_prediction_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmittedText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text_hash', models.CharField(max_length=64, unique=True)),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='prediction',
+            name='submitted_text',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='predictions', to='predictions.submittedtext'),
+        ),
+        migrations.AlterField(
+            model_name='prediction',
+            name='text',
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name='prediction',
+            name='verdicts',
+            field=models.JSONField(default=dict),
+        ),
+    ]
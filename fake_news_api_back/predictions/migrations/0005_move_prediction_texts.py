@@ -0,0 +1,51 @@
+import hashlib
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def move_texts(apps, schema_editor):
+    """
+    Mueve el texto de cada predicción a `SubmittedText` (una fila por texto distinto)
+    y guarda su veredicto en `verdicts`. Las filas antiguas eran una por modelo, así
+    que cada una conserva un único veredicto: {model_used: prediction}.
+    """
+    Prediction = apps.get_model('predictions', 'Prediction')
+    SubmittedText = apps.get_model('predictions', 'SubmittedText')
+
+    pending = Prediction.objects.filter(submitted_text__isnull=True).order_by('id')
+    while True:
+        batch = list(pending[:BATCH_SIZE])
+        if not batch:
+            break
+
+        hashes = {prediction.id: hashlib.sha256(prediction.text.encode('utf-8')).hexdigest() for prediction in batch}
+        texts = {hashes[prediction.id]: prediction.text for prediction in batch}
+        SubmittedText.objects.bulk_create(
+            [SubmittedText(text_hash=digest, text=text) for digest, text in texts.items()],
+            ignore_conflicts=True,
+        )
+        submitted = dict(SubmittedText.objects.filter(text_hash__in=texts).values_list('text_hash', 'id'))
+
+        for prediction in batch:
+            prediction.submitted_text_id = submitted[hashes[prediction.id]]
+            prediction.verdicts = {prediction.model_used: prediction.prediction}
+        Prediction.objects.bulk_update(batch, ['submitted_text', 'verdicts'])
+
+
+def restore_texts(apps, schema_editor):
+    Prediction = apps.get_model('predictions', 'Prediction')
+    for prediction in Prediction.objects.select_related('submitted_text').iterator(chunk_size=BATCH_SIZE):
+        prediction.text = prediction.submitted_text.text
+        prediction.save(update_fields=['text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0004_submittedtext'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_texts, restore_texts),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0005_move_prediction_texts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='prediction',
+            name='submitted_text',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='predictions', to='predictions.submittedtext'),
+        ),
+        migrations.RemoveField(
+            model_name='prediction',
+            name='text',
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:39
+
+from collections import Counter
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_counters(apps, schema_editor):
+    """
+    Inicializa los contadores con las predicciones ya registradas.
+    """
+    Prediction = apps.get_model('predictions', 'Prediction')
+    PredictionCounter = apps.get_model('predictions', 'PredictionCounter')
+
+    counters = Counter()
+    for group in Prediction.objects.values('prediction', 'model_used', 'verdicts').annotate(rows=Count('id')).order_by():
+        rows = group['rows']
+        counters['total'] += rows
+        counters[f"prediction:{group['prediction']}"] += rows
+        counters[f"model_used:{group['model_used']}"] += rows
+        for model_name, verdict in group['verdicts'].items():
+            counters[f'verdict:{model_name}:{verdict}'] += rows
+    PredictionCounter.objects.bulk_create([PredictionCounter(key=key, value=value) for key, value in counters.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0006_remove_prediction_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PredictionCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='prediction',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='prediction',
+            name='model_used',
+            field=models.CharField(db_index=True, max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='prediction',
+            name='prediction',
+            field=models.CharField(choices=[('Real', 'Real'), ('Fake', 'Fake')], db_index=True, max_length=10),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.6 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+def fill_rollups(apps, schema_editor):
+    """
+    Inicializa los agregados por hora y por día con las predicciones ya registradas.
+    """
+    from predictions.rollups import rebuild_rollups
+
+    rebuild_rollups(
+        prediction_model=apps.get_model('predictions', 'Prediction'),
+        rollup_model=apps.get_model('predictions', 'PredictionRollup'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0007_prediction_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prediction',
+            name='latency',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='PredictionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'hour'), ('day', 'day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('model_used', models.CharField(max_length=20)),
+                ('prediction', models.CharField(choices=[('Real', 'Real'), ('Fake', 'Fake')], max_length=10)),
+                ('count', models.BigIntegerField(default=0)),
+                ('verdicts', models.JSONField(default=dict)),
+                ('latency_count', models.BigIntegerField(default=0)),
+                ('latency_sum', models.FloatField(default=0)),
+                ('latency_histogram', models.JSONField(default=list)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'bucket', 'model_used', 'prediction'), name='unique_prediction_rollup')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 09:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictions', '0008_prediction_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='explanation',
+            name='status',
+            field=models.CharField(choices=[('pending', 'pending'), ('done', 'done'), ('failed', 'failed')], default='done', max_length=10),
+        ),
+    ]
@@ -1,14 +1,85 @@
+import hashlib
 from django.db import models
+from django.utils import timezone
 
-class Prediction(models.Model):
+
+def text_hash(text):
+    """
+    Hash SHA-256 (hexadecimal) del texto original de una noticia.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SubmittedText(models.Model):
+    """
+    Texto enviado a la API, guardado una sola vez y direccionado por su hash.
+    """
+    text_hash = models.CharField(max_length=64, unique=True)
     text = models.TextField()
-    prediction = models.CharField(max_length=10, choices=[("Real", "Real"), ("Fake", "Fake")])
-    model_used = models.CharField(max_length=20)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Instancia sin guardar; `PredictionLogWriter` la resuelve contra la tabla al escribir.
+        """
+        return cls(text_hash=text_hash(text), text=text)
+
+    def __str__(self):
+        return self.text_hash[:12]
+
+class Prediction(models.Model):
+    """
+    Una predicción por petición y texto: el veredicto final, el modelo o ensemble
+    que lo dio y el veredicto de cada modelo ({modelo: "Real" | "Fake"}).
+    """
+    submitted_text = models.ForeignKey(SubmittedText, on_delete=models.CASCADE, related_name="predictions")
+    prediction = models.CharField(max_length=10, choices=[("Real", "Real"), ("Fake", "Fake")], db_index=True)
+    model_used = models.CharField(max_length=20, db_index=True)
+    verdicts = models.JSONField(default=dict)
+    model_version = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    latency = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self):
         return f"{self.prediction} ({self.model_used})"
 
+class PredictionCounter(models.Model):
+    """
+    Contador agregado del registro de predicciones, mantenido al escribir
+    (ver predictions/counters.py). `key` es "total", "prediction:<veredicto>",
+    "model_used:<modelo>" o "verdict:<modelo>:<veredicto>".
+    """
+    key = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+class PredictionRollup(models.Model):
+    """
+    Agregado de las predicciones de una hora o un día para un `model_used` y un
+    veredicto final, mantenido al escribir (ver predictions/rollups.py).
+    `latency_histogram` cuenta las latencias por tramos de `LATENCY_BUCKETS`.
+    """
+    granularity = models.CharField(max_length=4, choices=[("hour", "hour"), ("day", "day")])
+    bucket = models.DateTimeField()
+    model_used = models.CharField(max_length=20)
+    prediction = models.CharField(max_length=10, choices=[("Real", "Real"), ("Fake", "Fake")])
+    count = models.BigIntegerField(default=0)
+    verdicts = models.JSONField(default=dict)
+    latency_count = models.BigIntegerField(default=0)
+    latency_sum = models.FloatField(default=0)
+    latency_histogram = models.JSONField(default=list)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["granularity", "bucket", "model_used", "prediction"], name="unique_prediction_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:00} {self.model_used} {self.prediction}: {self.count}"
+
 class TrainingStats(models.Model):
     model_name = models.CharField(max_length=50)
     accuracy = models.FloatField()
@@ -16,3 +87,24 @@ class TrainingStats(models.Model):
 
     def __str__(self):
         return f"{self.model_name} - {self.accuracy:.2f}"
+
+class Explanation(models.Model):
+    """
+    Explicación del LLM. Mientras se genera, `status` es "pending" y `content`
+    guarda el texto recibido hasta el momento, para que cualquier proceso pueda
+    consultarla; "failed" guarda el mensaje de respaldo.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    text_hash = models.CharField(max_length=64, db_index=True)
+    final_prediction = models.CharField(max_length=10, choices=[("Real", "Real"), ("Fake", "Fake")])
+    verdicts = models.JSONField(default=dict)
+    model_version = models.CharField(max_length=64, db_index=True)
+    content = models.TextField()
+    status = models.CharField(
+        max_length=10, default="done",
+        choices=[("pending", "pending"), ("done", "done"), ("failed", "failed")],
+    )
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.final_prediction} ({self.model_version}) - {self.text_hash[:12]}"
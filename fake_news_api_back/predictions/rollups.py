@@ -0,0 +1,212 @@
+import bisect
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from predictions.models import Prediction, PredictionRollup
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# Límites superiores (segundos) de los tramos del histograma de latencias; el último
+# tramo recoge todo lo que supere el último límite
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+def truncate(moment, granularity):
+    """
+    Inicio (UTC) de la hora o el día que contiene `moment`.
+    """
+    moment = moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+class RollupDelta:
+    """
+    Incremento pendiente de sumar a una fila de `PredictionRollup`.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.verdicts = defaultdict(lambda: defaultdict(int))
+        self.latency_count = 0
+        self.latency_sum = 0.0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, verdicts, latency, rows=1):
+        self.count += rows
+        for model_name, verdict in verdicts.items():
+            self.verdicts[model_name][verdict] += rows
+        if latency is not None:
+            self.latency_count += rows
+            self.latency_sum += latency * rows
+            self.latency_histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += rows
+
+    def apply(self, rollup):
+        rollup.count += self.count
+        for model_name, counts in self.verdicts.items():
+            model_verdicts = rollup.verdicts.setdefault(model_name, {})
+            for verdict, rows in counts.items():
+                model_verdicts[verdict] = model_verdicts.get(verdict, 0) + rows
+        rollup.latency_count += self.latency_count
+        rollup.latency_sum += self.latency_sum
+        histogram = rollup.latency_histogram or [0] * len(self.latency_histogram)
+        rollup.latency_histogram = [stored + rows for stored, rows in zip(histogram, self.latency_histogram)]
+
+
+def rollup_deltas(predictions):
+    """
+    Incrementos por (granularidad, tramo, model_used, veredicto) de unas filas ya
+    guardadas de `Prediction` (necesitan `created_at`).
+    """
+    deltas = defaultdict(RollupDelta)
+    for prediction in predictions:
+        for granularity in GRANULARITIES:
+            key = (granularity, truncate(prediction.created_at, granularity), prediction.model_used, prediction.prediction)
+            deltas[key].add(prediction.verdicts, prediction.latency)
+    return deltas
+
+
+def apply_rollup_deltas(deltas):
+    """
+    Suma los incrementos a sus filas de `PredictionRollup`. Las filas se bloquean
+    (`select_for_update`) en un orden fijo, porque los veredictos y el histograma
+    se combinan en Python. Debe llamarse en la misma transacción que inserta las
+    predicciones.
+    """
+    if not deltas:
+        return
+    keys = sorted(deltas)
+    PredictionRollup.objects.bulk_create(
+        [
+            PredictionRollup(granularity=granularity, bucket=bucket, model_used=model_used, prediction=prediction)
+            for granularity, bucket, model_used, prediction in keys
+        ],
+        ignore_conflicts=True,
+    )
+    for granularity, bucket, model_used, prediction in keys:
+        rollup = PredictionRollup.objects.select_for_update().get(
+            granularity=granularity, bucket=bucket, model_used=model_used, prediction=prediction,
+        )
+        deltas[(granularity, bucket, model_used, prediction)].apply(rollup)
+        rollup.save()
+
+
+def rebuild_rollups(batch_size=5000, prediction_model=Prediction, rollup_model=PredictionRollup):
+    """
+    Reconstruye todos los agregados desde el registro de predicciones. Recorre la
+    tabla entera: la migración 0008 lo usa para rellenarlos y `reconcilecounters
+    --rollups` para corregirlos, con poco tráfico, porque lo que se escriba
+    mientras tanto no se incluye en la reconstrucción.
+
+    :param prediction_model: Modelo de las predicciones; la migración pasa el histórico.
+    :param rollup_model: Modelo de los agregados; la migración pasa el histórico.
+    :return: Número de filas de `PredictionRollup` creadas.
+    """
+    rows = prediction_model.objects.only("prediction", "model_used", "verdicts", "latency", "created_at")
+    deltas = rollup_deltas(rows.iterator(chunk_size=batch_size))
+
+    rollups = []
+    for (granularity, bucket, model_used, prediction), delta in deltas.items():
+        rollup = rollup_model(granularity=granularity, bucket=bucket, model_used=model_used, prediction=prediction)
+        delta.apply(rollup)
+        rollups.append(rollup)
+
+    with transaction.atomic():
+        rollup_model.objects.all().delete()
+        rollup_model.objects.bulk_create(rollups, batch_size=batch_size)
+    return len(rollups)
+
+
+def latency_percentile(histogram, total, quantile):
+    """
+    Percentil aproximado a partir del histograma, interpolando dentro del tramo.
+    """
+    if not total:
+        return None
+    target = quantile * total
+    cumulative = 0
+    for index, rows in enumerate(histogram):
+        if rows and cumulative + rows >= target:
+            lower = LATENCY_BUCKETS[index - 1] if index > 0 else 0.0
+            if index == len(LATENCY_BUCKETS):
+                return lower
+            upper = LATENCY_BUCKETS[index]
+            return round(lower + (upper - lower) * (target - cumulative) / rows, 6)
+        cumulative += rows
+    return LATENCY_BUCKETS[-1]
+
+
+def timeseries(granularity, start, end, model_used=None):
+    """
+    Serie temporal de predicciones entre `start` (incluido) y `end` (excluido),
+    leída solo de `PredictionRollup`. Los tramos sin predicciones aparecen con
+    contadores a cero.
+    """
+    rollups = PredictionRollup.objects.filter(granularity=granularity, bucket__gte=start, bucket__lt=end)
+    if model_used:
+        rollups = rollups.filter(model_used=model_used)
+
+    buckets = {}
+    for rollup in rollups.order_by("bucket"):
+        bucket = buckets.setdefault(rollup.bucket, {
+            "count": 0,
+            "by_verdict": defaultdict(int),
+            "by_model_used": defaultdict(lambda: defaultdict(int)),
+            "model_verdicts": defaultdict(lambda: defaultdict(int)),
+            "latency_count": 0,
+            "latency_sum": 0.0,
+            "latency_histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+        })
+        bucket["count"] += rollup.count
+        bucket["by_verdict"][rollup.prediction] += rollup.count
+        bucket["by_model_used"][rollup.model_used][rollup.prediction] += rollup.count
+        for model_name, counts in rollup.verdicts.items():
+            for verdict, rows in counts.items():
+                bucket["model_verdicts"][model_name][verdict] += rows
+        bucket["latency_count"] += rollup.latency_count
+        bucket["latency_sum"] += rollup.latency_sum
+        for index, rows in enumerate(rollup.latency_histogram):
+            bucket["latency_histogram"][index] += rows
+
+    series = []
+    moment = truncate(start, granularity)
+    if moment < start:
+        moment += GRANULARITIES[granularity]
+    while moment < end:
+        bucket = buckets.get(moment)
+        series.append(bucket_summary(moment, bucket))
+        moment += GRANULARITIES[granularity]
+    return series
+
+
+def bucket_summary(moment, bucket):
+    if bucket is None:
+        return {
+            "bucket": moment, "count": 0, "real": 0, "fake": 0, "fake_ratio": None,
+            "by_model_used": {}, "model_verdicts": {}, "latency": None,
+        }
+
+    def ratios(counts):
+        total = counts.get("Real", 0) + counts.get("Fake", 0)
+        return {
+            "count": total,
+            "real": counts.get("Real", 0),
+            "fake": counts.get("Fake", 0),
+            "fake_ratio": round(counts.get("Fake", 0) / total, 4) if total else None,
+        }
+
+    latency_count = bucket["latency_count"]
+    return {
+        "bucket": moment,
+        **ratios(bucket["by_verdict"]),
+        "by_model_used": {name: ratios(counts) for name, counts in bucket["by_model_used"].items()},
+        "model_verdicts": {name: ratios(counts) for name, counts in bucket["model_verdicts"].items()},
+        "latency": {
+            "count": latency_count,
+            "mean": round(bucket["latency_sum"] / latency_count, 6),
+            "p50": latency_percentile(bucket["latency_histogram"], latency_count, 0.50),
+            "p95": latency_percentile(bucket["latency_histogram"], latency_count, 0.95),
+            "p99": latency_percentile(bucket["latency_histogram"], latency_count, 0.99),
+        } if latency_count else None,
+    }
@@ -1,3 +1,6 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 
 class PredictNewsSerializer(serializers.Serializer):
@@ -5,3 +8,80 @@ class PredictNewsSerializer(serializers.Serializer):
         required=True,
         help_text="Texto de la noticia a analizar"
     )
+
+class PredictBatchSerializer(serializers.Serializer):
+    texts = serializers.ListField(
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=settings.PREDICT_BATCH_MAX_SIZE,
+        help_text="Lista de textos de noticias a analizar en un solo lote"
+    )
+    models = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        help_text="Modelos a evaluar. Por defecto se usan todos los disponibles"
+    )
+
+class TimeseriesQuerySerializer(serializers.Serializer):
+    granularity = serializers.ChoiceField(
+        choices=["hour", "day"],
+        default="hour",
+        help_text="Tamaño de cada tramo de la serie"
+    )
+    start = serializers.DateTimeField(
+        required=False,
+        help_text="Inicio del rango (ISO 8601). Por defecto, 24 horas (o 30 días) antes del final"
+    )
+    end = serializers.DateTimeField(
+        required=False,
+        help_text="Fin del rango, excluido (ISO 8601). Por defecto, ahora"
+    )
+    model_used = serializers.CharField(
+        required=False,
+        help_text="Filtra por el modelo usado (o \"ensemble\")"
+    )
+
+    def validate(self, data):
+        step = timedelta(hours=1) if data["granularity"] == "hour" else timedelta(days=1)
+        data.setdefault("end", timezone.now())
+        data.setdefault("start", data["end"] - (24 if data["granularity"] == "hour" else 30) * step)
+        if data["start"] >= data["end"]:
+            raise serializers.ValidationError("start debe ser anterior a end.")
+        if (data["end"] - data["start"]) / step > settings.STATS_TIMESERIES_MAX_BUCKETS:
+            raise serializers.ValidationError(
+                f"El rango supera el máximo de {settings.STATS_TIMESERIES_MAX_BUCKETS} tramos."
+            )
+        return data
+
+class ExportQuerySerializer(serializers.Serializer):
+    format = serializers.ChoiceField(
+        choices=["ndjson", "csv"],
+        default="ndjson",
+        help_text="Formato de salida: una línea JSON por predicción o CSV"
+    )
+    start = serializers.DateTimeField(
+        required=False,
+        help_text="Solo predicciones desde esta fecha (ISO 8601, incluida)"
+    )
+    end = serializers.DateTimeField(
+        required=False,
+        help_text="Solo predicciones anteriores a esta fecha (ISO 8601, excluida)"
+    )
+    model_used = serializers.CharField(
+        required=False,
+        help_text="Filtra por el modelo usado (o \"ensemble\")"
+    )
+    after_id = serializers.IntegerField(
+        default=0,
+        min_value=0,
+        help_text="Continúa una exportación a partir del último id recibido"
+    )
+    limit = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Máximo de filas a exportar"
+    )
+    include_text = serializers.BooleanField(
+        default=False,
+        help_text="Incluye el texto de cada noticia"
+    )
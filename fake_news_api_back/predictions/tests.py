@@ -1,3 +1,373 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from datetime import datetime, timezone as dt_timezone
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from predictions.cache import DjangoPredictionCache
+from predictions.counters import compute_counters, counter_deltas, read_counters, reconcile_counters
+from predictions.explanations import ExplanationGenerator, ExplanationJob, MemoizedExplanationGenerator, explanation_generator
+from predictions.models import Explanation, Prediction, PredictionCounter, PredictionRollup, SubmittedText, text_hash
+from predictions.rollups import LATENCY_BUCKETS, apply_rollup_deltas, latency_percentile, rollup_deltas, timeseries, truncate
+from predictions.writer import PredictionLogWriter
 
-# Create your tests here.
+ASYNC_LOG = {**settings.PREDICTION_LOG, "MODE": "async"}
+SYNC_LOG = {**settings.PREDICTION_LOG, "MODE": "sync"}
+
+
+def make_prediction(text="Noticia de prueba", prediction="Fake", verdicts=None, latency=0.01):
+    """
+    Fila de `Prediction` sin guardar, como las que crean las vistas.
+    """
+    verdicts = verdicts or {"logistic": prediction}
+    return Prediction(
+        submitted_text=SubmittedText.from_text(text),
+        prediction=prediction,
+        model_used=next(iter(verdicts)) if len(verdicts) == 1 else "ensemble",
+        verdicts=verdicts,
+        model_version="test",
+        latency=latency,
+    )
+
+
+class RecordingWriter(PredictionLogWriter):
+    """
+    Writer que guarda los lotes en memoria en lugar de en la base de datos, para
+    probar la cola sin que el hilo en segundo plano abra conexiones.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.release = threading.Event()
+        self.release.set()
+        self.written_batches = []
+
+    def write(self, predictions):
+        self.release.wait(5)
+        self.written_batches.append(list(predictions))
+        self._count(written=len(predictions), batches=1)
+
+
+class DjangoPredictionCacheTests(SimpleTestCase):
+    """
+    `clear` descarta las predicciones cacheadas sin tocar el resto del alias.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_clear_keeps_other_keys(self):
+        prediction_cache = DjangoPredictionCache(alias="default", ttl=60)
+        prediction_cache.set("texto", {"prediction": "Fake"})
+        cache.set("throttle:client", 3)
+        self.assertEqual(prediction_cache.get("texto"), {"prediction": "Fake"})
+
+        prediction_cache.clear()
+
+        self.assertIsNone(prediction_cache.get("texto"))
+        self.assertEqual(cache.get("throttle:client"), 3)
+        prediction_cache.set("texto", {"prediction": "Real"})
+        self.assertEqual(prediction_cache.get("texto"), {"prediction": "Real"})
+
+
+@override_settings(PREDICTION_LOG=ASYNC_LOG)
+class PredictionLogQueueTests(SimpleTestCase):
+    """
+    En modo async, `log` encola sin esperar a la escritura y, con la cola llena,
+    espera `enqueue_timeout` y descarta lo que no cabe.
+    """
+
+    def test_rows_are_written_behind_the_request(self):
+        writer = RecordingWriter(batch_size=10, flush_interval=0.05)
+        writer.release.clear()
+        writer.log([make_prediction() for _ in range(5)])
+        # La escritura está bloqueada, pero `log` ya ha vuelto
+        self.assertEqual(writer.stats()["enqueued"], 5)
+        self.assertEqual(writer.written_batches, [])
+
+        writer.release.set()
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(sum(len(batch) for batch in writer.written_batches), 5)
+        self.assertEqual(writer.stats()["pending"], 0)
+        writer.shutdown()
+
+    def test_full_queue_applies_backpressure_then_drops(self):
+        writer = RecordingWriter(queue_size=2, enqueue_timeout=0.01)
+        # Sin hilo que consuma, la cola se llena con las dos primeras filas
+        with mock.patch.object(writer, "_ensure_started"):
+            writer.log([make_prediction() for _ in range(5)])
+
+        stats = writer.stats()
+        self.assertEqual(stats["enqueued"], 2)
+        self.assertEqual(stats["dropped"], 3)
+        self.assertEqual(stats["backpressure_waits"], 3)
+        self.assertEqual(stats["max_queue_depth"], 2)
+
+
+@override_settings(PREDICTION_LOG=SYNC_LOG)
+class PredictionLogWriteTests(TestCase):
+    """
+    Un lote cuya escritura falla se reintenta en una transacción nueva; si falla
+    todas las veces, se cuenta como `failed` sin dejar filas a medias.
+    """
+
+    def failing_bulk_create(self, failures):
+        bulk_create = Prediction.objects.bulk_create
+        calls = []
+
+        def side_effect(*args, **kwargs):
+            calls.append(1)
+            if len(calls) <= failures:
+                raise OperationalError("database is locked")
+            return bulk_create(*args, **kwargs)
+
+        return mock.patch.object(Prediction.objects, "bulk_create", side_effect=side_effect)
+
+    def test_failed_batch_is_retried(self):
+        writer = PredictionLogWriter(write_retries=1, retry_delay=0)
+        with self.failing_bulk_create(failures=1):
+            writer.log([make_prediction(), make_prediction()])
+
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["failed"], stats["retries"]), (2, 0, 1))
+        self.assertEqual(Prediction.objects.count(), 2)
+        self.assertEqual(SubmittedText.objects.count(), 1)
+        self.assertEqual(read_counters()["total"], 2)
+
+    def test_batch_failing_every_attempt_is_counted_once(self):
+        writer = PredictionLogWriter(write_retries=1, retry_delay=0)
+        with self.failing_bulk_create(failures=2):
+            writer.log([make_prediction(), make_prediction()])
+
+        stats = writer.stats()
+        self.assertEqual((stats["written"], stats["failed"], stats["retries"]), (0, 2, 1))
+        self.assertEqual(Prediction.objects.count(), 0)
+        self.assertEqual(SubmittedText.objects.count(), 0)
+        self.assertEqual(read_counters()["total"], 0)
+
+
+@override_settings(PREDICTION_LOG=SYNC_LOG)
+class SubmittedTextDedupTests(TestCase):
+    """
+    Cada texto se guarda una sola vez, direccionado por su hash, y todas sus
+    predicciones apuntan a esa fila.
+    """
+
+    def test_repeated_texts_share_one_row(self):
+        writer = PredictionLogWriter()
+        writer.log([make_prediction("Texto A"), make_prediction("Texto A"), make_prediction("Texto B")])
+        writer.log([make_prediction("Texto A")])
+
+        self.assertEqual(SubmittedText.objects.count(), 2)
+        submitted = SubmittedText.objects.get(text_hash=text_hash("Texto A"))
+        self.assertEqual(submitted.text, "Texto A")
+        self.assertEqual(submitted.predictions.count(), 3)
+
+    def test_existing_text_is_reused(self):
+        existing = SubmittedText.objects.create(text_hash=text_hash("Texto A"), text="Texto A")
+        PredictionLogWriter().log([make_prediction("Texto A")])
+
+        self.assertEqual(SubmittedText.objects.count(), 1)
+        self.assertEqual(Prediction.objects.get().submitted_text_id, existing.pk)
+
+
+@override_settings(PREDICTION_LOG=SYNC_LOG)
+class PredictionCounterTests(TestCase):
+    """
+    Los contadores se mantienen al escribir y `reconcile_counters` corrige los que
+    se han desviado respecto al registro de predicciones.
+    """
+
+    def log_predictions(self):
+        PredictionLogWriter().log([
+            make_prediction("A", "Fake", {"logistic": "Fake", "xgboost": "Fake"}),
+            make_prediction("B", "Real", {"logistic": "Real", "xgboost": "Fake"}),
+            make_prediction("C", "Fake", {"logistic": "Fake"}),
+        ])
+
+    def test_counter_deltas(self):
+        deltas = counter_deltas([
+            make_prediction("A", "Fake", {"logistic": "Fake", "xgboost": "Real"}),
+            make_prediction("B", "Fake", {"logistic": "Fake"}),
+        ])
+        self.assertEqual(deltas, {
+            "total": 2,
+            "prediction:Fake": 2,
+            "model_used:ensemble": 1,
+            "model_used:logistic": 1,
+            "verdict:logistic:Fake": 2,
+            "verdict:xgboost:Real": 1,
+        })
+
+    def test_writes_maintain_counters(self):
+        self.log_predictions()
+        self.log_predictions()
+
+        self.assertEqual(read_counters(), {
+            "total": 6,
+            "real": 2,
+            "fake": 4,
+            "model_used": {"ensemble": 4, "logistic": 2},
+            "verdicts": {"logistic": {"Fake": 4, "Real": 2}, "xgboost": {"Fake": 4}},
+        })
+        self.assertEqual(compute_counters(), dict(PredictionCounter.objects.values_list("key", "value")))
+
+    def test_reconcile_fixes_drift(self):
+        self.log_predictions()
+        PredictionCounter.objects.filter(key="total").update(value=10)
+        PredictionCounter.objects.filter(key="verdict:xgboost:Fake").delete()
+        PredictionCounter.objects.create(key="model_used:naive_bayes", value=1)
+
+        corrections = reconcile_counters()
+
+        self.assertEqual(corrections, {
+            "total": (10, 3),
+            "verdict:xgboost:Fake": (0, 2),
+            "model_used:naive_bayes": (1, 0),
+        })
+        self.assertEqual(read_counters()["total"], 3)
+        self.assertEqual(read_counters()["verdicts"]["xgboost"], {"Fake": 2})
+        self.assertEqual(reconcile_counters(), {})
+
+
+def at(day, hour, minute=0):
+    return datetime(2026, 10, day, hour, minute, tzinfo=dt_timezone.utc)
+
+
+class PredictionRollupTests(TestCase):
+    """
+    Los agregados por hora y por día reparten las predicciones en su tramo y
+    estiman los percentiles de latencia con el histograma.
+    """
+
+    def add_rollups(self, rows):
+        predictions = []
+        for created_at, prediction, latency in rows:
+            row = make_prediction(prediction=prediction, latency=latency)
+            row.created_at = created_at
+            predictions.append(row)
+        apply_rollup_deltas(rollup_deltas(predictions))
+
+    def test_truncate(self):
+        self.assertEqual(truncate(at(1, 10, 45), "hour"), at(1, 10))
+        self.assertEqual(truncate(at(1, 10, 45), "day"), at(1, 0))
+
+    def test_hourly_buckets(self):
+        self.add_rollups([
+            (at(1, 10, 5), "Fake", 0.003),
+            (at(1, 10, 55), "Real", 0.003),
+            (at(1, 12, 0), "Fake", None),
+        ])
+
+        series = timeseries("hour", at(1, 10), at(1, 13))
+        self.assertEqual([bucket["bucket"] for bucket in series], [at(1, 10), at(1, 11), at(1, 12)])
+        self.assertEqual([bucket["count"] for bucket in series], [2, 0, 1])
+        self.assertEqual(series[0]["fake_ratio"], 0.5)
+        self.assertEqual(series[0]["model_verdicts"]["logistic"]["fake"], 1)
+        self.assertEqual(series[0]["latency"]["count"], 2)
+        self.assertIsNone(series[1]["latency"])
+        # Sin latencias registradas no hay percentiles
+        self.assertIsNone(series[2]["latency"])
+
+    def test_daily_buckets_accumulate_across_writes(self):
+        self.add_rollups([(at(1, 1), "Fake", 0.01), (at(1, 23, 59), "Fake", 0.01)])
+        self.add_rollups([(at(2, 0), "Real", 0.01), (at(1, 12), "Real", 0.01)])
+
+        series = timeseries("day", at(1, 0), at(3, 0))
+        self.assertEqual([(bucket["count"], bucket["fake"], bucket["real"]) for bucket in series], [(3, 2, 1), (1, 0, 1)])
+        self.assertEqual(PredictionRollup.objects.filter(granularity="day").count(), 3)
+
+    def test_latency_percentiles(self):
+        # Diez latencias en el tramo (0.0025, 0.005]: se interpola dentro del tramo
+        self.add_rollups([(at(1, 10), "Fake", 0.003)] * 10)
+        latency = timeseries("hour", at(1, 10), at(1, 11))[0]["latency"]
+        self.assertEqual(latency["p50"], 0.00375)
+        self.assertEqual(latency["p95"], 0.004875)
+        self.assertAlmostEqual(latency["mean"], 0.003)
+
+    def test_latency_percentile_edges(self):
+        histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.assertIsNone(latency_percentile(histogram, 0, 0.5))
+        # Lo que supera el último límite se cuenta en el tramo abierto
+        histogram[-1] = 4
+        self.assertEqual(latency_percentile(histogram, 4, 0.99), LATENCY_BUCKETS[-1])
+
+
+class StubGenerator:
+    """
+    Generador que devuelve unos fragmentos fijos en lugar de llamar al LLM.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def stream_explanation(self, text, predictions, final_prediction, confidence):
+        yield from self.chunks
+
+
+def pending_explanation(key, content, age=0):
+    """
+    Fila "pending" como la que deja un job que se ejecuta en otro proceso.
+    """
+    return Explanation.objects.create(
+        key=key, text_hash="0" * 64, final_prediction="Fake", verdicts={"logistic": "Fake"},
+        model_version="test", content=content, status=ExplanationJob.PENDING,
+        created_at=timezone.now() - timedelta(seconds=age),
+    )
+
+
+class ExplanationProgressTests(TestCase):
+    """
+    Un job guarda su progreso en su fila de `Explanation`, y el polling y el SSE que
+    llegan a un proceso sin el job lo siguen desde ahí en lugar de dar 404.
+    """
+
+    def test_job_progress_is_stored(self):
+        predictions = {"logistic": {"prediction": "Fake"}}
+        generator = MemoizedExplanationGenerator(
+            StubGenerator(["Es ", "falsa."]), ttl=60, max_entries=10, wait_timeout=5, progress_interval=0,
+        )
+        key = "a" * 64
+        job = ExplanationJob(key)
+        generator.save(key, "Noticia", predictions, "Fake", "test", "", status=ExplanationJob.PENDING)
+        self.assertEqual(generator.lookup_state(key), ("", ExplanationJob.PENDING))
+        self.assertIsNone(generator.lookup(key))
+
+        with mock.patch("predictions.explanations.connections"):
+            generator._run(job, "Noticia", predictions, "Fake", 0.9, "test")
+
+        self.assertEqual(generator.lookup_state(key), ("Es falsa.", ExplanationJob.DONE))
+        self.assertEqual(generator.lookup(key), "Es falsa.")
+
+    def test_poll_without_local_job_reports_pending(self):
+        pending_explanation("b" * 64, "Texto a medias")
+        response = self.client.get(reverse("explanation", args=["b" * 64]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], ExplanationJob.PENDING)
+        self.assertEqual(response.json()["explanation"], "Texto a medias")
+
+    def test_abandoned_pending_job_is_reported_as_failed(self):
+        pending_explanation("c" * 64, "Texto a medias", age=explanation_generator.pending_timeout + 1)
+        response = self.client.get(reverse("explanation", args=["c" * 64]))
+
+        self.assertEqual(response.json()["status"], ExplanationJob.FAILED)
+        self.assertEqual(response.json()["explanation"], ExplanationGenerator.FALLBACK_EXPLANATION)
+
+    def test_unknown_key_is_not_found(self):
+        self.assertEqual(self.client.get(reverse("explanation", args=["d" * 64])).status_code, 404)
+
+    @override_settings(EXPLANATION_CACHE={**settings.EXPLANATION_CACHE, "STREAM_POLL_INTERVAL": 0, "PROGRESS_INTERVAL": 0})
+    async def test_stream_follows_job_of_another_process(self):
+        states = iter([("Es ", ExplanationJob.PENDING), ("Es ", ExplanationJob.PENDING), ("Es falsa.", ExplanationJob.DONE)])
+        with mock.patch.object(explanation_generator, "lookup_state", side_effect=lambda key: next(states)):
+            response = await AsyncClient().get(reverse("explanation_stream", args=["e" * 64]))
+            body = "".join([chunk.decode() async for chunk in response.streaming_content])
+
+        self.assertEqual(body.count("event: delta"), 2)
+        self.assertIn('"content": "falsa."', body)
+        self.assertIn('event: done\ndata: {"status": "done", "explanation": "Es falsa."}', body)
@@ -4,130 +4,261 @@ from rest_framework.parsers import MultiPartParser
 from ml_models.processor import extract_text_from_image
 from rest_framework.response import Response
 from rest_framework import status
-from ml_models.models import MODELS, VECTORIZER
+from ml_models.bundles import bundle_manager, current_bundle
+from ml_models.models import MODEL_NAMES
 from ml_models.processor import preprocess_text
+from ml_models.cascade import cascade_predict
+from ml_models.inference import inference_pool
+from ml_models.scoring import predict_models
+from ml_models.predictor import predict_batch, prediction_label, ensemble_verdict
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .serializers import PredictNewsSerializer
-from predictions.models import Prediction, TrainingStats
-import time
-import requests
+from .serializers import PredictNewsSerializer, PredictBatchSerializer, TimeseriesQuerySerializer, ExportQuerySerializer
+from predictions.models import Prediction, SubmittedText, TrainingStats
+from predictions.cache import prediction_cache, make_cache_key
+from predictions.counters import read_counters
+from predictions.export import aexport_rows, csv_header, export_queryset, format_line
+from predictions.rollups import timeseries
+from predictions.weights import ensemble_weights
+from predictions.writer import prediction_log
+from predictions.explanations import ExplanationJob, explanation_generator, llm_client
+import asyncio
 import json
+import time
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from rest_framework.decorators import api_view
 from newspaper import Article
-from django.http import JsonResponse
+from django.db.models import F
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+
+
+ENSEMBLE_MODE_PARAMETER = openapi.Parameter(
+    "ensemble",
+    openapi.IN_QUERY,
+    description=(
+        "full: evalúa todos los modelos. cascade: evalúa primero los modelos baratos y "
+        "para en cuanto el veredicto ponderado ya no puede cambiar; la respuesta indica "
+        "los modelos evaluados. Por defecto, ENSEMBLE_MODE."
+    ),
+    type=openapi.TYPE_STRING,
+    enum=["full", "cascade"],
+    required=False,
+)
 
+EXPLANATION_MODE_PARAMETER = openapi.Parameter(
+    "explanation",
+    openapi.IN_QUERY,
+    description=(
+        "inline (por defecto): la respuesta espera a la explicación del LLM. "
+        "deferred: devuelve las predicciones al instante junto con un identificador "
+        "de explicación para consultarla (polling) o recibirla por SSE."
+    ),
+    type=openapi.TYPE_STRING,
+    enum=["inline", "deferred"],
+    required=False,
+)
 
-class ExplanationGenerator:
-    def __init__(self, api_key, api_url):
-        self.api_key = api_key
-        self.url = api_url
 
-    def generate_explanation(self, text, predictions, final_prediction, confidence):
-        prompt = f"""
-        Eres un asistente experto en análisis de noticias, especializado en detectar si una noticia es falsa o real.
+def explanation_fields(request, text, result):
+    """
+    Campos de explicación de una respuesta de predicción, según el modo pedido en
+    el parámetro `explanation` de la query.
+    """
+    if request.query_params.get("explanation") != "deferred":
+        return {
+            "explanation": explanation_generator.generate_explanation(
+                text,
+                result["predictions"],
+                result["final_prediction"],
+                result["confidence"],
+                result["model_version"]
+            )
+        }
+
+    job = explanation_generator.submit(
+        text,
+        result["predictions"],
+        result["final_prediction"],
+        result["confidence"],
+        result["model_version"]
+    )
+    chunks, job_status = job.snapshot()
+    return {
+        "explanation": "".join(chunks) if job_status != ExplanationJob.PENDING else None,
+        "explanation_id": job.key,
+        "explanation_status": job_status,
+        "explanation_url": request.build_absolute_uri(reverse("explanation", args=[job.key])),
+        "explanation_stream_url": request.build_absolute_uri(reverse("explanation_stream", args=[job.key])),
+    }
 
-        Tu tarea es analizar el siguiente texto de noticia y los resultados de la predicción para explicar de manera clara y sencilla por qué se concluyó que la noticia es {final_prediction}. Asegúrate de que el texto no contenga lenguaje violento, sexual, de odio o de autolesión.
 
-        ### Texto de la noticia:
-        {text}
+CASCADE_FIELDS = ("evaluated_models", "skipped_models", "cascade_stop")
 
-        ### Resultados de la predicción:
-        {json.dumps(predictions, indent=2)}
 
-        ### Predicción final:
-        {final_prediction}
+def cached_prediction(key, compute):
+    """
+    Resultado de la caché compartida de predicciones o, si no está, de `compute()`.
+    El resultado indica en `cached` si salió de la caché. En un acierto, los
+    `prediction_time` guardados son los de la petición que lo calculó, no los de
+    esta: se devuelven a 0 para no presentar una latencia antigua como actual.
+    """
+    computed = False
+
+    def compute_and_mark():
+        nonlocal computed
+        computed = True
+        return compute()
+
+    result = prediction_cache.get_or_compute(key, compute_and_mark)
+    if computed:
+        return {**result, "cached": False}
+    return {
+        **result,
+        "cached": True,
+        "predictions": {
+            name: {**model_result, "prediction_time": 0.0}
+            for name, model_result in result["predictions"].items()
+        },
+    }
 
-        ### Confianza del modelo:
-        {confidence}
 
-        Por favor, genera una explicación detallada siguiendo esta estructura:
+def prediction_response(request, text, result):
+    return {
+        "predictions": result["predictions"],
+        "final_prediction": result["final_prediction"],
+        "confidence": round(result["confidence"], 4),
+        "model_version": result["model_version"],
+        "cached": result["cached"],
+        **{field: result[field] for field in CASCADE_FIELDS if field in result},
+        **explanation_fields(request, text, result),
+    }
 
-        1. Análisis del texto: Identifica y describe los elementos clave del texto (como el tono emocional, la ausencia de fuentes confiables o inconsistencias en los datos) que pudieron influir en la predicción.
-        2. Razones del resultado: Explica, en términos sencillos, cómo el modelo llegó a la conclusión de que la noticia es {final_prediction} basándose en los resultados obtenidos.
-        3. Factores relevantes: Menciona otros aspectos o detalles del texto y del contexto que podrían influir en la confianza del resultado.
 
-        Asegúrate de que la explicación sea clara, concisa y comprensible para un público general sin conocimientos técnicos en inteligencia artificial, LO IMPORTANTE ES EL ANALISIS DE LA NOTICIA.
-        """
+def prediction_record(text, result, model_version, latency=None):
+    """
+    Fila de `Prediction` (sin guardar) para el registro de predicciones: una por texto,
+    con el veredicto de cada modelo. Si votaron varios modelos, `model_used` es "ensemble".
 
-        headers = {
-            "api-key": self.api_key,
-            "Content-Type": "application/json",
+    :param latency: Segundos que tardó la predicción (sin contar la explicación).
+    """
+    verdicts = {name: model_result["prediction"] for name, model_result in result["predictions"].items()}
+    return Prediction(
+        submitted_text=SubmittedText.from_text(text),
+        prediction=result["final_prediction"],
+        model_used=next(iter(verdicts)) if len(verdicts) == 1 else "ensemble",
+        verdicts=verdicts,
+        model_version=model_version,
+        latency=latency,
+    )
+
+
+def predict_with_all_models(clean_text, bundle):
+    """
+    Evalúa el texto preprocesado con todos los modelos del bundle y combina sus votos
+    ponderando por la precisión de cada modelo (ver `ensemble_weights`).
+
+    :return: Tupla (predicciones por modelo, predicción final, confianza).
+    """
+    text_vectorized = bundle.vectorizer.transform([clean_text])
+
+    predictions = {}
+    votes = {}
+    weights = ensemble_weights.get(bundle)
+
+    model_predictions, prediction_times = predict_models(bundle, list(bundle.models), text_vectorized)
+    for model_name, prediction in model_predictions.items():
+        votes[model_name] = int(prediction[0])
+        predictions[model_name] = {
+            "prediction": prediction_label(prediction[0]),
+            "accuracy": weights.get(model_name, 0),
+            "prediction_time": round(prediction_times[model_name], 6),
         }
 
-        data = {
-            "messages": [
-                {"role": "system", "content": "Eres un asistente que explica predicciones de noticias."},
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 1000,  
-            "temperature": 0.7  
+    final_prediction, confidence = ensemble_verdict(votes, weights)
+    return predictions, final_prediction, confidence
+
+
+def cached_all_models_predictions(clean_text, bundle):
+    """
+    Predicciones, veredicto y confianza de todos los modelos del bundle, reutilizando
+    la caché compartida de predicciones. La explicación se obtiene aparte (ver `explanation_fields`).
+    """
+    # Sin cargar los modelos: un acierto en la caché no necesita deserializarlos
+    model_names = bundle.models.available()
+
+    def compute():
+        predictions, final_prediction, confidence = predict_with_all_models(clean_text, bundle)
+        return {
+            "predictions": predictions,
+            "final_prediction": final_prediction,
+            "confidence": confidence,
+            "model_version": bundle.version,
         }
 
-        try:
-            response = requests.post(self.url, headers=headers, json=data)
-            response.raise_for_status()  
-            explanation = response.json().get("choices", [{}])[0].get("message", {}).get("content", "")
-            return explanation if explanation else "No se generó una explicación válida."
-        except requests.exceptions.RequestException as e:
-            print(f"Error en la solicitud a la API: {e}")
-            print(f"Respuesta de la API: {getattr(response, 'text', 'No hay respuesta')}")
-            return "No se pudo generar una explicación en este momento."
+    return cached_prediction(make_cache_key(clean_text, model_names, bundle.version), compute)
+
 
+def cached_cascade_predictions(clean_text, bundle):
+    """
+    Como `cached_all_models_predictions`, pero con la cascada de `cascade_predict`:
+    los modelos caros solo se evalúan si los baratos no deciden el veredicto.
+    """
+    model_names = bundle.models.available()
+    cascade = settings.ENSEMBLE_CASCADE
+
+    def compute():
+        text_vectorized = bundle.vectorizer.transform([clean_text])
+        result = cascade_predict(
+            bundle, text_vectorized, ensemble_weights.get(bundle), model_names,
+            order=cascade["ORDER"], min_confidence=cascade["MIN_CONFIDENCE"],
+        )
+        return {**result, "model_version": bundle.version}
 
-explanation_generator = ExplanationGenerator(api_key=settings.AZURE_OPENAI_API_KEY, api_url=settings.AZURE_OPENAI_API_URL)
+    cache_models = model_names + [f"cascade:{cascade['MIN_CONFIDENCE']}"]
+    return cached_prediction(make_cache_key(clean_text, cache_models, bundle.version), compute)
 
 
 class PredictNewsView(APIView):
     @swagger_auto_schema(
         operation_description="Predice si una noticia es falsa o real usando el modelo por defecto (logistic).",
+        manual_parameters=[EXPLANATION_MODE_PARAMETER],
         request_body=PredictNewsSerializer,
-        tags=['Predictions (default model)'], 
+        tags=['Predictions (default model)'],
     )
     def post(self, request):
+        started = time.perf_counter()
         serializer = PredictNewsSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         text = serializer.validated_data["text"]
-        model = MODELS.get("logistic")
-
+        bundle = current_bundle()
         clean_text = preprocess_text(text)
-        text_vectorized = VECTORIZER.transform([clean_text])
-        prediction = model.predict(text_vectorized)[0]
-        prediction_label = "Fake" if prediction == 1 else "Real"
-
-        
-        Prediction.objects.create(
-            text=text,
-            prediction=prediction_label,
-            model_used="logistic"
-        )
-        print("✅ Predicción guardada en la base de datos.")
-
-        explanation = explanation_generator.generate_explanation(
-            text,
-            {"logistic": {"prediction": prediction_label, "accuracy": 0.7525, "prediction_time": 0.0023}},
-            prediction_label,
-            0.7525
-        )
 
-        return Response(
-            {
+        def compute():
+            text_vectorized = bundle.vectorizer.transform([clean_text])
+            predictions, prediction_times = predict_models(bundle, ["logistic"], text_vectorized)
+            label = prediction_label(predictions["logistic"][0])
+            return {
                 "predictions": {
                     "logistic": {
-                        "prediction": prediction_label,
-                        "accuracy": 0.7525,  
-                        "prediction_time": 0.0023  
+                        "prediction": label,
+                        "accuracy": 0.7525,
+                        "prediction_time": round(prediction_times["logistic"], 6)
                     }
                 },
-                "final_prediction": prediction_label,
-                "confidence": 0.7525,  
-                "explanation": explanation
-            },
-            status=status.HTTP_200_OK,
-        )
+                "final_prediction": label,
+                "confidence": 0.7525,
+                "model_version": bundle.version,
+            }
+
+        result = cached_prediction(make_cache_key(clean_text, ["logistic"], bundle.version), compute)
+
+        prediction_log.log([prediction_record(text, result, result["model_version"], time.perf_counter() - started)])
+
+        return Response(prediction_response(request, text, result), status=status.HTTP_200_OK)
 
 class PredictWithModelView(APIView):
     @swagger_auto_schema(
@@ -136,83 +267,108 @@ class PredictWithModelView(APIView):
             openapi.Parameter(
                 "model_type",
                 openapi.IN_PATH,
-                description=f"Tipo de modelo a usar. Opciones válidas: {', '.join(MODELS.keys())}",
+                description=f"Tipo de modelo a usar. Opciones válidas: {', '.join(MODEL_NAMES)}",
                 type=openapi.TYPE_STRING,
-                enum=list(MODELS.keys()),
-            )
+                enum=MODEL_NAMES,
+            ),
+            EXPLANATION_MODE_PARAMETER,
         ],
-        tags=['Predictions (specific model)'],  
+        tags=['Predictions (specific model)'],
         request_body=PredictNewsSerializer,
     )
     def post(self, request, model_type):
+        started = time.perf_counter()
         serializer = PredictNewsSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         text = serializer.validated_data["text"]
-        model = MODELS.get(model_type)
+        bundle = current_bundle()
+        model = bundle.models.get(model_type)
         if not model:
             return Response(
-                {"error": f"Invalid model type. Valid options are: {', '.join(MODELS.keys())}"},
+                {"error": f"Invalid model type. Valid options are: {', '.join(MODEL_NAMES)}"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
         clean_text = preprocess_text(text)
-        text_vectorized = VECTORIZER.transform([clean_text])
-        prediction = model.predict(text_vectorized)[0]
-        prediction_label = "Fake" if prediction == 1 else "Real"
-
-        Prediction.objects.create(
-            text=text,
-            prediction=prediction_label,
-            model_used=model_type
-        )
-        print("✅ Predicción guardada en la base de datos.")
-
-        explanation = explanation_generator.generate_explanation(
-            text,
-            {model_type: {"prediction": prediction_label, "accuracy": 0.7425, "prediction_time": 0.0156}},
-            prediction_label,
-            0.7425
-        )
 
-        return Response(
-            {
+        def compute():
+            text_vectorized = bundle.vectorizer.transform([clean_text])
+            predictions, prediction_times = predict_models(bundle, [model_type], text_vectorized)
+            label = prediction_label(predictions[model_type][0])
+            return {
                 "predictions": {
                     model_type: {
-                        "prediction": prediction_label,
-                        "accuracy": 0.7425,  
-                        "prediction_time": 0.0156  
+                        "prediction": label,
+                        "accuracy": 0.7425,
+                        "prediction_time": round(prediction_times[model_type], 6)
                     }
                 },
-                "final_prediction": prediction_label,
-                "confidence": 0.7425,  
-                "explanation": explanation
-            },
-            status=status.HTTP_200_OK,
-        )
+                "final_prediction": label,
+                "confidence": 0.7425,
+                "model_version": bundle.version,
+            }
+
+        result = cached_prediction(make_cache_key(clean_text, [model_type], bundle.version), compute)
+
+        prediction_log.log([prediction_record(text, result, result["model_version"], time.perf_counter() - started)])
+
+        return Response(prediction_response(request, text, result), status=status.HTTP_200_OK)
 
 class InsightsView(APIView):
     @swagger_auto_schema(
         operation_description="Devuelve estadísticas generales de las predicciones y los modelos entrenados.",
-        tags=["Stats"],  
+        tags=["Stats"],
     )
     def get(self, request):
-        total_predictions = Prediction.objects.count()
-
-        real_count = Prediction.objects.filter(prediction="Real").count()
-        fake_count = Prediction.objects.filter(prediction="Fake").count()
+        # Contadores mantenidos al escribir: no recorre la tabla de predicciones
+        counters = read_counters()
 
-        last_predictions = Prediction.objects.order_by("-created_at")[:5].values("text", "prediction", "model_used", "created_at")
+        last_predictions = Prediction.objects.order_by("-created_at")[:5].values(
+            "prediction", "model_used", "verdicts", "created_at", text=F("submitted_text__text"),
+        )
 
         model_stats = TrainingStats.objects.all().values("model_name", "accuracy", "trained_at")
 
         return Response({
-            "total_predictions": total_predictions,
-            "real_count": real_count,
-            "fake_count": fake_count,
+            "total_predictions": counters["total"],
+            "real_count": counters["real"],
+            "fake_count": counters["fake"],
+            "model_used_counts": counters["model_used"],
+            "verdict_counts": counters["verdicts"],
             "last_predictions": list(last_predictions),
             "model_stats": list(model_stats),
+            "prediction_cache": prediction_cache.stats(),
+            "llm_client": llm_client.stats(),
+            "model_bundle": bundle_manager.stats(),
+            "ensemble_weights": ensemble_weights.stats(),
+            "prediction_log": prediction_log.stats(),
+            "inference_pool": inference_pool.stats(),
+        }, status=status.HTTP_200_OK)
+
+class TimeseriesView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "Serie temporal de predicciones por hora o por día: volumen, proporción de falsas "
+            "por modelo y percentiles de latencia. Se calcula con los agregados mantenidos al "
+            "escribir, sin recorrer el registro de predicciones."
+        ),
+        query_serializer=TimeseriesQuerySerializer,
+        tags=["Stats"],
+    )
+    def get(self, request):
+        serializer = TimeseriesQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        query = serializer.validated_data
+        return Response({
+            "granularity": query["granularity"],
+            "start": query["start"],
+            "end": query["end"],
+            "model_used": query.get("model_used"),
+            "buckets": timeseries(query["granularity"], query["start"], query["end"], query.get("model_used")),
         }, status=status.HTTP_200_OK)
 
 class ModelStatsView(APIView):
@@ -222,15 +378,15 @@ class ModelStatsView(APIView):
             openapi.Parameter(
                 "model_name",
                 openapi.IN_PATH,
-                description=f"Nombre del modelo. Opciones válidas: {', '.join(MODELS.keys())}",
+                description=f"Nombre del modelo. Opciones válidas: {', '.join(MODEL_NAMES)}",
                 type=openapi.TYPE_STRING,
-                enum=list(MODELS.keys()),  
+                enum=MODEL_NAMES,
             )
         ],
-        tags=["Model Stats by name"],  
+        tags=["Model Stats by name"],
     )
     def get(self, request, model_name):
-        stats = TrainingStats.objects.filter(model_name=model_name).first()
+        stats = TrainingStats.objects.filter(model_name=model_name).order_by("-trained_at", "-id").first()
         if not stats:
             return Response(
                 {"error": "Model not found"},
@@ -249,70 +405,74 @@ class ModelStatsView(APIView):
 class PredictWithAllModelsView(APIView):
     @swagger_auto_schema(
         operation_description="Evalúa una noticia con todos los modelos disponibles y devuelve un promedio ponderado.",
+        manual_parameters=[ENSEMBLE_MODE_PARAMETER, EXPLANATION_MODE_PARAMETER],
         request_body=PredictNewsSerializer,
         tags=["Predictions (all models)"],
     )
     def post(self, request):
+        started = time.perf_counter()
         serializer = PredictNewsSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         text = serializer.validated_data["text"]
         clean_text = preprocess_text(text)
-        text_vectorized = VECTORIZER.transform([clean_text])
-
-        predictions = {}
-        weighted_sum = 0
-        total_weight = 0
 
-        for model_name, model in MODELS.items():
-            if model is None:
-                continue  
+        ensemble_mode = request.query_params.get("ensemble", settings.ENSEMBLE_CASCADE["MODE"])
+        if ensemble_mode not in ("full", "cascade"):
+            return Response({"error": "ensemble must be 'full' or 'cascade'"}, status=status.HTTP_400_BAD_REQUEST)
 
-            stats = TrainingStats.objects.filter(model_name=model_name).first()
-            accuracy = stats.accuracy if stats else 0
+        if ensemble_mode == "cascade":
+            result = cached_cascade_predictions(clean_text, current_bundle())
+        else:
+            result = cached_all_models_predictions(clean_text, current_bundle())
 
-            start_time = time.time()
-            prediction = model.predict(text_vectorized)[0]
-            end_time = time.time()
-            prediction_time = round(end_time - start_time, 4)  
+        prediction_log.log([prediction_record(text, result, result["model_version"], time.perf_counter() - started)])
 
-            prediction_label = "Fake" if prediction == 1 else "Real"
-
-            Prediction.objects.create(
-                text=text,
-                prediction=prediction_label,
-                model_used=model_name
-            )
-            print(f"✅ Predicción guardada para el modelo {model_name}.")
+        return Response(prediction_response(request, text, result), status=status.HTTP_200_OK)
 
-            predictions[model_name] = {
-                "prediction": prediction_label,
-                "accuracy": accuracy,
-                "prediction_time": prediction_time,  
-            }
+class PredictBatchView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "Evalúa un lote de noticias con una sola vectorización y una pasada por modelo. "
+            "Devuelve un resultado por texto, en el mismo orden. No genera explicaciones."
+        ),
+        request_body=PredictBatchSerializer,
+        tags=["Predictions (batch)"],
+    )
+    def post(self, request):
+        started = time.perf_counter()
+        serializer = PredictBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            weighted_sum += accuracy * prediction 
-            total_weight += accuracy
+        texts = serializer.validated_data["texts"]
+        requested_models = serializer.validated_data.get("models")
 
-        final_score = weighted_sum / total_weight if total_weight > 0 else 0
-        final_prediction = "Fake" if final_score >= 0.5 else "Real"
+        invalid_models = [name for name in requested_models or [] if name not in MODEL_NAMES]
+        if invalid_models:
+            return Response(
+                {"error": f"Invalid model type. Valid options are: {', '.join(MODEL_NAMES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        confidence = final_score if final_prediction == "Fake" else 1 - final_score
+        bundle = current_bundle()
+        model_names = requested_models or bundle.models.available()
+        results = predict_batch(texts, model_names=model_names, weights=ensemble_weights.get(bundle), bundle=bundle)
+        # Modelos que han votado de verdad: los que faltan en el bundle o no cargan se omiten
+        used_models = list(results[0]["predictions"]) if results else []
 
-        explanation = explanation_generator.generate_explanation(
-            text,
-            predictions,
-            final_prediction,
-            confidence
-        )
+        # La latencia de cada texto es su parte del tiempo total del lote
+        latency = (time.perf_counter() - started) / len(texts)
+        prediction_log.log(prediction_record(text, result, bundle.version, latency) for text, result in zip(texts, results))
 
         return Response(
             {
-                "predictions": predictions,
-                "final_prediction": final_prediction,
-                "confidence": round(confidence, 4),
-                "explanation": explanation
+                "count": len(results),
+                "model_version": bundle.version,
+                "models": used_models,
+                "missing_models": [name for name in model_names if name not in used_models],
+                "results": results,
             },
             status=status.HTTP_200_OK,
         )
@@ -330,7 +490,8 @@ class PredictFromImageView(APIView):
                 type=openapi.TYPE_FILE,
                 description="Imagen que contiene la noticia",
                 required=True,
-            )
+            ),
+            EXPLANATION_MODE_PARAMETER,
         ]
     )
     def post(self, request):
@@ -344,54 +505,14 @@ class PredictFromImageView(APIView):
             return Response({"error": "No se pudo extraer texto de la imagen."}, status=400)
 
         clean_text = preprocess_text(text)
-        text_vectorized = VECTORIZER.transform([clean_text])
-
-        predictions = {}
-        weighted_sum = 0
-        total_weight = 0
-
-        for model_name, model in MODELS.items():
-            if model is None:
-                continue
-
-            stats = TrainingStats.objects.filter(model_name=model_name).first()
-            accuracy = stats.accuracy if stats else 0
-
-            start_time = time.time()
-            prediction = model.predict(text_vectorized)[0]
-            end_time = time.time()
-            prediction_time = round(end_time - start_time, 4)
-
-            prediction_label = "Fake" if prediction == 1 else "Real"
-
-            predictions[model_name] = {
-                "prediction": prediction_label,
-                "accuracy": accuracy,
-                "prediction_time": prediction_time,
-            }
-
-            weighted_sum += accuracy * prediction
-            total_weight += accuracy
 
-        final_score = weighted_sum / total_weight if total_weight > 0 else 0
-        final_prediction = "Fake" if final_score >= 0.5 else "Real"
-        confidence = final_score if final_prediction == "Fake" else 1 - final_score
-
-        explanation = explanation_generator.generate_explanation(
-            text,
-            predictions,
-            final_prediction,
-            confidence
-        )
+        result = cached_all_models_predictions(clean_text, current_bundle())
 
         return Response({
             "extracted_text": text,
-            "predictions": predictions,
-            "final_prediction": final_prediction,
-            "confidence": round(confidence, 4),
-            "explanation": explanation
+            **prediction_response(request, text, result),
         }, status=status.HTTP_200_OK)
-        
+
 
 @swagger_auto_schema(
     operation_description="Extrae información relevante de un artículo de noticias a partir de su URL y predice si es real o falsa.",
@@ -402,6 +523,7 @@ class PredictFromImageView(APIView):
         },
         required=['url'],
     ),
+    manual_parameters=[EXPLANATION_MODE_PARAMETER],
     tags=['Article Analysis'],
     method='POST',
 )
@@ -430,50 +552,163 @@ def analyze_article_by_url(request):
             return JsonResponse({'error': 'No text could be extracted from the URL.'}, status=400)
 
         clean_text = preprocess_text(article.text)
-        text_vectorized = VECTORIZER.transform([clean_text])
-
-        predictions = {}
-        weighted_sum = 0
-        total_weight = 0
-
-        for model_name, model in MODELS.items():
-            if model is None:
-                continue
-
-            stats = TrainingStats.objects.filter(model_name=model_name).first()
-            accuracy = stats.accuracy if stats else 0
 
-            prediction = model.predict(text_vectorized)[0]
-            prediction_label = "Fake" if prediction == 1 else "Real"
-
-            predictions[model_name] = {
-                "prediction": prediction_label,
-                "accuracy": accuracy,
-            }
-
-            weighted_sum += accuracy * prediction  
-            total_weight += accuracy
-
-        final_score = weighted_sum / total_weight if total_weight > 0 else 0
-        final_prediction = "Fake" if final_score >= 0.5 else "Real"
-        confidence = final_score if final_prediction == "Fake" else 1 - final_score
-        
-        explantion = explanation_generator.generate_explanation(
-            article.text,
-            predictions,
-            final_prediction,
-            confidence
-        )
+        result = cached_all_models_predictions(clean_text, current_bundle())
 
         response_data = {
             "article_data": extracted_data,
-            "predictions": predictions,
-            "final_prediction": final_prediction,
-            "confidence": round(confidence, 4),
-            "explanation": explantion
+            **prediction_response(request, article.text, result),
         }
 
         return JsonResponse(response_data, status=200)
 
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+class ExplanationView(APIView):
+    @swagger_auto_schema(
+        operation_description=(
+            "Consulta (polling) el estado y el texto de una explicación pedida en modo deferred. "
+            "Mientras el estado es 'pending', 'explanation' contiene el texto recibido hasta el momento."
+        ),
+        tags=["Explanations"],
+    )
+    def get(self, request, explanation_id):
+        job = explanation_generator.get_job(explanation_id)
+        if job is not None:
+            chunks, job_status = job.snapshot()
+            return Response({
+                "explanation_id": explanation_id,
+                "status": job_status,
+                "explanation": "".join(chunks),
+            }, status=status.HTTP_200_OK)
+
+        # El job puede estar en otro proceso: su estado y su progreso están en la base de datos
+        stored = explanation_generator.lookup_state(explanation_id)
+        if stored is None:
+            return Response({"error": "Explanation not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        explanation, job_status = stored
+        return Response({
+            "explanation_id": explanation_id,
+            "status": job_status,
+            "explanation": explanation,
+        }, status=status.HTTP_200_OK)
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_explanation(request, explanation_id):
+    """
+    Envía la explicación como server-sent events: un evento `delta` por fragmento
+    recibido del LLM y un evento `done` al terminar. Es una vista asíncrona, de modo
+    que bajo ASGI la espera no ocupa un worker ni un hilo.
+
+    Si el job se ejecuta en otro proceso, se sigue su fila en la base de datos cada
+    `PROGRESS_INTERVAL` segundos y cada evento `delta` lleva el texto nuevo desde
+    la consulta anterior.
+    """
+    poll_interval = settings.EXPLANATION_CACHE["STREAM_POLL_INTERVAL"]
+    keepalive_interval = settings.EXPLANATION_CACHE["STREAM_KEEPALIVE"]
+    stored_poll_interval = max(poll_interval, settings.EXPLANATION_CACHE["PROGRESS_INTERVAL"])
+
+    async def stored_event_stream():
+        sent = ""
+        idle = 0.0
+        while True:
+            stored = await sync_to_async(explanation_generator.lookup_state)(explanation_id)
+            if stored is None:
+                yield _sse_event("error", {"error": "Explanation not found"})
+                return
+            explanation, job_status = stored
+
+            # Un job fallido sustituye el texto por el mensaje de respaldo: solo va en `done`
+            new_text = explanation[len(sent):] if explanation.startswith(sent) else ""
+            if new_text and job_status != ExplanationJob.FAILED:
+                yield _sse_event("delta", {"content": new_text})
+                sent = explanation
+                idle = 0.0
+
+            if job_status != ExplanationJob.PENDING:
+                yield _sse_event("done", {"status": job_status, "explanation": explanation})
+                return
+
+            if idle >= keepalive_interval:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+
+            await asyncio.sleep(stored_poll_interval)
+            idle += stored_poll_interval
+
+    async def event_stream():
+        job = explanation_generator.get_job(explanation_id)
+        if job is None:
+            async for event in stored_event_stream():
+                yield event
+            return
+
+        sent = 0
+        idle = 0.0
+        while True:
+            chunks, job_status = job.snapshot(sent)
+            for chunk in chunks:
+                yield _sse_event("delta", {"content": chunk})
+            sent += len(chunks)
+
+            if job_status != ExplanationJob.PENDING:
+                yield _sse_event("done", {"status": job_status, "explanation": job.text})
+                return
+
+            if chunks:
+                idle = 0.0
+            elif idle >= keepalive_interval:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+
+            await asyncio.sleep(poll_interval)
+            idle += poll_interval
+
+    response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def export_predictions(request):
+    """
+    Exporta el registro de predicciones en streaming. Las filas se leen por páginas
+    con paginación por clave y se escriben según llegan, así que la memoria no
+    depende del número de filas exportadas.
+
+    Solo para usuarios staff: el registro contiene los textos enviados por todos
+    los usuarios.
+    """
+    user = await request.auser()
+    if not user.is_staff:
+        return JsonResponse({"error": "Staff credentials are required to export predictions"}, status=403)
+
+    serializer = ExportQuerySerializer(data=request.GET)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    query = serializer.validated_data
+    export_format = query["format"]
+    include_text = query["include_text"]
+    queryset = export_queryset(query.get("start"), query.get("end"), query.get("model_used"), include_text)
+
+    async def rows():
+        if export_format == "csv":
+            yield csv_header(include_text)
+        async for row in aexport_rows(
+            queryset, query["after_id"], settings.PREDICTION_EXPORT_PAGE_SIZE, query.get("limit"),
+        ):
+            yield format_line(row, export_format, include_text)
+
+    content_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(rows(), content_type=f"{content_type}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="predictions.{export_format}"'
+    response["X-Accel-Buffering"] = "no"
+    return response
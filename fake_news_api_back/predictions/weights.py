@@ -0,0 +1,67 @@
+import threading
+from predictions.models import TrainingStats
+
+
+def latest_training_stats(model_names=None):
+    """
+    Última estadística de entrenamiento de cada modelo: {modelo: TrainingStats}.
+    El orden por fecha e id hace que el resultado sea determinista aunque haya
+    varias filas con la misma fecha.
+    """
+    queryset = TrainingStats.objects.order_by("model_name", "-trained_at", "-id")
+    if model_names is not None:
+        queryset = queryset.filter(model_name__in=model_names)
+
+    latest = {}
+    for stats in queryset:
+        latest.setdefault(stats.model_name, stats)
+    return latest
+
+
+class EnsembleWeightsCache:
+    """
+    Pesos del voto ponderado ({modelo: precisión}) cacheados por bundle de modelos.
+
+    Se calculan una vez por versión de bundle: con las precisiones del manifiesto
+    del bundle y, para los modelos que no las tengan (bundle legacy), con la última
+    fila de `TrainingStats`. Después, ningún endpoint de ensemble consulta la base
+    de datos para obtenerlos. Un bundle nuevo tiene otra versión, así que los
+    workers lo recogen solos; `invalidate()` descarta además los pesos del proceso
+    actual (p. ej. tras registrar estadísticas nuevas en `primetrain`).
+    """
+
+    def __init__(self):
+        self._weights = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, bundle):
+        weights = self._weights.get(bundle.version)
+        if weights is not None:
+            return weights
+
+        with self._lock:
+            weights = self._weights.get(bundle.version)
+            if weights is None:
+                weights = dict(bundle.stats)
+                missing = [name for name in bundle.models if name not in weights]
+                if missing:
+                    for model_name, stats in latest_training_stats(missing).items():
+                        weights[model_name] = stats.accuracy
+                # Se conservan los pesos de los dos últimos bundles: durante un cambio de
+                # versión conviven peticiones de ambos
+                while len(self._weights) >= 2:
+                    self._weights.pop(next(iter(self._weights)))
+                self._weights[bundle.version] = weights
+                self.loads += 1
+        return weights
+
+    def invalidate(self):
+        with self._lock:
+            self._weights = {}
+
+    def stats(self):
+        return {"versions": list(self._weights), "loads": self.loads}
+
+
+ensemble_weights = EnsembleWeightsCache()
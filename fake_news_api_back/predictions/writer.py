@@ -0,0 +1,239 @@
+import atexit
+import queue
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from predictions.counters import apply_counter_deltas, counter_deltas
+from predictions.models import Prediction, SubmittedText
+from predictions.rollups import apply_rollup_deltas, rollup_deltas
+
+
+class PredictionLogWriter:
+    """
+    Registro de predicciones "write-behind": las vistas encolan las filas y un hilo
+    en segundo plano las inserta por lotes con `bulk_create`, fuera del camino de
+    la petición.
+
+    La cola está acotada. Si se llena (la base de datos no da abasto), `log` espera
+    hasta `enqueue_timeout` segundos (contrapresión) y, si sigue llena, descarta las
+    filas y lo contabiliza en `dropped`. Un lote cuya escritura falla se reintenta
+    hasta `write_retries` veces antes de contarlo en `failed`. Al terminar el
+    proceso se vacía la cola.
+    Con `PREDICTION_LOG["MODE"] = "sync"` las filas se insertan en la propia
+    petición, como antes (útil en tests).
+    """
+
+    def __init__(self, queue_size=10000, batch_size=500, flush_interval=1.0, enqueue_timeout=0.05,
+                 shutdown_timeout=10, write_retries=1, retry_delay=0.5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.write_retries = write_retries
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.max_queue_depth = 0
+
+    @property
+    def mode(self):
+        return settings.PREDICTION_LOG["MODE"]
+
+    def _count(self, **deltas):
+        with self._counter_lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def log(self, predictions):
+        """
+        Registra una lista de instancias `Prediction` sin guardar, cuyo `submitted_text`
+        es un `SubmittedText.from_text(...)` también sin guardar.
+        """
+        predictions = list(predictions)
+        if not predictions:
+            return
+        if self.mode == "sync":
+            self._count(enqueued=len(predictions))
+            self.write(predictions)
+            return
+
+        self._ensure_started()
+        for prediction in predictions:
+            try:
+                self._queue.put_nowait(prediction)
+            except queue.Full:
+                self._count(backpressure_waits=1)
+                try:
+                    self._queue.put(prediction, timeout=self.enqueue_timeout)
+                except queue.Full:
+                    self._count(dropped=1)
+                    continue
+            self._count(enqueued=1)
+
+        depth = self._queue.qsize()
+        with self._counter_lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def resolve_texts(self, predictions):
+        """
+        Sustituye los textos sin guardar por sus filas de `SubmittedText`, creando solo
+        las que faltan. Dos workers pueden insertar el mismo texto a la vez: el
+        conflicto en el hash único se ignora y se vuelve a leer.
+        """
+        texts = {}
+        for prediction in predictions:
+            submitted = prediction.submitted_text
+            if submitted.pk is None:
+                texts.setdefault(submitted.text_hash, submitted)
+        if not texts:
+            return
+
+        existing = set(SubmittedText.objects.filter(text_hash__in=texts).values_list("text_hash", flat=True))
+        SubmittedText.objects.bulk_create(
+            [submitted for text_hash, submitted in texts.items() if text_hash not in existing],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        saved = SubmittedText.objects.in_bulk(list(texts), field_name="text_hash")
+        for prediction in predictions:
+            if prediction.submitted_text.pk is None:
+                prediction.submitted_text = saved[prediction.submitted_text.text_hash]
+
+    def write(self, predictions):
+        """
+        Inserta un lote en una transacción. Si falla (p. ej. un bloqueo o una
+        desconexión pasajera), se reintenta tras `retry_delay` segundos; si fallan
+        todos los intentos, las filas se descartan y se cuentan en `failed`.
+        """
+        # El rollback no deshace lo que `bulk_create` y `resolve_texts` cambian en las
+        # instancias (pk asignadas, textos de filas que ya no existen)
+        originals = [(prediction.submitted_text, prediction.submitted_text.pk) for prediction in predictions]
+        for attempt in range(self.write_retries + 1):
+            try:
+                with transaction.atomic():
+                    self.resolve_texts(predictions)
+                    Prediction.objects.bulk_create(predictions, batch_size=self.batch_size)
+                    apply_counter_deltas(counter_deltas(predictions))
+                    apply_rollup_deltas(rollup_deltas(predictions))
+            except Exception as e:
+                for prediction, (submitted, pk) in zip(predictions, originals):
+                    submitted.pk = pk
+                    prediction.submitted_text = submitted
+                    prediction.pk = None
+                    prediction._state.adding = True
+                if attempt < self.write_retries:
+                    self._count(retries=1)
+                    print(f"⚠️ Error guardando {len(predictions)} predicciones, reintentando: {e}")
+                    time.sleep(self.retry_delay)
+                    continue
+                self._count(failed=len(predictions))
+                print(f"❌ Error guardando {len(predictions)} predicciones: {e}")
+                return
+            self._count(written=len(predictions), batches=1)
+            return
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+                self._thread.start()
+
+    def _drain(self, first=None):
+        batch = [] if first is None else [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set() or not self._queue.empty():
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                # Espera breve para agrupar las filas que llegan casi a la vez
+                if self._queue.qsize() < self.batch_size and not self._stopping.is_set():
+                    time.sleep(min(0.05, self.flush_interval))
+                batch = self._drain(first)
+                close_old_connections()
+                self.write(batch)
+        finally:
+            connections.close_all()
+
+    def flush(self, timeout=None):
+        """
+        Espera a que la cola quede vacía y escrita (o a que pase `timeout`).
+
+        :return: True si se vació a tiempo.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def pending(self):
+        """
+        Filas encoladas que aún no se han escrito (ni han fallado).
+        """
+        with self._counter_lock:
+            return self.enqueued - self.written - self.failed
+
+    def shutdown(self):
+        """
+        Detiene el hilo tras vaciar la cola. Se registra con `atexit`.
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(self.shutdown_timeout)
+        pending = self._queue.qsize()
+        if pending:
+            print(f"⚠️ {pending} predicciones sin guardar al cerrar el proceso.")
+
+    def stats(self):
+        with self._counter_lock:
+            return {
+                "mode": self.mode,
+                "queue_depth": self._queue.qsize(),
+                "pending": self.enqueued - self.written - self.failed,
+                "queue_size": self._queue.maxsize,
+                "max_queue_depth": self.max_queue_depth,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "retries": self.retries,
+                "batches": self.batches,
+                "backpressure_waits": self.backpressure_waits,
+            }
+
+
+prediction_log = PredictionLogWriter(
+    queue_size=settings.PREDICTION_LOG["QUEUE_SIZE"],
+    batch_size=settings.PREDICTION_LOG["BATCH_SIZE"],
+    flush_interval=settings.PREDICTION_LOG["FLUSH_INTERVAL"],
+    enqueue_timeout=settings.PREDICTION_LOG["ENQUEUE_TIMEOUT"],
+    shutdown_timeout=settings.PREDICTION_LOG["SHUTDOWN_TIMEOUT"],
+    write_retries=settings.PREDICTION_LOG["WRITE_RETRIES"],
+    retry_delay=settings.PREDICTION_LOG["RETRY_DELAY"],
+)
+atexit.register(prediction_log.shutdown)